@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+from fastapi.responses import Response
+from app.metrics.cache_metrics import CACHE_REQUESTS, CACHE_BYTES_SAVED
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+class ResponseCache:
+    """
+    Cache of serialized response bodies, valid for one data version
+
+    Entries are keyed by request parameters and belong to the version
+    of the data they were rendered from (StorageBackend.data_version); the
+    first request after a write drops them all. The ETag is derived from
+    the version and key alone, so a matching If-None-Match gets a 304
+    without touching storage. Concurrent misses for the same key share
+    one render. Size is bounded by `max_entries` and `max_bytes`,
+    least recently used first.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # ETags must not repeat across restarts, when versions start over
+        self._epoch = os.urandom(4).hex()
+        self._version = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._pending = {}
+        self._results = {
+            result: CACHE_REQUESTS.labels(name, result)
+            for result in ("hit", "miss", "coalesced", "not_modified")
+        }
+        self._bytes_saved = CACHE_BYTES_SAVED.labels(name)
+
+    def etag(self, key: Hashable, version: int) -> str:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+        return f'"{self._epoch}-{version}-{digest}"'
+
+    def _sync_version(self, version: int):
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _store(self, key: Hashable, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        self._entries[key] = body
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    async def respond(self, key: Hashable, version: int, render: Callable[[], Awaitable[bytes]],
+                      if_none_match: Optional[str] = None,
+                      media_type: str = "application/json") -> Response:
+        """Cached, freshly rendered or 304 response for `key` at data `version`"""
+        etag = self.etag(key, version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        self._sync_version(version)
+        body = self._entries.get(key)
+
+        if etag_matches(if_none_match, etag):
+            self._results["not_modified"].inc()
+            if body is not None:
+                self._bytes_saved.inc(len(body))
+            return Response(status_code=304, headers=headers)
+
+        if body is not None:
+            self._entries.move_to_end(key)
+            self._results["hit"].inc()
+            self._bytes_saved.inc(len(body))
+        else:
+            body = await self._render(key, version, render)
+        return Response(body, media_type=media_type, headers=headers)
+
+    async def _render(self, key: Hashable, version: int, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        pending_key = (version, key)
+        future = self._pending.get(pending_key)
+        if future is not None:
+            self._results["coalesced"].inc()
+            try:
+                body = await asyncio.shield(future)
+                self._bytes_saved.inc(len(body))
+                return body
+            except asyncio.CancelledError:
+                # The rendering request was cancelled, not this one
+                if not future.cancelled():
+                    raise
+                return await render()
+
+        self._results["miss"].inc()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[pending_key] = future
+        try:
+            body = await render()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; nobody waiting is fine too
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(pending_key, None)
+
+        future.set_result(body)
+        # A write while rendering already moved the cache on to a newer version
+        if self._version == version:
+            self._store(key, body)
+        return body
@@ -1,6 +1,16 @@
 import os
 from typing import List, Optional
 
+def _parse_windows(value: str) -> List[int]:
+    """"10,60,300" to sorted, distinct window lengths; rejects anything but positive ints"""
+    try:
+        windows = {int(x) for x in value.split(",") if x.strip()}
+    except ValueError:
+        raise ValueError(f"RATE_WINDOWS must be comma-separated whole seconds, got {value!r}")
+    if not windows or min(windows) < 1:
+        raise ValueError(f"RATE_WINDOWS must be one or more positive numbers of seconds, got {value!r}")
+    return sorted(windows)
+
 class Settings:
     """
     Application configuration settings
@@ -14,22 +24,136 @@ class Settings:
     # Server settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
     
     # Metrics settings
-    METRICS_COLLECTION_INTERVAL: int = int(os.getenv("METRICS_COLLECTION_INTERVAL", "5"))
+    # Minimum seconds between two system metric reads; scrapes in between reuse them
+    METRICS_COLLECTION_INTERVAL: float = float(os.getenv("METRICS_COLLECTION_INTERVAL", "1"))
+    # System metrics: block devices and network interfaces left out (shell-style
+    # patterns), filesystem types whose mounts are not reported, and how often
+    # the mount list is re-read
+    SYSTEM_DISK_EXCLUDE_DEVICES: List[str] = [
+        x.strip() for x in os.getenv("SYSTEM_DISK_EXCLUDE_DEVICES", "loop*,ram*,sr*").split(",")
+    ]
+    SYSTEM_NETWORK_EXCLUDE_INTERFACES: List[str] = [
+        x.strip() for x in os.getenv("SYSTEM_NETWORK_EXCLUDE_INTERFACES", "lo,veth*").split(",")
+    ]
+    SYSTEM_DISK_EXCLUDE_FSTYPES: List[str] = [
+        x.strip() for x in os.getenv("SYSTEM_DISK_EXCLUDE_FSTYPES", "squashfs,tmpfs,devtmpfs").split(",")
+    ]
+    SYSTEM_MOUNTS_REFRESH_SECONDS: float = float(os.getenv("SYSTEM_MOUNTS_REFRESH_SECONDS", "60"))
     METRICS_ENDPOINT: str = os.getenv("METRICS_ENDPOINT", "/metrics")
+    # Exposition is rendered at most once per interval and shared by scrapers
+    METRICS_RENDER_INTERVAL: float = float(os.getenv("METRICS_RENDER_INTERVAL", "1"))
+    METRICS_CHUNK_SIZE: int = int(os.getenv("METRICS_CHUNK_SIZE", "65536"))
     
     # Middleware settings
+    # Set to false to run without MetricsMiddleware (e.g. overhead benchmarks)
+    HTTP_METRICS_ENABLED: bool = os.getenv("HTTP_METRICS_ENABLED", "true").lower() == "true"
+    # Entries are path prefixes ("/docs" also covers "/docs/...") or
+    # shell-style globs ("/static/*.css")
     EXCLUDE_PATHS_FROM_METRICS: List[str] = [
         "/metrics",
         "/favicon.ico",
         "/docs",
         "/openapi.json",
-        "/redoc"
+        "/redoc",
+        "/debug"
+    ]
+    
+    # Admission control: adaptive concurrency limit per route class, with a
+    # short wait queue; requests that do not get a slot get 503 + Retry-After
+    # (opt-in: it can shed requests the app used to queue)
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "false").lower() == "true"
+    ADMISSION_INITIAL_LIMIT: int = int(os.getenv("ADMISSION_INITIAL_LIMIT", "100"))
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "10"))
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "1000"))
+    # Latency may grow to this multiple of its baseline before the limit shrinks
+    ADMISSION_LATENCY_TOLERANCE: float = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+    # Optional absolute bound (seconds, 0 = off): slower windows halve the limit
+    ADMISSION_LATENCY_TARGET: float = float(os.getenv("ADMISSION_LATENCY_TARGET", "0"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.25"))
+    ADMISSION_RETRY_AFTER_SECONDS: float = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+    # Extra route classes as class=pattern pairs; other requests are "read" or "write"
+    ADMISSION_CLASS_PATHS: str = os.getenv("ADMISSION_CLASS_PATHS", "bulk=/data/bulk")
+    # Never queued or shed (prefixes or globs, like EXCLUDE_PATHS_FROM_METRICS)
+    ADMISSION_PRIORITY_PATHS: List[str] = [
+        "/health",
+        "/metrics",
+        "/debug"
     ]
     
+    # Cardinality settings
+    METRICS_MAX_SERIES_PER_METRIC: int = int(os.getenv("METRICS_MAX_SERIES_PER_METRIC", "1000"))
+    METRICS_SERIES_IDLE_SECONDS: float = float(os.getenv("METRICS_SERIES_IDLE_SECONDS", "300"))
+    
+    # Recording settings
+    HTTP_METRICS_BUFFERED: bool = os.getenv("HTTP_METRICS_BUFFERED", "false").lower() == "true"
+    HTTP_METRICS_BUFFER_SIZE: int = int(os.getenv("HTTP_METRICS_BUFFER_SIZE", "10000"))
+    # Per-request histograms stored in one array per family instead of an
+    # object tree per child (ignored in multi-process mode)
+    HTTP_COMPACT_HISTOGRAMS: bool = os.getenv("HTTP_COMPACT_HISTOGRAMS", "true").lower() == "true"
+    
+    # Per-request resource attribution: CPU time of every request, and
+    # peak traced memory growth (tracemalloc) for this fraction of
+    # requests (0 = off); tracing slows every concurrent request too
+    HTTP_RESOURCE_METRICS: bool = os.getenv("HTTP_RESOURCE_METRICS", "false").lower() == "true"
+    HTTP_ALLOC_SAMPLE_RATE: float = float(os.getenv("HTTP_ALLOC_SAMPLE_RATE", "0"))
+    
+    # Slow-request flight recorder (/debug/slow): requests slower than the
+    # threshold are kept with per-phase timings, and their latency sample
+    # gets the request id as an exemplar (OpenMetrics scrapes only)
+    SLOW_REQUEST_RECORDER_ENABLED: bool = os.getenv("SLOW_REQUEST_RECORDER_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+    SLOW_REQUEST_HISTORY: int = int(os.getenv("SLOW_REQUEST_HISTORY", "100"))
+    SLOW_REQUEST_TOP_N: int = int(os.getenv("SLOW_REQUEST_TOP_N", "20"))
+    # Adds a Server-Timing header with the phases up to the response start
+    SLOW_REQUEST_SERVER_TIMING: bool = os.getenv("SLOW_REQUEST_SERVER_TIMING", "false").lower() == "true"
+    
+    # Sliding windows (seconds) for http_requests_per_second / http_errors_per_second;
+    # invalid values fail at startup
+    RATE_WINDOWS: List[int] = _parse_windows(os.getenv("RATE_WINDOWS", "10,60,300"))
+    
     # Prometheus settings
     PROMETHEUS_MULTIPROC_DIR: Optional[str] = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    # How often each worker writes its scrape-time values in multi-process mode
+    MULTIPROC_PUBLISH_INTERVAL: float = float(os.getenv("MULTIPROC_PUBLISH_INTERVAL", "1"))
+    
+    # Push exporter: send metric deltas to an OTLP/HTTP (JSON) receiver every
+    # PUSH_EXPORTER_INTERVAL seconds and on shutdown, for workers that may
+    # exit between scrapes
+    PUSH_EXPORTER_ENABLED: bool = os.getenv("PUSH_EXPORTER_ENABLED", "false").lower() == "true"
+    PUSH_EXPORTER_ENDPOINT: str = os.getenv("PUSH_EXPORTER_ENDPOINT", "http://127.0.0.1:4318/v1/metrics")
+    PUSH_EXPORTER_INTERVAL: float = float(os.getenv("PUSH_EXPORTER_INTERVAL", "10"))
+    PUSH_EXPORTER_TIMEOUT: float = float(os.getenv("PUSH_EXPORTER_TIMEOUT", "5"))
+    PUSH_EXPORTER_MAX_QUEUE_BYTES: int = int(os.getenv("PUSH_EXPORTER_MAX_QUEUE_BYTES", str(8 * 1024 * 1024)))
+    PUSH_EXPORTER_MAX_RETRIES: int = int(os.getenv("PUSH_EXPORTER_MAX_RETRIES", "5"))
+    PUSH_EXPORTER_BACKOFF_MAX: float = float(os.getenv("PUSH_EXPORTER_BACKOFF_MAX", "30"))
+    # Extra request headers, "key=value,key2=value2" (e.g. auth)
+    PUSH_EXPORTER_HEADERS: Optional[str] = os.getenv("PUSH_EXPORTER_HEADERS")
+    # How long shutdown waits for the final push
+    PUSH_EXPORTER_SHUTDOWN_TIMEOUT: float = float(os.getenv("PUSH_EXPORTER_SHUTDOWN_TIMEOUT", "5"))
+    
+    # In-process time-series store (/metrics/query): the registry series
+    # matching TIMESERIES_METRICS (shell-style patterns) are sampled every
+    # finest step into fixed rings, one per "step:retention" resolution.
+    # process_*/system_* are not in the default list: sampling any of them
+    # runs a full system metrics refresh every step, even when idle
+    TIMESERIES_ENABLED: bool = os.getenv("TIMESERIES_ENABLED", "true").lower() == "true"
+    TIMESERIES_RESOLUTIONS: str = os.getenv("TIMESERIES_RESOLUTIONS", "1s:1h,1m:24h")
+    TIMESERIES_METRICS: List[str] = [
+        x.strip() for x in os.getenv(
+            "TIMESERIES_METRICS",
+            "http_requests_total,http_requests_active,http_requests_per_second,http_errors_per_second,"
+            "http_request_duration_seconds_count,http_request_duration_seconds_sum,"
+            "event_loop_lag_seconds_count,event_loop_lag_seconds_sum,"
+            "admission_concurrency_limit,admission_inflight_requests,admission_shed_total,"
+            "processing_queue_depth,processing_workers_busy,response_cache_requests_total"
+        ).split(",")
+    ]
+    # About 40 KB per series with the default resolutions
+    TIMESERIES_MAX_SERIES: int = int(os.getenv("TIMESERIES_MAX_SERIES", "500"))
     
     # Histogram bucket settings
     LATENCY_BUCKETS: List[float] = [
@@ -41,6 +165,74 @@ class Settings:
         1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, float('inf')
     ]
     
+    # Latency sketch settings (http_request_duration_sketch_seconds)
+    LATENCY_QUANTILES: List[float] = [
+        float(x) for x in os.getenv("LATENCY_QUANTILES", "0.5,0.9,0.95,0.99").split(",")
+    ]
+    # Quantiles are within this relative error of the true value
+    SKETCH_RELATIVE_ACCURACY: float = float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01"))
+    SKETCH_MAX_BINS: int = int(os.getenv("SKETCH_MAX_BINS", "2048"))
+    # Quantiles cover the last one to two windows
+    SKETCH_WINDOW_SECONDS: float = float(os.getenv("SKETCH_WINDOW_SECONDS", "60"))
+    
+    # Data API settings
+    DATA_PAGE_SIZE_DEFAULT: int = int(os.getenv("DATA_PAGE_SIZE_DEFAULT", "100"))
+    DATA_PAGE_SIZE_MAX: int = int(os.getenv("DATA_PAGE_SIZE_MAX", "1000"))
+    DATA_STREAM_CHUNK_SIZE: int = int(os.getenv("DATA_STREAM_CHUNK_SIZE", "500"))
+    
+    # GET /data response cache: serialized pages are reused (and answered
+    # with 304 on a matching If-None-Match) until the next write
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    
+    # Offloaded processing for POST /data: CPU-bound work runs in a pool of
+    # PROCESSING_WORKERS processes fed from a queue of PROCESSING_QUEUE_SIZE
+    # jobs; a full queue answers 503
+    PROCESSING_EXECUTOR: str = os.getenv("PROCESSING_EXECUTOR", "process").lower()
+    # Default: the usable CPUs shared out between the WORKERS server processes
+    PROCESSING_WORKERS: int = int(os.getenv("PROCESSING_WORKERS", "0")) or max(1, len(
+        os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)
+    ) // max(1, WORKERS))
+    PROCESSING_QUEUE_SIZE: int = int(os.getenv("PROCESSING_QUEUE_SIZE", "100"))
+    PROCESSING_START_METHOD: str = os.getenv("PROCESSING_START_METHOD", "spawn")
+    # Finished jobs kept for GET /jobs/{job_id}
+    PROCESSING_JOB_HISTORY: int = int(os.getenv("PROCESSING_JOB_HISTORY", "10000"))
+    # Seconds the simulated transform takes per item (uniformly drawn): a
+    # wait, as before the pool existed, or with PROCESSING_CPU_WORK real
+    # CPU time burned in the pool
+    PROCESSING_CPU_WORK: bool = os.getenv("PROCESSING_CPU_WORK", "false").lower() == "true"
+    PROCESSING_WORK_SECONDS_MIN: float = float(os.getenv("PROCESSING_WORK_SECONDS_MIN", "0.1"))
+    PROCESSING_WORK_SECONDS_MAX: float = float(os.getenv("PROCESSING_WORK_SECONDS_MAX", "0.5"))
+    
+    # Bulk ingestion settings
+    BULK_MAX_BYTES: int = int(os.getenv("BULK_MAX_BYTES", str(50 * 1024 * 1024)))
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "100000"))
+    # Largest single record (NDJSON line or array element); larger get 413
+    BULK_MAX_RECORD_BYTES: int = int(os.getenv("BULK_MAX_RECORD_BYTES", str(1024 * 1024)))
+    BULK_VALIDATE_BATCH_SIZE: int = int(os.getenv("BULK_VALIDATE_BATCH_SIZE", "1000"))
+    
+    # Storage settings
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "memory").lower()
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "data.db")
+    # Group commit: max rows per transaction and how long to wait for more
+    STORAGE_BATCH_MAX: int = int(os.getenv("STORAGE_BATCH_MAX", "256"))
+    STORAGE_BATCH_WAIT_MS: float = float(os.getenv("STORAGE_BATCH_WAIT_MS", "0"))
+    
+    # Debug endpoints (/debug/*) are off unless enabled; with DEBUG_TOKEN set
+    # they also require a matching X-Debug-Token header
+    DEBUG_ENDPOINTS_ENABLED: bool = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() == "true"
+    DEBUG_TOKEN: Optional[str] = os.getenv("DEBUG_TOKEN")
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+    
+    # Event loop monitor: lag is sampled every LOOP_MONITOR_INTERVAL seconds;
+    # a loop stuck longer than LOOP_BLOCK_THRESHOLD has its stack captured
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL: float = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+    LOOP_BLOCK_THRESHOLD: float = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))
+    LOOP_BLOCK_HISTORY: int = int(os.getenv("LOOP_BLOCK_HISTORY", "50"))
+    
     # Health check settings
     HEALTH_CHECK_INTERVAL: int = int(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
     CPU_THRESHOLD_WARNING: float = float(os.getenv("CPU_THRESHOLD_WARNING", "80.0"))
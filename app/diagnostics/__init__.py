@@ -0,0 +1,9 @@
+"""
+Runtime diagnostics for the live process
+"""
+
+from .profiler import StackSampler, ProfileResult, ProfilerBusy, run_profile, signal_sampling_available
+from .loop_monitor import LoopMonitor, get_loop_monitor, start_loop_monitor, stop_loop_monitor
+
+__all__ = ['StackSampler', 'ProfileResult', 'ProfilerBusy', 'run_profile', 'signal_sampling_available',
+           'LoopMonitor', 'get_loop_monitor', 'start_loop_monitor', 'stop_loop_monitor']
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+from app.diagnostics.profiler import route_from_frame
+from app.metrics.loop_metrics import EVENT_LOOP_LAG, EVENT_LOOP_BLOCKS
+
+def format_stack(frame) -> List[str]:
+    """Outermost-first "file:line in function" entries for a frame chain"""
+    entries = []
+    while frame is not None:
+        code = frame.f_code
+        entries.append(
+            f"{os.path.basename(code.co_filename)}:{frame.f_lineno} "
+            f"in {getattr(code, 'co_qualname', code.co_name)}"
+        )
+        frame = frame.f_back
+    entries.reverse()
+    return entries
+
+class LoopMonitor:
+    """
+    Event loop lag monitor with a blocking-call detector
+
+    A task on the loop sleeps `interval` seconds at a time and observes
+    how late each wake-up is in `event_loop_lag_seconds`. A watchdog
+    thread checks that those wake-ups keep coming; when one is more than
+    `threshold` late, the loop is stuck in a single callback, so the
+    watchdog captures the loop thread's stack right then, together with
+    the route of the request that was running (if any). Events are kept
+    in a ring of `history` entries; `blocked_for` is filled in once the
+    loop runs again.
+    """
+
+    def __init__(self, interval: float, threshold: float, history: int):
+        self.interval = interval
+        self.threshold = threshold
+        self.events = deque(maxlen=history)
+        self._heartbeat = None
+        self._reported_heartbeat = None
+        self._open_event = None
+        self._loop_thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+        self._watchdog = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start monitoring the running loop; call from the loop thread"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _tick(self):
+        interval = self.interval
+        expected = time.monotonic() + interval
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            self._heartbeat = now
+            expected = now + interval
+
+            if self._open_event is not None:
+                with self._lock:
+                    if self._open_event is not None:
+                        self._open_event["blocked_for"] = lag
+                        self._open_event = None
+
+    def _watch(self):
+        # Check often enough to catch the stack well within the threshold
+        check_interval = min(self.threshold / 2, 0.05)
+        while not self._stop.wait(check_interval):
+            heartbeat = self._heartbeat
+            late = time.monotonic() - heartbeat - self.interval
+            if late > self.threshold and heartbeat != self._reported_heartbeat:
+                # One event per blocking episode
+                self._reported_heartbeat = heartbeat
+                self._capture(late)
+
+    def _capture(self, late: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        route = None
+        stack = []
+        if frame is not None:
+            stack = format_stack(frame)
+            while frame is not None and route is None:
+                route = route_from_frame(frame)
+                frame = frame.f_back
+        frame = None
+
+        event = {
+            "detected_at": time.time(),
+            "blocked_for": None,
+            "blocked_at_detection": late,
+            "route": route,
+            "stack": stack
+        }
+        EVENT_LOOP_BLOCKS.inc()
+        with self._lock:
+            self.events.append(event)
+            self._open_event = event
+
+    def recent_events(self) -> List[dict]:
+        """Captured blocking events, newest first"""
+        with self._lock:
+            return [dict(event) for event in reversed(self.events)]
+
+_monitor: Optional[LoopMonitor] = None
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    return _monitor
+
+def start_loop_monitor(interval: float, threshold: float, history: int) -> LoopMonitor:
+    """Create (once) and start the loop monitor on the running loop"""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor(interval, threshold, history)
+    _monitor.start()
+    return _monitor
+
+async def stop_loop_monitor():
+    if _monitor is not None:
+        await _monitor.stop()
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+# Frames of MetricsMiddleware.__call__ hold the request's method and route
+# template in their locals; finding one on a stack tags the sample
+_MIDDLEWARE_CODE = MetricsMiddleware.__call__.__code__
+
+# Innermost frames that mean a thread is waiting rather than on CPU
+IDLE_FRAMES = {
+    ("selectors", "select"),
+    ("selectors", "EpollSelector.select"),
+    ("selectors", "KqueueSelector.select"),
+    ("selectors", "PollSelector.select"),
+    ("selectors", "SelectSelector.select"),
+    ("threading", "Condition.wait"),
+    ("threading", "Event.wait"),
+    ("threading", "Thread.join"),
+    ("queue", "Queue.get"),
+    ("thread", "_worker"),
+    ("multiprocess", "_publish_loop"),
+    # uvloop runs the loop in C; idle shows up as its Python caller
+    ("runners", "Runner.run"),
+}
+
+# Code objects have no co_qualname before Python 3.11, so labels there
+# are (module, co_name): match idle frames on their plain name instead
+_IDLE_NAMES = {(module, name.rpartition(".")[2]) for module, name in IDLE_FRAMES}
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+    pass
+
+def route_from_frame(frame) -> Optional[str]:
+    """Route ("GET /data") of `frame` if it is a MetricsMiddleware call, else None"""
+    if frame.f_code is not _MIDDLEWARE_CODE:
+        return None
+    local_vars = frame.f_locals
+    if "endpoint" not in local_vars:
+        return None
+    return f"{local_vars['method']} {local_vars['endpoint']}"
+
+def _frame_label(code) -> Tuple[str, str]:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return module, getattr(code, "co_qualname", code.co_name)
+
+def is_idle_frame(code) -> bool:
+    """Whether `code`, as the innermost frame, means its thread is waiting"""
+    label = _frame_label(code)
+    if hasattr(code, "co_qualname"):
+        return label in IDLE_FRAMES
+    return label in _IDLE_NAMES
+
+class ProfileResult:
+    """Aggregated samples of one profiling run"""
+
+    def __init__(self, mode: str, seconds: float, interval: float):
+        self.mode = mode
+        self.seconds = seconds
+        self.interval = interval
+        self.samples = 0
+        self.idle_samples = 0
+        self.stacks = Counter()
+        self.by_route = Counter()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, ready for flamegraph.pl or speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": self.mode,
+            "seconds": self.seconds,
+            "interval": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "by_route": dict(self.by_route.most_common()),
+            "stacks": dict(self.stacks.most_common())
+        }
+
+def signal_sampling_available() -> bool:
+    """SIGPROF sampling needs setitimer and must be set up from the main thread"""
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+class StackSampler:
+    """
+    Sampling profiler for the running process
+
+    Nothing is installed in the profiled code; each sample is one stack
+    walk, so the process runs normally while it is profiled. Two modes:
+
+      signal - a SIGPROF interval timer interrupts the main thread (the
+               event loop under uvicorn) every `interval` seconds of CPU
+               time and the handler records the interrupted stack. Samples
+               are proportional to CPU use, which is what attribution
+               needs; other threads are not seen.
+      thread - a background thread reads every thread's stack with
+               sys._current_frames() every `interval` seconds of wall
+               time. Works anywhere, but a busy thread is mostly caught
+               where it releases the GIL (e.g. in select), so CPU-bound
+               code is under-represented.
+
+    The root of each stack is the request it was running for, as
+    "GET /data" (found through the MetricsMiddleware frame on the stack),
+    or "[thread name]" for work outside a request. Samples where a thread
+    is only waiting (event loop in select, idle pool threads) are counted
+    as idle and left out unless `include_idle` is set.
+    """
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self._labels = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module, name = _frame_label(code)
+            label = self._labels[code] = f"{module}:{name}"
+        return label
+
+    def _sample(self, frame, thread_name: str, result: ProfileResult):
+        if not self.include_idle and is_idle_frame(frame.f_code):
+            result.idle_samples += 1
+            return
+
+        labels = []
+        route = None
+        while frame is not None:
+            if route is None:
+                route = route_from_frame(frame)
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+
+        root = route or f"[{thread_name}]"
+        labels.append(root)
+        labels.reverse()
+        result.stacks[";".join(labels)] += 1
+        result.by_route[root] += 1
+        result.samples += 1
+
+    async def run_signal(self, seconds: float) -> ProfileResult:
+        """Sample the main thread on SIGPROF for `seconds`; call from the main thread"""
+        result = ProfileResult("signal", seconds, self.interval)
+
+        def handler(signum, frame):
+            if frame is not None:
+                self._sample(frame, "MainThread", result)
+
+        previous = signal.signal(signal.SIGPROF, handler)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+        return result
+
+    def run_threads(self, seconds: float) -> ProfileResult:
+        """Sample all other threads for `seconds`, blocking the calling thread"""
+        result = ProfileResult("thread", seconds, self.interval)
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for thread_id, frame in frames.items():
+                if thread_id != own_id:
+                    self._sample(frame, names.get(thread_id, str(thread_id)), result)
+            # Do not keep other threads' frames alive between samples
+            frames = frame = None
+
+            next_sample += self.interval
+            now = time.monotonic()
+            if next_sample >= deadline:
+                break
+            if next_sample > now:
+                time.sleep(next_sample - now)
+            else:
+                # Fell behind (e.g. GIL contention); skip rather than burst
+                next_sample = now
+        return result
+
+_profile_lock = threading.Lock()
+
+async def run_profile(seconds: float, interval: float, include_idle: bool = False,
+                      mode: str = "auto") -> ProfileResult:
+    """
+    Profile the process for `seconds`, one run at a time
+
+    `mode` is "signal", "thread" or "auto" (signal where available).
+    Raises ProfilerBusy if another profile is already running and
+    ValueError if signal mode was asked for but cannot be used.
+    """
+    if mode == "auto":
+        mode = "signal" if signal_sampling_available() else "thread"
+    elif mode == "signal" and not signal_sampling_available():
+        raise ValueError("Signal sampling needs setitimer and the event loop in the main thread")
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        sampler = StackSampler(interval, include_idle)
+        if mode == "signal":
+            return await sampler.run_signal(seconds)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, sampler.run_threads, seconds)
+    finally:
+        _profile_lock.release()
@@ -1,9 +1,25 @@
+import time
+
+# Phase timing starts before any heavy import
+_IMPORT_START = time.perf_counter()
+
 from fastapi import FastAPI
-from app.routers import api, health
+from app.config import settings
+from app.routers import api, bulk, health, metrics
 from app.middleware.metrics_middleware import MetricsMiddleware
-from prometheus_client import make_asgi_app
-from app.metrics.system_metrics import get_metrics_registry
-import uvicorn
+from app.middleware.admission import AdmissionMiddleware
+from app.metrics.system_metrics import start_metrics_collection
+from app.metrics.exposition import CachedMetricsApp
+from app.metrics.multiprocess import start_multiprocess_publisher, mark_current_worker_dead
+from app.metrics.startup_metrics import record_startup_phase, get_startup_phases
+from app.metrics.timeseries import start_timeseries_store, stop_timeseries_store
+from app.diagnostics import start_loop_monitor, stop_loop_monitor
+from app.storage import get_storage
+from app.processing.jobs import get_job_queue
+import asyncio
+
+_SETUP_START = time.perf_counter()
+record_startup_phase("imports", _SETUP_START - _IMPORT_START)
 
 app = FastAPI(
     title="Metrics Monitoring System",
@@ -11,21 +27,128 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control runs inside the metrics middleware, so shed requests
+# (503) and queueing time show up in the HTTP metrics
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # Middleware for metrics
-app.add_middleware(MetricsMiddleware)
+if settings.HTTP_METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Routers
 app.include_router(api.router)
+app.include_router(bulk.router)
 app.include_router(health.router)
+# Debug endpoints are only imported when enabled; otherwise /debug/* is a plain 404
+if settings.DEBUG_ENDPOINTS_ENABLED:
+    from app.routers import debug
+    app.include_router(debug.router)
+# JSON views under /metrics/ must be routed before the exposition mount
+app.include_router(metrics.router)
 
-# Mount Prometheus metrics endpoint with our custom registry
-metrics_app = make_asgi_app(registry=get_metrics_registry())
+# Mount Prometheus metrics endpoint with our custom registry, rendered at
+# most once per METRICS_RENDER_INTERVAL and shared by all scrapers. The
+# registry (and the system metrics behind it) is set up on first use.
+metrics_app = CachedMetricsApp()
 app.mount("/metrics", metrics_app)
 
+record_startup_phase("app_setup", time.perf_counter() - _SETUP_START)
+
+def warm_up():
+    """
+    Work that only has to be done before the first scrape or write
+
+    Reads the static process info and the CPU baseline, opens the
+    storage backend (e.g. the SQLite file and its writer thread) and
+    starts the processing pool's workers. Runs in a worker thread.
+    """
+    start_metrics_collection().refresh()
+    get_storage()
+    get_job_queue().warm_up()
+
+async def deferred_startup():
+    """Run warm_up once the server is accepting connections"""
+    # uvicorn binds its socket right after the startup hooks return; yield
+    # first so this runs behind that instead of in front of it
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+    except Exception as e:
+        print(f"Error during deferred startup: {e}")
+    record_startup_phase("deferred_warmup", time.perf_counter() - start)
+    phases = ", ".join(f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in get_startup_phases().items())
+    print(f"Startup phases: {phases}")
+
+_deferred_task = None
+
+@app.on_event("startup")
+async def startup():
+    global _deferred_task
+    start = time.perf_counter()
+
+    # Multi-process mode: publish this worker's values
+    start_multiprocess_publisher()
+
+    # Event loop lag / blocking-call detection
+    if settings.LOOP_MONITOR_ENABLED:
+        start_loop_monitor(
+            settings.LOOP_MONITOR_INTERVAL,
+            settings.LOOP_BLOCK_THRESHOLD,
+            settings.LOOP_BLOCK_HISTORY
+        )
+
+    # Optional push of metric deltas; imported only when enabled
+    if settings.PUSH_EXPORTER_ENABLED:
+        from app.metrics.push_exporter import start_push_exporter, parse_headers
+        start_push_exporter(
+            settings.PUSH_EXPORTER_ENDPOINT,
+            settings.PUSH_EXPORTER_INTERVAL,
+            timeout=settings.PUSH_EXPORTER_TIMEOUT,
+            max_queue_bytes=settings.PUSH_EXPORTER_MAX_QUEUE_BYTES,
+            max_retries=settings.PUSH_EXPORTER_MAX_RETRIES,
+            backoff_max=settings.PUSH_EXPORTER_BACKOFF_MAX,
+            headers=parse_headers(settings.PUSH_EXPORTER_HEADERS)
+        )
+
+    # Short-term history for /metrics/query
+    if settings.TIMESERIES_ENABLED:
+        start_timeseries_store(
+            settings.TIMESERIES_METRICS,
+            settings.TIMESERIES_RESOLUTIONS,
+            settings.TIMESERIES_MAX_SERIES
+        )
+
+    # Queue and consumers for offloaded POST /data processing; the pool's
+    # workers are started in deferred_startup
+    get_job_queue().start()
+
+    _deferred_task = asyncio.create_task(deferred_startup())
+    record_startup_phase("lifespan_startup", time.perf_counter() - start)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_loop_monitor()
+    stop_timeseries_store()
+    # Fails queued jobs and stops the pool before storage is closed
+    await get_job_queue().stop()
+    # Flush pending storage writes before the worker exits
+    await get_storage().close()
+    # Push whatever was recorded since the last interval
+    if settings.PUSH_EXPORTER_ENABLED:
+        from app.metrics.push_exporter import stop_push_exporter
+        await asyncio.get_running_loop().run_in_executor(
+            None, stop_push_exporter, settings.PUSH_EXPORTER_SHUTDOWN_TIMEOUT
+        )
+    # Multi-process mode: clean up this worker's live gauges
+    mark_current_worker_dead()
+
 # Root endpoint
 @app.get("/")
 async def root():
     return {"message": "FastAPI Metrics Monitoring System", "version": "1.0.0"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,26 +1,26 @@
 """
 Metrics collection modules
+
+The names below are resolved on first access, so importing one metrics
+module (e.g. from a processing worker or a benchmark) does not import
+and register the HTTP and system metrics as well.
 """
 
-# Import specific metrics to avoid duplication
-from .system_metrics import (
-    process_cpu_seconds_total,
-    process_resident_memory_bytes,
-    process_virtual_memory_bytes,
-    start_metrics_collection
-)
-from .http_metrics import (
-    REQUEST_COUNT,
-    REQUEST_LATENCY,
-    record_request_metrics
-)
+_EXPORTS = {
+    'process_cpu_seconds_total': 'system_metrics',
+    'process_resident_memory_bytes': 'system_metrics',
+    'process_virtual_memory_bytes': 'system_metrics',
+    'start_metrics_collection': 'system_metrics',
+    'REQUEST_COUNT': 'http_metrics',
+    'REQUEST_LATENCY': 'http_metrics',
+    'record_request_metrics': 'http_metrics'
+}
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f"{__name__}.{module}"), name)
 
-__all__ = [
-    'process_cpu_seconds_total',
-    'process_resident_memory_bytes', 
-    'process_virtual_memory_bytes',
-    'start_metrics_collection',
-    'REQUEST_COUNT',
-    'REQUEST_LATENCY',
-    'record_request_metrics'
-]
\ No newline at end of file
+__all__ = list(_EXPORTS)
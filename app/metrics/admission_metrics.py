@@ -0,0 +1,42 @@
+from prometheus_client import Counter, Gauge, Histogram
+from app.metrics.system_metrics import METRICS_REGISTRY
+
+# Admission control metrics (see app/middleware/admission.py), per route class
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive concurrency limit",
+    ["route_class"],
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+ADMISSION_INFLIGHT = Gauge(
+    "admission_inflight_requests",
+    "Requests admitted and still running",
+    ["route_class"],
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for a concurrency slot",
+    ["route_class"],
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+ADMISSION_SHED = Counter(
+    "admission_shed_total",
+    "Requests rejected with 503 by admission control",
+    ["route_class", "reason"],
+    registry=METRICS_REGISTRY
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent waiting for a slot",
+    ["route_class"],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf')],
+    registry=METRICS_REGISTRY
+)
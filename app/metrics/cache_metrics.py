@@ -0,0 +1,17 @@
+from prometheus_client import Counter
+from app.metrics.system_metrics import METRICS_REGISTRY
+
+# Response cache metrics (see app/cache.py)
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Cacheable requests by result (hit, miss, coalesced, not_modified)",
+    ["cache", "result"],
+    registry=METRICS_REGISTRY
+)
+
+CACHE_BYTES_SAVED = Counter(
+    "response_cache_bytes_saved_total",
+    "Response bytes served from cache or not sent at all (304) instead of rendered",
+    ["cache"],
+    registry=METRICS_REGISTRY
+)
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# Label value used once a metric has exhausted its series budget
+OVERFLOW_LABEL = "__overflow__"
+
+class SeriesLimiter:
+    """
+    Hard cap on the number of labeled children of a single metric
+
+    Every label tuple handed to `resolve` is tracked in LRU order. When the
+    budget is full, the least recently used child is removed from the
+    metric if it has been idle for at least `idle_seconds`; otherwise the
+    observation is folded into a single `__overflow__` child. Memory and
+    scrape size therefore stay bounded whatever traffic arrives.
+    """
+
+    def __init__(self, metric, max_series: int, idle_seconds: float,
+                 can_evict: Optional[Callable[[Tuple[str, ...]], bool]] = None,
+                 on_evict: Optional[Callable[[Tuple[str, ...]], None]] = None):
+        self.metric = metric
+        self.max_series = max_series
+        self.idle_seconds = idle_seconds
+        self.can_evict = can_evict
+        self.on_evict = on_evict
+        self.overflow_labels = tuple(OVERFLOW_LABEL for _ in metric._labelnames)
+        self.evictions = 0
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Return the label values to record under, admitting `labels` if possible"""
+        now = time.monotonic()
+        with self._lock:
+            if labels in self._series:
+                self._series.move_to_end(labels)
+                self._series[labels] = now
+                return labels
+
+            if len(self._series) >= self.max_series and not self._evict_oldest(now):
+                return self.overflow_labels
+
+            self._series[labels] = now
+            return labels
+
+    def touch(self, labels: Tuple[str, ...], now: float):
+        """
+        Mark an already admitted child as used without taking the lock
+
+        Used by cached child handles on the hot path. The LRU order is
+        not updated here; `_evict_oldest` gives touched entries a second
+        chance instead.
+        """
+        if labels in self._series:
+            self._series[labels] = now
+
+    def _evict_oldest(self, now: float) -> bool:
+        """Drop the least recently used child if it is idle; caller holds the lock"""
+        # Entries touched since they were last moved carry a newer timestamp
+        # than their position implies; rotate them to the back and keep looking
+        for _ in range(len(self._series)):
+            oldest, last_used = next(iter(self._series.items()))
+            if now - last_used < self.idle_seconds:
+                self._series.move_to_end(oldest)
+                continue
+            if self.can_evict is not None and not self.can_evict(oldest):
+                self._series.move_to_end(oldest)
+                continue
+
+            del self._series[oldest]
+            try:
+                self.metric.remove(*oldest)
+            except KeyError:
+                # Child was never created (e.g. size histograms skip empty bodies)
+                pass
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(oldest)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._series)
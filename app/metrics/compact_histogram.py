@@ -0,0 +1,167 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterable, Optional, Tuple
+import prometheus_client.metrics
+from prometheus_client import Histogram
+from prometheus_client.core import HistogramMetricFamily
+from prometheus_client.samples import Exemplar
+from prometheus_client.utils import floatToGoString
+
+class CompactHistogramChild:
+    """One labeled series: an offset into the family's storage"""
+
+    __slots__ = ("_family", "_offset")
+
+    def __init__(self, family: "CompactHistogram", offset: int):
+        self._family = family
+        self._offset = offset
+
+    def observe(self, amount: float, exemplar: Optional[Dict[str, str]] = None):
+        family = self._family
+        bucket = bisect_left(family._upper_bounds, amount)
+        with family._lock:
+            offset = self._offset
+            # Removed while a caller still held it; like an orphaned
+            # prometheus_client child, the observation goes nowhere
+            if offset < 0:
+                return
+            data = family._data
+            data[offset + bucket] += 1.0
+            data[offset + family._sum_index] += amount
+            if exemplar:
+                family._exemplars.setdefault(offset, {})[bucket] = Exemplar(exemplar, amount, time.time())
+
+class CompactHistogram:
+    """
+    Histogram family keeping every child in one contiguous array('d')
+
+    A prometheus_client Histogram child is a tree of objects: a value
+    with its own lock per bucket, plus sum and created, around 2 KB for
+    the default buckets. Here a child is a row of the shared array
+    (per-bucket counts, then the sum) and a two-slot handle, so a family
+    with thousands of label sets costs tens of bytes per bucket and one
+    lock. Rows are allocated `block_size` at a time and reused after
+    `remove`. The bucket is found by bisection.
+
+    Supports what the request recording uses: `labels` (positional or by
+    name), `observe` with exemplars, `remove`, `clear` and the collector
+    interface, producing the same samples as a Histogram. Values live in
+    this process only; multi-process mode needs prometheus_client's
+    Histogram and its mmap files instead.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = Histogram.DEFAULT_BUCKETS,
+                 registry=None, block_size: int = 64):
+        self._name = name
+        self._documentation = documentation
+        self._labelnames = tuple(labelnames)
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or bounds[-1] != float("inf"):
+            bounds.append(float("inf"))
+        self._upper_bounds = tuple(bounds)
+        self._bucket_names = [floatToGoString(b) for b in bounds]
+        # Row layout: one count per bucket (not cumulative), then the sum
+        self._sum_index = len(bounds)
+        self._width = len(bounds) + 1
+        self._block_size = block_size
+        self._data = array("d")
+        self._created = array("d")
+        self._free = []
+        self._children: Dict[Tuple[str, ...], CompactHistogramChild] = {}
+        self._exemplars: Dict[int, Dict[int, Exemplar]] = {}
+        self._lock = threading.Lock()
+        if not self._labelnames:
+            self.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def _allocate(self) -> int:
+        """Offset of a zeroed free row; caller holds the lock"""
+        if not self._free:
+            rows = len(self._created)
+            self._data.frombytes(bytes(8 * self._width * self._block_size))
+            self._created.frombytes(bytes(8 * self._block_size))
+            self._free = [(rows + i) * self._width for i in reversed(range(self._block_size))]
+        offset = self._free.pop()
+        self._created[offset // self._width] = time.time()
+        return offset
+
+    def _release(self, child: CompactHistogramChild):
+        """Zero a child's row and make it reusable; caller holds the lock"""
+        offset = child._offset
+        child._offset = -1
+        self._data[offset:offset + self._width] = array("d", bytes(8 * self._width))
+        self._exemplars.pop(offset, None)
+        self._free.append(offset)
+
+    def _label_values(self, labelvalues: tuple, labelkwargs: dict) -> Tuple[str, ...]:
+        if labelkwargs:
+            if labelvalues or sorted(labelkwargs) != sorted(self._labelnames):
+                raise ValueError("Incorrect label names")
+            labelvalues = tuple(labelkwargs[name] for name in self._labelnames)
+        elif len(labelvalues) != len(self._labelnames):
+            raise ValueError("Incorrect label count")
+        return tuple(str(value) for value in labelvalues)
+
+    def labels(self, *labelvalues, **labelkwargs) -> CompactHistogramChild:
+        key = self._label_values(labelvalues, labelkwargs)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = CompactHistogramChild(self, self._allocate())
+        return child
+
+    def observe(self, amount: float, exemplar: Optional[Dict[str, str]] = None):
+        """Observe on the family itself; only for histograms without labels"""
+        if self._labelnames:
+            raise ValueError("Histogram has labels; use .labels() first")
+        self.labels().observe(amount, exemplar)
+
+    def remove(self, *labelvalues):
+        key = tuple(str(value) for value in labelvalues)
+        with self._lock:
+            child = self._children.pop(key)
+            self._release(child)
+
+    def clear(self):
+        with self._lock:
+            for child in self._children.values():
+                self._release(child)
+            self._children.clear()
+
+    def describe(self):
+        yield HistogramMetricFamily(self._name, self._documentation, labels=self._labelnames)
+
+    def collect(self):
+        # Copy under the lock (a memcpy), build the samples outside it
+        with self._lock:
+            data = self._data[:]
+            created = self._created[:]
+            series = [(key, child._offset) for key, child in self._children.items()]
+            exemplars = {offset: dict(row) for offset, row in self._exemplars.items()}
+
+        family = HistogramMetricFamily(self._name, self._documentation, labels=self._labelnames)
+        names = self._bucket_names
+        width = self._width
+        use_created = prometheus_client.metrics._use_created
+        for key, offset in series:
+            counts = accumulate(data[offset:offset + self._sum_index])
+            row_exemplars = exemplars.get(offset)
+            if row_exemplars:
+                buckets = [(names[i], count, row_exemplars.get(i)) for i, count in enumerate(counts)]
+            else:
+                buckets = list(zip(names, counts))
+            family.add_metric(key, buckets, data[offset + self._sum_index])
+            if use_created:
+                family.add_sample(
+                    self._name + "_created",
+                    dict(zip(self._labelnames, key)),
+                    created[offset // width]
+                )
+        yield family
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import time
+import zlib
+from typing import List, NamedTuple
+from prometheus_client import make_asgi_app, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.exposition import choose_encoder, gzip_accepted
+from app.config import settings
+
+class MetricsSnapshot(NamedTuple):
+    """One rendered scrape: plain and gzip'd body chunks plus their ETag"""
+    rendered_at: float
+    etag: bytes
+    identity: List[bytes]
+    identity_length: int
+    gzipped: List[bytes]
+    gzipped_length: int
+
+class _SingleFamily:
+    """Registry-shaped view over one metric family, for generate_latest"""
+
+    def __init__(self, metric):
+        self.metric = metric
+
+    def collect(self):
+        return [self.metric]
+
+def render_snapshot(registry, compresslevel: int = 6) -> MetricsSnapshot:
+    """
+    Render the registry once into text and gzip chunks
+
+    Each metric family is encoded and fed to the compressor and the hash
+    on its own, so no single string holding the whole exposition is built.
+    """
+    identity = []
+    gzipped = []
+    digest = hashlib.blake2b(digest_size=8)
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+
+    for metric in registry.collect():
+        chunk = generate_latest(_SingleFamily(metric))
+        identity.append(chunk)
+        digest.update(chunk)
+        compressed = compressor.compress(chunk)
+        if compressed:
+            gzipped.append(compressed)
+    gzipped.append(compressor.flush())
+
+    return MetricsSnapshot(
+        rendered_at=time.monotonic(),
+        etag=f'"{digest.hexdigest()}"'.encode(),
+        identity=identity,
+        identity_length=sum(len(chunk) for chunk in identity),
+        gzipped=gzipped,
+        gzipped_length=sum(len(chunk) for chunk in gzipped)
+    )
+
+class CachedMetricsApp:
+    """
+    ASGI app serving /metrics from a snapshot re-rendered at most once per TTL
+
+    Rendering runs in the default thread pool so a large registry never
+    stalls the event loop, and concurrent scrapers that find the snapshot
+    stale wait for a single render. Plain and gzip'd bodies and the ETag
+    are kept ready; bodies are sent in chunks of `chunk_size` bytes.
+
+    Requests the cache does not cover (OpenMetrics format, `name[]`
+    filtering) are passed to prometheus_client's own ASGI app.
+
+    Without a `registry`, get_metrics_registry() is resolved on the first
+    scrape, so building the app does not initialize the system metrics.
+    """
+
+    def __init__(self, registry=None, ttl: float = None, chunk_size: int = None):
+        self._registry = registry
+        self.ttl = settings.METRICS_RENDER_INTERVAL if ttl is None else ttl
+        self.chunk_size = chunk_size or settings.METRICS_CHUNK_SIZE
+        self._fallback_app = None
+        self._snapshot = None
+        self._render_lock = asyncio.Lock()
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            from app.metrics.system_metrics import get_metrics_registry
+            self._registry = get_metrics_registry()
+        return self._registry
+
+    async def _fallback(self, scope, receive, send):
+        if self._fallback_app is None:
+            self._fallback_app = make_asgi_app(registry=self.registry)
+        await self._fallback_app(scope, receive, send)
+
+    def _is_fresh(self, snapshot) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.rendered_at < self.ttl
+
+    async def get_snapshot(self) -> MetricsSnapshot:
+        """Return a fresh snapshot, rendering it off the event loop if needed"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._render_lock:
+            # Another scraper may have rendered while we waited
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, render_snapshot, self.registry)
+            self._snapshot = snapshot
+            return snapshot
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("query_string"):
+            await self._fallback(scope, receive, send)
+            return
+
+        headers = {}
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").lower()
+            if name in ("accept", "accept-encoding", "if-none-match"):
+                headers[name] = value.decode("latin-1")
+
+        _, content_type = choose_encoder(headers.get("accept"))
+        if content_type != CONTENT_TYPE_LATEST:
+            await self._fallback(scope, receive, send)
+            return
+
+        snapshot = await self.get_snapshot()
+        response_headers = [
+            (b"content-type", CONTENT_TYPE_LATEST.encode()),
+            (b"etag", snapshot.etag),
+            (b"vary", b"Accept-Encoding")
+        ]
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and snapshot.etag.decode() in [tag.strip() for tag in if_none_match.split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if gzip_accepted(headers.get("accept-encoding")):
+            chunks, length = snapshot.gzipped, snapshot.gzipped_length
+            response_headers.append((b"content-encoding", b"gzip"))
+        else:
+            chunks, length = snapshot.identity, snapshot.identity_length
+        response_headers.append((b"content-length", str(length).encode()))
+
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        for body in self._coalesce(chunks):
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    def _coalesce(self, chunks: List[bytes]):
+        """Group small per-family chunks into sends of about chunk_size bytes"""
+        pending = []
+        pending_size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= self.chunk_size:
+                yield b"".join(pending)
+                pending = []
+                pending_size = 0
+        if pending:
+            yield b"".join(pending)
@@ -1,7 +1,36 @@
 from prometheus_client import Counter, Histogram, Gauge
 from app.metrics.system_metrics import METRICS_REGISTRY
+from app.metrics.cardinality import SeriesLimiter
+from app.metrics.buffering import ObservationBuffer
+from app.metrics.rates import RateEngine
+from app.metrics.sketch import SketchFamily
+from app.metrics.compact_histogram import CompactHistogram
+from app.metrics.multiprocess import is_multiprocess_enabled
+from app.config import settings
 import time
 
+# The request metrics are created and registered at import, on purpose:
+# that takes about 1 ms (benchmarks.import_time puts app.main at ~2 s,
+# nearly all fastapi), and it keeps the per-request path free of
+# initialization checks. Importing other app.metrics modules no longer
+# pulls this one in (see app/metrics/__init__.py).
+
+# Buffered recording mode: observations are queued per thread and folded
+# into the metrics below at scrape time. Registered first so the fold runs
+# before any of them is collected.
+OBSERVATION_BUFFER = ObservationBuffer(
+    fold=lambda pending: _fold_observations(pending),
+    max_pending=settings.HTTP_METRICS_BUFFER_SIZE
+)
+if settings.HTTP_METRICS_BUFFERED:
+    METRICS_REGISTRY.register(OBSERVATION_BUFFER)
+
+def _request_histogram(name, documentation, labelnames, buckets):
+    """Per-request histogram: compact unless disabled or values must be shared across processes"""
+    if settings.HTTP_COMPACT_HISTOGRAMS and not is_multiprocess_enabled():
+        return CompactHistogram(name, documentation, labelnames, buckets=buckets, registry=METRICS_REGISTRY)
+    return Histogram(name, documentation, labelnames, buckets=buckets, registry=METRICS_REGISTRY)
+
 # HTTP Request Metrics using our custom registry
 REQUEST_COUNT = Counter(
     "http_requests_total",
@@ -10,27 +39,70 @@ REQUEST_COUNT = Counter(
     registry=METRICS_REGISTRY
 )
 
-REQUEST_LATENCY = Histogram(
+REQUEST_LATENCY = _request_histogram(
     "http_request_duration_seconds",
     "Request duration in seconds",
     ["method", "endpoint"],
-    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, float('inf')],
-    registry=METRICS_REGISTRY
+    buckets=settings.get_custom_buckets("latency")
+)
+
+# Relative-error quantiles of the same latencies, per (method, endpoint).
+# Series follow REQUEST_LATENCY's: same labels, evicted together.
+LATENCY_SKETCHES = SketchFamily(
+    "http_request_duration_sketch_seconds",
+    "Request duration quantiles in seconds over a sliding window",
+    ["method", "endpoint"],
+    quantiles=settings.LATENCY_QUANTILES,
+    window=settings.SKETCH_WINDOW_SECONDS,
+    relative_accuracy=settings.SKETCH_RELATIVE_ACCURACY,
+    max_bins=settings.SKETCH_MAX_BINS
 )
+if not is_multiprocess_enabled():
+    METRICS_REGISTRY.register(LATENCY_SKETCHES)
 
-REQUEST_SIZE = Histogram(
+REQUEST_SIZE = _request_histogram(
     "http_request_size_bytes",
     "HTTP request size in bytes",
     ["method", "endpoint"],
-    buckets=[1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, float('inf')],
-    registry=METRICS_REGISTRY
+    buckets=settings.get_custom_buckets("size")
 )
 
-RESPONSE_SIZE = Histogram(
+RESPONSE_SIZE = _request_histogram(
     "http_response_size_bytes",
     "HTTP response size in bytes",
     ["method", "endpoint", "status_code"],
-    buckets=[1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, float('inf')],
+    buckets=settings.get_custom_buckets("size")
+)
+
+# Per-request resource attribution (HTTP_RESOURCE_METRICS / HTTP_ALLOC_SAMPLE_RATE)
+REQUEST_CPU = _request_histogram(
+    "http_request_cpu_seconds",
+    "CPU time spent running the request's own code in seconds",
+    ["method", "endpoint"],
+    buckets=[0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf')]
+)
+
+REQUEST_MEMORY_GROWTH = _request_histogram(
+    "http_request_peak_memory_growth_bytes",
+    "Peak traced memory growth during the request's own steps in bytes (sampled requests)",
+    ["method", "endpoint"],
+    buckets=[1000, 10000, 100000, 1000000, 10000000, 100000000, 1000000000, float('inf')]
+)
+
+# Bulk ingestion metrics (POST /data/bulk)
+BULK_REQUEST_SIZE = Histogram(
+    "http_bulk_request_size_bytes",
+    "Bulk ingestion request body size in bytes",
+    ["format"],
+    buckets=[1000, 10000, 100000, 1000000, 10000000, 100000000, float('inf')],
+    registry=METRICS_REGISTRY
+)
+
+BULK_BATCH_SIZE = Histogram(
+    "http_bulk_batch_size",
+    "Number of records per bulk ingestion request",
+    ["format"],
+    buckets=[1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, float('inf')],
     registry=METRICS_REGISTRY
 )
 
@@ -39,93 +111,285 @@ ACTIVE_REQUESTS = Gauge(
     "http_requests_active",
     "Number of active HTTP requests",
     ["method", "endpoint"],
-    registry=METRICS_REGISTRY
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
 )
 
-# Request rate gauge (requests per second)
+# Request rate gauge (requests per second), one child per rate window.
+# Not registered directly: RATE_ENGINE refreshes and exposes them on scrape.
 REQUEST_RATE = Gauge(
     "http_requests_per_second",
     "HTTP requests per second",
-    ["method", "endpoint"],
-    registry=METRICS_REGISTRY
+    ["method", "endpoint", "window"],
+    registry=None,
+    multiprocess_mode="livesum"
 )
 
-# Error rate gauge
+# Error rate gauge (5xx responses per second)
 ERROR_RATE = Gauge(
     "http_errors_per_second",
     "HTTP errors per second",
-    ["method", "endpoint"],
-    registry=METRICS_REGISTRY
+    ["method", "endpoint", "window"],
+    registry=None,
+    multiprocess_mode="livesum"
 )
 
+RATE_ENGINE = RateEngine(REQUEST_RATE, ERROR_RATE, windows=settings.RATE_WINDOWS)
+METRICS_REGISTRY.register(RATE_ENGINE)
+
 # Metrics for tracking application health
 LAST_REQUEST_TIME = Gauge(
     "http_last_request_time_seconds",
     "Timestamp of the last HTTP request",
-    registry=METRICS_REGISTRY
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="max"
 )
 
 # Application uptime
 APPLICATION_START_TIME = Gauge(
     "application_start_time_seconds",
     "Application start time in seconds since epoch",
-    registry=METRICS_REGISTRY
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livemin"
 )
 
 # Initialize application start time
-APPLICATION_START_TIME.set(time.time())
+_START_TIME = time.time()
+APPLICATION_START_TIME.set(_START_TIME)
+
+# Wall-clock anchor for converting monotonic request timestamps
+_WALL_ANCHOR = time.time()
+_MONOTONIC_ANCHOR = time.monotonic()
+_last_request_monotonic = None
 
-def record_request_metrics(method: str, endpoint: str, status_code: int, duration: float, request_size: int = 0, response_size: int = 0):
+def get_last_request_time() -> float:
+    """Wall-clock time of the last recorded request (0 if none yet)"""
+    if _last_request_monotonic is None:
+        return 0.0
+    return _WALL_ANCHOR + (_last_request_monotonic - _MONOTONIC_ANCHOR)
+
+# Evaluated at scrape time instead of a locked set() per request. Functions
+# are not visible across processes, so in multi-process mode the worker
+# publisher sets it instead.
+if not is_multiprocess_enabled():
+    LAST_REQUEST_TIME.set_function(get_last_request_time)
+
+def _invalidate_handles(labels=None):
+    """Drop cached child handles after a limiter evicted a child"""
+    _handle_cache.clear()
+    _active_cache.clear()
+
+def _evict_latency_series(labels):
+    """REQUEST_LATENCY child evicted: drop its sketch as well"""
+    try:
+        LATENCY_SKETCHES.remove(*labels)
+    except KeyError:
+        pass
+    _invalidate_handles(labels)
+
+def _make_limiter(metric, can_evict=None, on_evict=_invalidate_handles):
+    return SeriesLimiter(
+        metric,
+        max_series=settings.METRICS_MAX_SERIES_PER_METRIC,
+        idle_seconds=settings.METRICS_SERIES_IDLE_SECONDS,
+        can_evict=can_evict,
+        on_evict=on_evict
+    )
+
+# Per-metric series budgets for the labeled request metrics
+REQUEST_COUNT_LIMITER = _make_limiter(REQUEST_COUNT)
+REQUEST_LATENCY_LIMITER = _make_limiter(REQUEST_LATENCY, on_evict=_evict_latency_series)
+REQUEST_SIZE_LIMITER = _make_limiter(REQUEST_SIZE)
+RESPONSE_SIZE_LIMITER = _make_limiter(RESPONSE_SIZE)
+REQUEST_CPU_LIMITER = _make_limiter(REQUEST_CPU)
+REQUEST_MEMORY_GROWTH_LIMITER = _make_limiter(REQUEST_MEMORY_GROWTH)
+# Never evict a gauge child while requests are still in flight on it
+ACTIVE_REQUESTS_LIMITER = _make_limiter(
+    ACTIVE_REQUESTS,
+    can_evict=lambda labels: labels not in _active_counts
+)
+
+class RequestHandles:
+    """
+    Pre-resolved metric children for one (method, endpoint, status_code)
+
+    Resolving through the limiters and `.labels()` happens once, when the
+    handles are built; the size and resource histogram children are
+    resolved on first use since many requests have no body and resource
+    metrics are optional.
+    """
+
+    __slots__ = (
+        "method", "endpoint", "status_code", "is_error",
+        "count_labels", "latency_labels", "count", "latency", "sketch",
+        "request_size_labels", "request_size",
+        "response_size_labels", "response_size",
+        "cpu_labels", "cpu", "memory_growth_labels", "memory_growth"
+    )
+
+    def __init__(self, method: str, endpoint: str, status_code: str):
+        self.method = method
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.is_error = int(status_code) >= 500
+        self.count_labels = REQUEST_COUNT_LIMITER.resolve((method, endpoint, status_code))
+        self.count = REQUEST_COUNT.labels(*self.count_labels)
+        self.latency_labels = REQUEST_LATENCY_LIMITER.resolve((method, endpoint))
+        self.latency = REQUEST_LATENCY.labels(*self.latency_labels)
+        self.sketch = LATENCY_SKETCHES.labels(*self.latency_labels)
+        self.request_size_labels = None
+        self.request_size = None
+        self.response_size_labels = None
+        self.response_size = None
+        self.cpu_labels = None
+        self.cpu = None
+        self.memory_growth_labels = None
+        self.memory_growth = None
+
+    def record(self, duration: float, request_size: int, response_size: int, now: float, exemplar=None):
+        """Apply one request's observations to the cached children"""
+        self.count.inc()
+        self.latency.observe(duration, exemplar)
+        self.sketch.observe(duration, now)
+        REQUEST_COUNT_LIMITER.touch(self.count_labels, now)
+        REQUEST_LATENCY_LIMITER.touch(self.latency_labels, now)
+        
+        if request_size > 0:
+            if self.request_size is None:
+                self.request_size_labels = REQUEST_SIZE_LIMITER.resolve((self.method, self.endpoint))
+                self.request_size = REQUEST_SIZE.labels(*self.request_size_labels)
+            self.request_size.observe(request_size)
+            REQUEST_SIZE_LIMITER.touch(self.request_size_labels, now)
+        
+        if response_size > 0:
+            if self.response_size is None:
+                self.response_size_labels = RESPONSE_SIZE_LIMITER.resolve(
+                    (self.method, self.endpoint, self.status_code)
+                )
+                self.response_size = RESPONSE_SIZE.labels(*self.response_size_labels)
+            self.response_size.observe(response_size)
+            RESPONSE_SIZE_LIMITER.touch(self.response_size_labels, now)
+
+    def record_resources(self, cpu_time: float, memory_growth_bytes, now: float):
+        """Apply one request's CPU time and (if traced) peak memory growth"""
+        if self.cpu is None:
+            self.cpu_labels = REQUEST_CPU_LIMITER.resolve((self.method, self.endpoint))
+            self.cpu = REQUEST_CPU.labels(*self.cpu_labels)
+        self.cpu.observe(cpu_time)
+        REQUEST_CPU_LIMITER.touch(self.cpu_labels, now)
+
+        if memory_growth_bytes is not None:
+            if self.memory_growth is None:
+                self.memory_growth_labels = REQUEST_MEMORY_GROWTH_LIMITER.resolve((self.method, self.endpoint))
+                self.memory_growth = REQUEST_MEMORY_GROWTH.labels(*self.memory_growth_labels)
+            self.memory_growth.observe(memory_growth_bytes)
+            REQUEST_MEMORY_GROWTH_LIMITER.touch(self.memory_growth_labels, now)
+
+# (method, endpoint, status_code) -> RequestHandles
+_handle_cache = {}
+# (method, endpoint) -> (labels, ACTIVE_REQUESTS child)
+_active_cache = {}
+# ACTIVE_REQUESTS labels -> requests in flight on them (only while > 0).
+# Counted here rather than read back from the gauge, whose value is not
+# public and lives in shared files in multi-process mode
+_active_counts = {}
+
+def get_request_handles(method: str, endpoint: str, status_code) -> RequestHandles:
+    """Return cached child handles, building them on first use"""
+    key = (method, endpoint, status_code)
+    handles = _handle_cache.get(key)
+    if handles is None:
+        # Methods come from clients; keep the cache as bounded as the metrics
+        if len(_handle_cache) >= settings.METRICS_MAX_SERIES_PER_METRIC:
+            _handle_cache.clear()
+        handles = RequestHandles(method, endpoint, str(status_code))
+        _handle_cache[key] = handles
+    return handles
+
+def _fold_observations(pending):
+    """Apply buffered (handles, duration, request_size, response_size, now, exemplar) tuples"""
+    for handles, duration, request_size, response_size, now, exemplar in pending:
+        handles.record(duration, request_size, response_size, now, exemplar)
+
+def record_request_metrics(method: str, endpoint: str, status_code: int, duration: float, request_size: int = 0, response_size: int = 0, exemplar: dict = None):
     """
     Record metrics for an HTTP request
     
     Args:
         method: HTTP method (GET, POST, etc.)
-        endpoint: Request endpoint/path
+        endpoint: Route template (e.g. /items/{id}), not the raw path
         status_code: HTTP status code
         duration: Request duration in seconds
         request_size: Size of request in bytes
         response_size: Size of response in bytes
+        exemplar: Labels (e.g. request_id) attached to the latency observation
     """
-    # Record request count
-    REQUEST_COUNT.labels(
-        method=method,
-        endpoint=endpoint,
-        status_code=status_code
-    ).inc()
+    global _last_request_monotonic
+    
+    handles = get_request_handles(method, endpoint, status_code)
+    now = time.monotonic()
+    
+    # Rates are always recorded live so buffering never skews their windows
+    RATE_ENGINE.record(handles.latency_labels, handles.is_error, now)
     
-    # Record request latency
-    REQUEST_LATENCY.labels(
-        method=method,
-        endpoint=endpoint
-    ).observe(duration)
+    if settings.HTTP_METRICS_BUFFERED:
+        OBSERVATION_BUFFER.append((handles, duration, request_size, response_size, now, exemplar))
+    else:
+        handles.record(duration, request_size, response_size, now, exemplar)
     
-    # Record request size if provided
-    if request_size > 0:
-        REQUEST_SIZE.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(request_size)
+    # Update last request time (converted to wall clock at scrape)
+    _last_request_monotonic = now
+
+def record_request_resources(method: str, endpoint: str, status_code: int, cpu_time: float, memory_growth_bytes: int = None):
+    """
+    Record the CPU time and peak memory growth attributed to one request
     
-    # Record response size if provided
-    if response_size > 0:
-        RESPONSE_SIZE.labels(
-            method=method,
-            endpoint=endpoint,
-            status_code=status_code
-        ).observe(response_size)
+    Always applied directly, also in buffered mode: resource metering is
+    opt-in and already costs more than the observations themselves.
     
-    # Update last request time
-    LAST_REQUEST_TIME.set(time.time())
+    Args:
+        cpu_time: CPU seconds spent in the request's own code
+        memory_growth_bytes: Peak traced memory growth in bytes, or None if not traced
+    """
+    handles = get_request_handles(method, endpoint, status_code)
+    handles.record_resources(cpu_time, memory_growth_bytes, time.monotonic())
 
 def increment_active_requests(method: str, endpoint: str):
-    """Increment active requests counter"""
-    ACTIVE_REQUESTS.labels(method=method, endpoint=endpoint).inc()
+    """
+    Increment active requests counter
+    
+    Returns the (method, endpoint) labels actually used, which may be the
+    overflow labels; pass them back to decrement_active_requests.
+    """
+    key = (method, endpoint)
+    cached = _active_cache.get(key)
+    if cached is None:
+        if len(_active_cache) >= settings.METRICS_MAX_SERIES_PER_METRIC:
+            _active_cache.clear()
+        labels = ACTIVE_REQUESTS_LIMITER.resolve(key)
+        cached = (labels, ACTIVE_REQUESTS.labels(*labels))
+        _active_cache[key] = cached
+    else:
+        ACTIVE_REQUESTS_LIMITER.touch(cached[0], time.monotonic())
+    labels = cached[0]
+    _active_counts[labels] = _active_counts.get(labels, 0) + 1
+    cached[1].inc()
+    return labels
 
 def decrement_active_requests(method: str, endpoint: str):
     """Decrement active requests counter"""
-    ACTIVE_REQUESTS.labels(method=method, endpoint=endpoint).dec()
+    labels = (method, endpoint)
+    remaining = _active_counts.get(labels, 0) - 1
+    if remaining > 0:
+        _active_counts[labels] = remaining
+    else:
+        _active_counts.pop(labels, None)
+    cached = _active_cache.get(labels)
+    if cached is not None and cached[0] == labels:
+        cached[1].dec()
+    else:
+        ACTIVE_REQUESTS.labels(method, endpoint).dec()
 
 def get_application_uptime():
     """Get application uptime in seconds"""
-    return time.time() - APPLICATION_START_TIME._value._value
\ No newline at end of file
+    return time.time() - _START_TIME
\ No newline at end of file
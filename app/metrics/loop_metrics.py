@@ -0,0 +1,16 @@
+from prometheus_client import Counter, Histogram
+from app.metrics.system_metrics import METRICS_REGISTRY
+
+# Event loop responsiveness metrics
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer scheduled by the lag monitor",
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')],
+    registry=METRICS_REGISTRY
+)
+
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked longer than LOOP_BLOCK_THRESHOLD",
+    registry=METRICS_REGISTRY
+)
@@ -0,0 +1,129 @@
+import glob
+import os
+import threading
+import time
+from prometheus_client import CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+from app.config import settings
+
+# Multi-process mode is enabled by PROMETHEUS_MULTIPROC_DIR. prometheus_client
+# reads the same variable when it is first imported and then backs every
+# metric value with an mmap'd file per worker in that directory.
+
+def is_multiprocess_enabled() -> bool:
+    """Whether metrics are aggregated across worker processes"""
+    return bool(settings.PROMETHEUS_MULTIPROC_DIR)
+
+def _file_pid(path: str):
+    """Extract the worker pid from a value file name (e.g. gauge_livesum_123.db)"""
+    try:
+        return int(os.path.basename(path)[:-len(".db")].rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+def cleanup_dead_workers(path: str = None):
+    """
+    Remove live-gauge files left behind by workers that no longer exist
+
+    Counter/histogram files are kept on purpose: their totals still count.
+    Returns the pids that were cleaned up.
+    """
+    import psutil
+    path = path or settings.PROMETHEUS_MULTIPROC_DIR
+    dead = set()
+    for file_path in glob.glob(os.path.join(path, "gauge_live*.db")):
+        pid = _file_pid(file_path)
+        if pid is not None and pid not in dead and not psutil.pid_exists(pid):
+            dead.add(pid)
+    for pid in dead:
+        mark_process_dead(pid, path)
+    return dead
+
+class DeadWorkerCleanup:
+    """Collector that prunes dead workers' files right before aggregation"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        cleanup_dead_workers(self.path)
+        return []
+
+def build_multiprocess_registry(path: str = None) -> CollectorRegistry:
+    """
+    Build the registry served on /metrics in multi-process mode
+
+    It holds no metrics of its own; MultiProcessCollector merges every
+    worker's value files using each gauge's multiprocess_mode. Latency
+    sketches are not mmap-backed; they are merged from the files each
+    worker's publisher writes.
+    """
+    from app.metrics.http_metrics import LATENCY_SKETCHES
+    from app.metrics.sketch import PublishedSketchCollector
+    path = path or settings.PROMETHEUS_MULTIPROC_DIR
+    registry = CollectorRegistry()
+    registry.register(DeadWorkerCleanup(path))
+    MultiProcessCollector(registry, path=path)
+    registry.register(PublishedSketchCollector(LATENCY_SKETCHES, path))
+    return registry
+
+def publish_worker_metrics():
+    """
+    Write this worker's scrape-time values into its value files
+
+    In single-process mode these are computed when METRICS_REGISTRY is
+    collected; in multi-process mode the scrape may land on another
+    worker, so every worker publishes them on an interval instead.
+    """
+    from app.metrics.http_metrics import (
+        OBSERVATION_BUFFER,
+        RATE_ENGINE,
+        LAST_REQUEST_TIME,
+        LATENCY_SKETCHES,
+        get_last_request_time
+    )
+    from app.metrics.system_metrics import start_metrics_collection
+    start_metrics_collection().refresh()
+    OBSERVATION_BUFFER.flush()
+    RATE_ENGINE.refresh()
+    LATENCY_SKETCHES.publish(settings.PROMETHEUS_MULTIPROC_DIR)
+    last_request_time = get_last_request_time()
+    if last_request_time:
+        LAST_REQUEST_TIME.set(last_request_time)
+
+_publisher_thread = None
+_publisher_lock = threading.Lock()
+
+def _publish_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            publish_worker_metrics()
+        except Exception as e:
+            print(f"Error publishing worker metrics: {e}")
+
+def start_multiprocess_publisher():
+    """Start this worker's publisher thread (no-op outside multi-process mode)"""
+    global _publisher_thread
+
+    if not is_multiprocess_enabled():
+        return None
+
+    with _publisher_lock:
+        if _publisher_thread is None or not _publisher_thread.is_alive():
+            _publisher_thread = threading.Thread(
+                target=_publish_loop,
+                args=(settings.MULTIPROC_PUBLISH_INTERVAL,),
+                daemon=True
+            )
+            _publisher_thread.start()
+
+    return _publisher_thread
+
+def mark_current_worker_dead():
+    """Drop this worker's live-gauge files on shutdown"""
+    if is_multiprocess_enabled():
+        mark_process_dead(os.getpid(), settings.PROMETHEUS_MULTIPROC_DIR)
@@ -0,0 +1,53 @@
+from prometheus_client import Counter, Gauge, Histogram
+from app.metrics.system_metrics import METRICS_REGISTRY
+from app.config import settings
+
+# Offloaded processing metrics (see app/processing/jobs.py)
+PROCESSING_QUEUE_DEPTH = Gauge(
+    "processing_queue_depth",
+    "Jobs waiting for a pool worker",
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+PROCESSING_QUEUE_WAIT = Histogram(
+    "processing_queue_wait_seconds",
+    "Time jobs waited in the queue before a worker picked them up",
+    buckets=settings.get_custom_buckets("latency"),
+    registry=METRICS_REGISTRY
+)
+
+PROCESSING_JOB_DURATION = Histogram(
+    "processing_job_duration_seconds",
+    "Time jobs ran in a pool worker",
+    buckets=settings.get_custom_buckets("latency"),
+    registry=METRICS_REGISTRY
+)
+
+PROCESSING_JOBS = Counter(
+    "processing_jobs_total",
+    "Jobs by outcome (completed, failed, rejected when the queue was full)",
+    ["outcome"],
+    registry=METRICS_REGISTRY
+)
+
+PROCESSING_WORKERS = Gauge(
+    "processing_workers",
+    "Pool workers",
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+PROCESSING_WORKERS_BUSY = Gauge(
+    "processing_workers_busy",
+    "Pool workers running a job",
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+# rate() of this over processing_workers is the pool's utilization
+PROCESSING_BUSY_SECONDS = Counter(
+    "processing_worker_busy_seconds",
+    "Worker time spent running jobs",
+    registry=METRICS_REGISTRY
+)
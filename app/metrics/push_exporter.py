@@ -0,0 +1,380 @@
+import gzip
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from typing import Dict, Optional
+from prometheus_client import Counter, Gauge
+from app.metrics.system_metrics import METRICS_REGISTRY, start_metrics_collection
+
+# Exporter self-metrics; they are pushed along with everything else
+PUSH_POINTS = Counter(
+    "metrics_push_points_total",
+    "Data points accepted by the push receiver",
+    registry=METRICS_REGISTRY
+)
+
+PUSH_DROPPED_POINTS = Counter(
+    "metrics_push_dropped_points_total",
+    "Data points dropped before reaching the push receiver",
+    ["reason"],
+    registry=METRICS_REGISTRY
+)
+
+PUSH_RETRIES = Counter(
+    "metrics_push_retries_total",
+    "Push attempts retried after a failure",
+    registry=METRICS_REGISTRY
+)
+
+PUSH_QUEUE_BYTES = Gauge(
+    "metrics_push_queue_bytes",
+    "Encoded batches waiting to be pushed",
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+# OTLP AggregationTemporality
+TEMPORALITY_DELTA = 1
+
+def _attributes(labels: dict) -> list:
+    return [{"key": key, "value": {"stringValue": value}} for key, value in labels.items()]
+
+def _series_key(name: str, labels: dict) -> tuple:
+    return (name,) + tuple(sorted(labels.items()))
+
+class DeltaSnapshot:
+    """
+    Turns cumulative registry values into OTLP/JSON metrics
+
+    Counters and histograms are sent as deltas since the previous
+    snapshot (delta temporality), and only the series that changed are
+    included, so an idle worker sends almost nothing. Gauges are sent
+    as they are; summaries (latency sketches) keep cumulative _count and
+    _sum as OTLP defines them. A cumulative value that went down (the
+    series was evicted and recreated) counts from zero again.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._previous: Dict[tuple, object] = {}
+        self._start_ns = time.time_ns()
+
+    def _delta(self, key: tuple, value, current: dict):
+        current[key] = value
+        previous = self._previous.get(key)
+        if previous is None:
+            return value
+        if isinstance(value, tuple):
+            # Histograms: (bucket counts..., count, sum); reset if the count went down
+            if value[-2] < previous[-2] or len(value) != len(previous):
+                return value
+            return tuple(new - old for new, old in zip(value, previous))
+        return value if value < previous else value - previous
+
+    def take(self):
+        """(OTLP metric list, number of data points) since the last call"""
+        now_ns = time.time_ns()
+        start_ns = self._start_ns
+        current = {}
+        metrics = []
+        points = 0
+
+        for family in self.registry.collect():
+            if family.type in ("counter", "histogram"):
+                data_points = (self._counter_points if family.type == "counter"
+                               else self._histogram_points)(family, current, start_ns, now_ns)
+                kind = "sum" if family.type == "counter" else "histogram"
+                if not data_points:
+                    continue
+                data = {"aggregationTemporality": TEMPORALITY_DELTA, "dataPoints": data_points}
+                if kind == "sum":
+                    data["isMonotonic"] = True
+            elif family.type == "summary":
+                kind, data_points = "summary", self._summary_points(family, now_ns)
+                data = {"dataPoints": data_points}
+            elif family.type in ("gauge", "info", "unknown"):
+                kind = "gauge"
+                data_points = [
+                    {"attributes": _attributes(sample.labels), "timeUnixNano": str(now_ns),
+                     "asDouble": sample.value}
+                    for sample in family.samples
+                ]
+                data = {"dataPoints": data_points}
+            else:
+                continue
+            if data_points:
+                name = family.name + "_total" if family.type == "counter" else family.name
+                metrics.append({"name": name, "description": family.documentation, kind: data})
+                points += len(data_points)
+
+        # Series that disappeared (evicted) are forgotten
+        self._previous = current
+        self._start_ns = now_ns
+        return metrics, points
+
+    def _counter_points(self, family, current, start_ns, now_ns):
+        data_points = []
+        for sample in family.samples:
+            if not sample.name.endswith("_total"):
+                continue
+            delta = self._delta(_series_key(sample.name, sample.labels), sample.value, current)
+            if delta:
+                data_points.append({
+                    "attributes": _attributes(sample.labels),
+                    "startTimeUnixNano": str(start_ns),
+                    "timeUnixNano": str(now_ns),
+                    "asDouble": delta
+                })
+        return data_points
+
+    def _histogram_points(self, family, current, start_ns, now_ns):
+        # Group the _bucket/_count/_sum samples of each child
+        children = {}
+        for sample in family.samples:
+            if sample.name.endswith("_bucket"):
+                labels = {k: v for k, v in sample.labels.items() if k != "le"}
+                child = children.setdefault(_series_key(family.name, labels), [labels, [], 0.0])
+                child[1].append((float(sample.labels["le"]), sample.value))
+            elif sample.name.endswith("_sum"):
+                children.setdefault(_series_key(family.name, sample.labels), [sample.labels, [], 0.0])[2] = sample.value
+
+        data_points = []
+        for key, (labels, buckets, total) in children.items():
+            buckets.sort()
+            cumulative = tuple(count for _, count in buckets) + (total,)
+            delta = self._delta(key, cumulative, current)
+            count = delta[-2]
+            if not count:
+                continue
+            # Cumulative bucket counts to per-bucket counts
+            per_bucket = [delta[0]] + [delta[i] - delta[i - 1] for i in range(1, len(buckets))]
+            data_points.append({
+                "attributes": _attributes(labels),
+                "startTimeUnixNano": str(start_ns),
+                "timeUnixNano": str(now_ns),
+                "count": str(int(count)),
+                "sum": delta[-1],
+                "bucketCounts": [str(int(c)) for c in per_bucket],
+                "explicitBounds": [bound for bound, _ in buckets[:-1]]
+            })
+        return data_points
+
+    def _summary_points(self, family, now_ns):
+        children = {}
+        for sample in family.samples:
+            labels = {k: v for k, v in sample.labels.items() if k != "quantile"}
+            child = children.setdefault(_series_key(family.name, labels),
+                                        {"attributes": _attributes(labels), "timeUnixNano": str(now_ns),
+                                         "count": "0", "sum": 0.0, "quantileValues": []})
+            if sample.name.endswith("_count"):
+                child["count"] = str(int(sample.value))
+            elif sample.name.endswith("_sum"):
+                child["sum"] = sample.value
+            elif "quantile" in sample.labels:
+                child["quantileValues"].append({"quantile": float(sample.labels["quantile"]),
+                                                "value": sample.value})
+        return list(children.values())
+
+class PushExporter:
+    """
+    Pushes METRICS_REGISTRY to an OTLP/HTTP receiver in batches
+
+    A snapshot thread takes a delta snapshot every `interval` seconds and
+    queues it gzip-compressed; a sender thread posts queued batches in
+    order. Queue memory is bounded by `max_queue_bytes`: when it is full
+    the oldest batch is dropped. Failed posts (connection errors, 429 and
+    5xx) are retried with exponential backoff and jitter up to
+    `max_retries` times; other 4xx responses are not retried. Every dropped
+    data point is counted in metrics_push_dropped_points_total{reason}.
+
+    Batches hold deltas, so a dropped batch is lost for good; the drop
+    counter is how the receiver side can tell.
+    """
+
+    def __init__(self, endpoint: str, interval: float = 10.0, timeout: float = 5.0,
+                 max_queue_bytes: int = 8 * 1024 * 1024, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 headers: Optional[dict] = None, registry=METRICS_REGISTRY):
+        self.endpoint = endpoint
+        self.interval = interval
+        self.timeout = timeout
+        self.max_queue_bytes = max_queue_bytes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = headers or {}
+        self.snapshot = DeltaSnapshot(registry)
+        self.resource = {"attributes": _attributes({
+            "service.name": "fastapi-metrics-app",
+            "service.instance.id": f"{socket.gethostname()}:{os.getpid()}"
+        })}
+
+        # (payload, points) oldest first
+        self._queue = deque()
+        self._queue_bytes = 0
+        self._condition = threading.Condition()
+        self._snapshot_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._snapshot_loop, "metrics-push-snapshot"),
+                             (self._send_loop, "metrics-push-sender")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def encode(self, metrics: list) -> bytes:
+        body = {"resourceMetrics": [{
+            "resource": self.resource,
+            "scopeMetrics": [{"scope": {"name": "app.metrics"}, "metrics": metrics}]
+        }]}
+        return gzip.compress(json.dumps(body, separators=(",", ":")).encode(), compresslevel=6)
+
+    def take_snapshot(self) -> int:
+        """Queue a batch with everything that changed since the last one; returns its points"""
+        start_metrics_collection()
+        with self._snapshot_lock:
+            metrics, points = self.snapshot.take()
+        if points:
+            self._enqueue(self.encode(metrics), points)
+        return points
+
+    def _enqueue(self, payload: bytes, points: int):
+        with self._condition:
+            self._queue.append((payload, points))
+            self._queue_bytes += len(payload)
+            # Drop the oldest batches, but always keep the newest one
+            while self._queue_bytes > self.max_queue_bytes and len(self._queue) > 1:
+                old_payload, old_points = self._queue.popleft()
+                self._queue_bytes -= len(old_payload)
+                PUSH_DROPPED_POINTS.labels(reason="queue_full").inc(old_points)
+            PUSH_QUEUE_BYTES.set(self._queue_bytes)
+            self._condition.notify()
+
+    def _snapshot_loop(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.take_snapshot()
+            except Exception as e:
+                print(f"Error taking metrics push snapshot: {e}")
+
+    def _post(self, payload: bytes) -> Optional[int]:
+        """HTTP status of one attempt, or None if the receiver was not reached"""
+        request = urllib.request.Request(self.endpoint, data=payload, method="POST", headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            **self.headers
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (urllib.error.URLError, OSError):
+            return None
+
+    def _send(self, payload: bytes, points: int, deadline: Optional[float] = None) -> bool:
+        """Post one batch, retrying; drops (and counts) it if that fails"""
+        for attempt in range(self.max_retries + 1):
+            status = self._post(payload)
+            if status is not None and 200 <= status < 300:
+                PUSH_POINTS.inc(points)
+                return True
+            if status is not None and status < 500 and status != 429:
+                PUSH_DROPPED_POINTS.labels(reason="rejected").inc(points)
+                return False
+            if attempt == self.max_retries:
+                break
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+            delay = random.uniform(delay / 2, delay)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                break
+            PUSH_RETRIES.inc()
+            # Shutting down cuts the wait short; the final flush retries within its deadline
+            if self._stopping.wait(delay) and deadline is None:
+                self._requeue(payload, points)
+                return False
+        PUSH_DROPPED_POINTS.labels(reason="retries_exhausted").inc(points)
+        return False
+
+    def _requeue(self, payload: bytes, points: int):
+        with self._condition:
+            self._queue.appendleft((payload, points))
+            self._queue_bytes += len(payload)
+            PUSH_QUEUE_BYTES.set(self._queue_bytes)
+
+    def _next_batch(self, block: bool):
+        with self._condition:
+            while block and not self._queue and not self._stopping.is_set():
+                self._condition.wait()
+            if not self._queue:
+                return None
+            payload, points = self._queue.popleft()
+            self._queue_bytes -= len(payload)
+            PUSH_QUEUE_BYTES.set(self._queue_bytes)
+            return payload, points
+
+    def _send_loop(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch(block=True)
+            if batch is not None:
+                self._send(*batch)
+
+    def shutdown(self, timeout: float = 5.0):
+        """
+        Take a final snapshot and push everything queued, for up to `timeout` seconds
+
+        Blocking; whatever is still queued at the deadline is counted as dropped.
+        """
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        try:
+            self.take_snapshot()
+        except Exception as e:
+            print(f"Error taking final metrics push snapshot: {e}")
+
+        while True:
+            batch = self._next_batch(block=False)
+            if batch is None:
+                break
+            if time.monotonic() >= deadline:
+                PUSH_DROPPED_POINTS.labels(reason="shutdown").inc(batch[1])
+                continue
+            self._send(*batch, deadline=deadline)
+
+_exporter: Optional[PushExporter] = None
+
+def parse_headers(value: Optional[str]) -> dict:
+    """"key=value,key2=value2" to a dict"""
+    headers = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            headers[key.strip()] = val.strip()
+    return headers
+
+def start_push_exporter(endpoint: str, interval: float, **options) -> PushExporter:
+    """Start the process-wide exporter (once)"""
+    global _exporter
+    if _exporter is None:
+        _exporter = PushExporter(endpoint, interval, **options)
+        _exporter.start()
+    return _exporter
+
+def stop_push_exporter(timeout: float = 5.0):
+    """Final push and stop; blocking, so call it from a worker thread"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown(timeout)
+        _exporter = None
@@ -0,0 +1,148 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+def format_window(seconds: int) -> str:
+    """Render a window length as a label value (10 -> "10s", 300 -> "5m")"""
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+class RateWindow:
+    """
+    Per-second request/error counters for one series in a fixed ring
+
+    The ring is one slot longer than the largest window. A running sum is
+    kept per window and adjusted as seconds enter and leave it, so both
+    recording and reading are O(number of windows), independent of the
+    request rate.
+    """
+
+    __slots__ = ("windows", "size", "second", "requests", "errors", "request_sums", "error_sums")
+
+    def __init__(self, windows: List[int], second: int):
+        self.windows = windows
+        self.size = max(windows) + 1
+        self.second = second
+        self.requests = [0] * self.size
+        self.errors = [0] * self.size
+        self.request_sums = [0] * len(windows)
+        self.error_sums = [0] * len(windows)
+
+    def advance(self, second: int):
+        """Move the head to `second`, expiring seconds that left each window"""
+        steps = second - self.second
+        if steps <= 0:
+            return
+        if steps >= self.size:
+            # Idle for longer than the largest window: everything expired
+            self.requests = [0] * self.size
+            self.errors = [0] * self.size
+            self.request_sums = [0] * len(self.windows)
+            self.error_sums = [0] * len(self.windows)
+            self.second = second
+            return
+
+        size = self.size
+        requests = self.requests
+        errors = self.errors
+        for current in range(self.second + 1, second + 1):
+            for i, window in enumerate(self.windows):
+                expired = (current - window) % size
+                self.request_sums[i] -= requests[expired]
+                self.error_sums[i] -= errors[expired]
+            slot = current % size
+            requests[slot] = 0
+            errors[slot] = 0
+        self.second = second
+
+    def add(self, second: int, is_error: bool):
+        """Count one request in `second`"""
+        self.advance(second)
+        slot = second % self.size
+        self.requests[slot] += 1
+        request_sums = self.request_sums
+        for i in range(len(request_sums)):
+            request_sums[i] += 1
+        if is_error:
+            self.errors[slot] += 1
+            error_sums = self.error_sums
+            for i in range(len(error_sums)):
+                error_sums[i] += 1
+
+    def rates(self, second: int) -> List[Tuple[float, float]]:
+        """(requests/s, errors/s) for each window as of `second`"""
+        self.advance(second)
+        return [
+            (self.request_sums[i] / window, self.error_sums[i] / window)
+            for i, window in enumerate(self.windows)
+        ]
+
+class RateEngine:
+    """
+    In-process sliding-window request and error rates per (method, endpoint)
+
+    Owns the `http_requests_per_second` and `http_errors_per_second`
+    gauges: it is registered on the registry in their place and refreshes
+    them from the ring buffers whenever the registry is collected. Series
+    with no traffic in the largest window are dropped at that point.
+    """
+
+    def __init__(self, request_gauge, error_gauge, windows: List[int]):
+        self.request_gauge = request_gauge
+        self.error_gauge = error_gauge
+        self.windows = sorted(set(windows))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError(f"Rate windows must be positive seconds, got {windows!r}")
+        self.window_labels = [format_window(window) for window in self.windows]
+        self._series: Dict[Tuple[str, str], RateWindow] = {}
+        self._lock = threading.Lock()
+
+    def record(self, labels: Tuple[str, str], is_error: bool, now: Optional[float] = None):
+        """Count one request for (method, endpoint) at monotonic time `now`"""
+        second = int(time.monotonic() if now is None else now)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = RateWindow(self.windows, second)
+            series.add(second, is_error)
+
+    def rate(self, method: str, endpoint: str, window: int) -> Tuple[float, float]:
+        """(requests/s, errors/s) for one series over a configured window"""
+        index = self.windows.index(window)
+        second = int(time.monotonic())
+        with self._lock:
+            series = self._series.get((method, endpoint))
+            if series is None:
+                return 0.0, 0.0
+            return series.rates(second)[index]
+
+    def refresh(self):
+        """Copy current rates into the gauges and drop idle series"""
+        second = int(time.monotonic())
+        with self._lock:
+            for labels, series in list(self._series.items()):
+                rates = series.rates(second)
+                if series.request_sums[-1] == 0:
+                    # No traffic in the largest window: forget the series.
+                    # Zero it first so multi-process value files, which
+                    # outlive remove(), do not keep reporting the last rate.
+                    del self._series[labels]
+                    for window_label in self.window_labels:
+                        for gauge in (self.request_gauge, self.error_gauge):
+                            gauge.labels(*labels, window_label).set(0)
+                            gauge.remove(*labels, window_label)
+                    continue
+                for window_label, (request_rate, error_rate) in zip(self.window_labels, rates):
+                    self.request_gauge.labels(*labels, window_label).set(request_rate)
+                    self.error_gauge.labels(*labels, window_label).set(error_rate)
+
+    def describe(self):
+        return list(self.request_gauge.describe()) + list(self.error_gauge.describe())
+
+    def collect(self):
+        self.refresh()
+        yield from self.request_gauge.collect()
+        yield from self.error_gauge.collect()
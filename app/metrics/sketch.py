@@ -0,0 +1,318 @@
+import glob
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from prometheus_client.core import SummaryMetricFamily
+
+# Values at or below this are counted in the zero bucket (log() is undefined)
+MIN_INDEXABLE_VALUE = 1e-9
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with a relative error bound (DDSketch)
+
+    Values are counted in logarithmic bins of ratio `gamma`, so any
+    quantile is returned within `relative_accuracy` of the true value
+    (1% by default) whatever the distribution. Adding is one log() and a
+    dict update; two sketches with the same accuracy merge by adding bin
+    counts. When more than `max_bins` bins are in use the lowest ones are
+    collapsed, which only costs accuracy on the fastest requests.
+
+    Not thread-safe on its own; see RotatingSketch.
+    """
+
+    __slots__ = (
+        "relative_accuracy", "gamma", "_multiplier", "max_bins",
+        "bins", "zero_count", "count", "sum", "min", "max"
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._multiplier = 1 / math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value > MIN_INDEXABLE_VALUE:
+            key = math.ceil(math.log(value) * self._multiplier)
+            bins = self.bins
+            bins[key] = bins.get(key, 0) + 1
+            if len(bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += 1
+
+    def _collapse(self):
+        """Fold the lowest bins together until at most max_bins remain"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile `q` (0..1), or None if empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bin (gamma^(key-1), gamma^key] in relative terms
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def merge(self, other: "DDSketch"):
+        """Add another sketch's counts into this one (same relative_accuracy)"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        bins = self.bins
+        for key, count in other.bins.items():
+            bins[key] = bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def copy(self) -> "DDSketch":
+        """
+        Independent copy; safe to take while another thread is adding
+
+        dict(bins) is a single C-level copy under the GIL, so it never sees
+        the dict change size mid-iteration.
+        """
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        sketch.bins = dict(self.bins)
+        sketch.zero_count = self.zero_count
+        sketch.count = self.count
+        sketch.sum = self.sum
+        sketch.min = self.min
+        sketch.max = self.max
+        return sketch
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": [[key, count] for key, count in self.bins.items()],
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_bins: int = 2048) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        sketch.bins = {key: count for key, count in data["bins"]}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+class RotatingSketch:
+    """
+    Latency sketch for one series, covering a sliding time window
+
+    Observations go into `current`; every `window` seconds it becomes
+    `previous` and a new one starts, so quantiles (read from both) reflect
+    the last one to two windows rather than the whole uptime. Count and
+    sum are kept since start, as Prometheus summaries expect.
+
+    Recording takes no lock: requests are recorded from the event loop
+    (or the buffered fold, which is serialized), and readers only copy.
+    Like SeriesLimiter.touch, two threads recording into the same series
+    at the same instant could lose an observation, which an estimate
+    tolerates.
+    """
+
+    __slots__ = ("window", "relative_accuracy", "max_bins", "current", "previous",
+                 "rotated_at", "count", "sum")
+
+    def __init__(self, window: float, relative_accuracy: float, max_bins: int, now: float):
+        self.window = window
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.current = DDSketch(relative_accuracy, max_bins)
+        self.previous = DDSketch(relative_accuracy, max_bins)
+        self.rotated_at = now
+        self.count = 0
+        self.sum = 0.0
+
+    def _rotate(self, now: float):
+        if now - self.rotated_at < 2 * self.window:
+            self.previous = self.current
+        else:
+            # Idle for two windows: the old current is out of range too
+            self.previous = DDSketch(self.relative_accuracy, self.max_bins)
+        self.current = DDSketch(self.relative_accuracy, self.max_bins)
+        self.rotated_at = now
+
+    def observe(self, value: float, now: float):
+        if now - self.rotated_at >= self.window:
+            self._rotate(now)
+        self.current.add(value)
+        self.count += 1
+        self.sum += value
+
+    def view(self, now: float) -> Tuple[DDSketch, int, float]:
+        """(merged window sketch, total count, total sum) as of `now`"""
+        # Read without rotating; only the recording side mutates
+        current, previous, age = self.current, self.previous, now - self.rotated_at
+        if age < self.window:
+            merged = previous.copy()
+            merged.merge(current.copy())
+        elif age < 2 * self.window:
+            merged = current.copy()
+        else:
+            merged = DDSketch(self.relative_accuracy, self.max_bins)
+        return merged, self.count, self.sum
+
+class SketchFamily:
+    """
+    Labeled set of RotatingSketches, exposed as a Prometheus summary
+
+    Behaves like a prometheus_client metric for the parts the request
+    recording uses (`labels`, `remove`) and is registered as a custom
+    collector. Each scrape reports the configured quantiles of the recent
+    window plus the cumulative count and sum.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str],
+                 quantiles: List[float], window: float,
+                 relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.quantiles = list(quantiles)
+        self.window = window
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._sketches: Dict[Tuple[str, ...], RotatingSketch] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues: str) -> RotatingSketch:
+        sketch = self._sketches.get(labelvalues)
+        if sketch is None:
+            with self._lock:
+                sketch = self._sketches.get(labelvalues)
+                if sketch is None:
+                    sketch = RotatingSketch(self.window, self.relative_accuracy,
+                                            self.max_bins, time.monotonic())
+                    self._sketches[labelvalues] = sketch
+        return sketch
+
+    def remove(self, *labelvalues: str):
+        with self._lock:
+            del self._sketches[labelvalues]
+
+    def views(self) -> Dict[Tuple[str, ...], Tuple[DDSketch, int, float]]:
+        """Current window sketch, count and sum for every series"""
+        now = time.monotonic()
+        with self._lock:
+            sketches = list(self._sketches.items())
+        return {labels: sketch.view(now) for labels, sketch in sketches}
+
+    def build_metric(self, views) -> SummaryMetricFamily:
+        family = SummaryMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labels, (sketch, count, total) in views.items():
+            family.add_metric(list(labels), count_value=count, sum_value=total)
+            label_map = dict(zip(self.labelnames, labels))
+            for q in self.quantiles:
+                value = sketch.quantile(q)
+                family.add_sample(
+                    self.name,
+                    {**label_map, "quantile": str(q)},
+                    math.nan if value is None else value
+                )
+        return family
+
+    def describe(self):
+        yield SummaryMetricFamily(self.name, self.documentation, labels=self.labelnames)
+
+    def collect(self):
+        yield self.build_metric(self.views())
+
+    # Multi-process mode: every worker publishes its views to a file and
+    # the scraping worker merges them
+
+    def publish(self, path: str):
+        """Atomically write this worker's views to `path`"""
+        payload = {
+            "published_at": time.time(),
+            "series": [
+                {"labels": list(labels), "sketch": sketch.to_dict(), "count": count, "sum": total}
+                for labels, (sketch, count, total) in self.views().items()
+            ]
+        }
+        file_path = os.path.join(path, f"sketch_{self.name}_{os.getpid()}.json")
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(temp_path, file_path)
+
+    def load_published(self, path: str):
+        """
+        Merge every worker's published views
+
+        Counts and sums of exited workers keep counting, like counters;
+        their window sketches are skipped once older than two windows.
+        """
+        merged = {}
+        now = time.time()
+        for file_path in glob.glob(os.path.join(path, f"sketch_{self.name}_*.json")):
+            try:
+                with open(file_path) as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            recent = now - payload["published_at"] < 2 * self.window
+            for series in payload["series"]:
+                labels = tuple(series["labels"])
+                if labels not in merged:
+                    merged[labels] = (DDSketch(self.relative_accuracy, self.max_bins), 0, 0.0)
+                sketch, count, total = merged[labels]
+                if recent:
+                    sketch.merge(DDSketch.from_dict(series["sketch"], self.max_bins))
+                merged[labels] = (sketch, count + series["count"], total + series["sum"])
+        return merged
+
+class PublishedSketchCollector:
+    """Collector serving a SketchFamily merged across workers' published files"""
+
+    def __init__(self, family: SketchFamily, path: str):
+        self.family = family
+        self.path = path
+
+    def describe(self):
+        return self.family.describe()
+
+    def collect(self):
+        yield self.family.build_metric(self.family.load_published(self.path))
@@ -0,0 +1,22 @@
+from prometheus_client import Gauge
+from app.metrics.system_metrics import METRICS_REGISTRY
+
+# Startup breakdown, one child per phase (see app/main.py)
+STARTUP_PHASE = Gauge(
+    "app_startup_phase_seconds",
+    "Duration of each application startup phase in seconds",
+    ["phase"],
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="liveall"
+)
+
+_phases = {}
+
+def record_startup_phase(phase: str, seconds: float):
+    """Record one startup phase duration"""
+    _phases[phase] = seconds
+    STARTUP_PHASE.labels(phase=phase).set(seconds)
+
+def get_startup_phases() -> dict:
+    """Recorded phase durations, in the order they completed"""
+    return dict(_phases)
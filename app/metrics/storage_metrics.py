@@ -0,0 +1,20 @@
+from prometheus_client import Histogram
+from app.metrics.system_metrics import METRICS_REGISTRY
+from app.config import settings
+
+# Storage backend metrics
+STORAGE_OPERATION_LATENCY = Histogram(
+    "storage_operation_duration_seconds",
+    "Storage operation duration in seconds",
+    ["backend", "operation"],
+    buckets=settings.get_custom_buckets("latency"),
+    registry=METRICS_REGISTRY
+)
+
+STORAGE_BATCH_SIZE = Histogram(
+    "storage_write_batch_size",
+    "Number of writes committed together in one storage transaction",
+    ["backend"],
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, float('inf')],
+    registry=METRICS_REGISTRY
+)
@@ -1,9 +1,13 @@
-import psutil
+import asyncio
+import os
 import threading
 import time
 import sys
 import platform
+from fnmatch import fnmatchcase
+from typing import Dict, Hashable, List
 from prometheus_client import Gauge, Info, CollectorRegistry
+from app.config import settings
 
 # Use a separate registry to avoid conflicts with default registry
 METRICS_REGISTRY = CollectorRegistry()
@@ -22,7 +26,357 @@ process_threads = None
 system_cpu_usage_percent = None
 system_memory_usage_percent = None
 system_disk_usage_percent = None
+system_disk_free_bytes = None
+system_disk_total_bytes = None
+system_disk_io_bytes_total = None
+system_disk_io_operations_total = None
+system_disk_io_busy_seconds_total = None
+system_disk_io_bytes_per_second = None
+system_disk_io_operations_per_second = None
+system_disk_io_busy_percent = None
+system_network_bytes_total = None
+system_network_packets_total = None
+system_network_errors_total = None
+system_network_dropped_total = None
+system_network_bytes_per_second = None
+system_network_packets_per_second = None
+system_network_errors_per_second = None
+process_io_bytes_total = None
+process_io_operations_total = None
+process_io_bytes_per_second = None
 process_info = None
+system_collector = None
+
+class CounterRates:
+    """
+    Per-second rates of cumulative counters, from the delta between two reads
+
+    `update` takes every current value at once (e.g. all devices from one
+    /proc read) and returns each key's rate since the previous update;
+    keys seen for the first time have none yet. A counter that went down
+    (wrapped, or the device was re-created) is treated as a reset: it
+    counted its current value since the previous read, as in
+    timeseries.rate().
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._previous_time = None
+
+    def update(self, values: Dict[Hashable, float], now: float) -> Dict[Hashable, float]:
+        rates = {}
+        if self._previous_time is not None and now > self._previous_time:
+            elapsed = now - self._previous_time
+            previous = self._previous
+            for key, value in values.items():
+                last = previous.get(key)
+                if last is not None:
+                    rates[key] = (value - last if value >= last else value) / elapsed
+        self._previous = values
+        self._previous_time = now
+        return rates
+
+def _select(values: Dict[tuple, float], kind: str) -> Dict[tuple, float]:
+    """Values whose key starts with `kind`, keyed by the rest of the key (the labels)"""
+    return {key[1:]: value for key, value in values.items() if key[0] == kind}
+
+def _excluded(name: str, patterns: List[str]) -> bool:
+    return any(fnmatchcase(name, pattern) for pattern in patterns)
+
+class SystemMetricsCollector:
+    """
+    Process and system metrics computed when the registry is collected
+
+    Replaces the old polling thread: nothing runs between scrapes. All
+    per-process reads share one `Process.oneshot()` pass, system CPU usage
+    comes from the cpu_times delta since the previous collection (no
+    blocking sampling interval), and collections closer together than
+    `min_interval` reuse the previous values.
+
+    Disk I/O and network counters are read for all devices in one call
+    each (/proc/diskstats, /proc/net/dev on Linux) and their rates come
+    from the delta since the previous refresh, so a refresh costs the
+    same two reads however many devices there are. The mount list is
+    re-read every SYSTEM_MOUNTS_REFRESH_SECONDS. Children of devices,
+    interfaces and mounts that disappear are removed.
+
+    The gauges are not registered on the registry themselves; this
+    collector is, and yields them after refreshing. The values of the
+    last refresh are also kept in `snapshot` for the health endpoints.
+    """
+
+    def __init__(self, gauges, min_interval: float):
+        self.gauges = gauges
+        self.min_interval = min_interval
+        # psutil is imported on the first refresh, not at application import
+        self.process = None
+        self._last_refresh = None
+        self._last_cpu_busy = None
+        self._last_cpu_total = None
+        self._info_set = False
+        self._lock = threading.Lock()
+        self._mountpoints = None
+        self._mountpoints_read = None
+        self._disk_rates = CounterRates()
+        self._network_rates = CounterRates()
+        self._process_io_rates = CounterRates()
+        # Gauge children by gauge and label values, so refreshes skip .labels()
+        self._children = {}
+        self.snapshot = None
+
+    def _cpu_percent(self) -> float:
+        """System CPU usage since the previous call (since boot on the first)"""
+        import psutil
+        times = psutil.cpu_times()
+        total = sum(times)
+        busy = total - times.idle - getattr(times, "iowait", 0.0)
+
+        if self._last_cpu_total is None:
+            busy_delta, total_delta = busy, total
+        else:
+            busy_delta = busy - self._last_cpu_busy
+            total_delta = total - self._last_cpu_total
+        self._last_cpu_busy = busy
+        self._last_cpu_total = total
+
+        if total_delta <= 0:
+            return 0.0
+        return max(0.0, min(100.0, busy_delta / total_delta * 100))
+
+    def _set_process_info(self):
+        """Process info is static; read it on the first collection only"""
+        try:
+            process_info.info({
+                'pid': str(self.process.pid),
+                'name': self.process.name(),
+                'cmdline': ' '.join(self.process.cmdline()),
+                'cwd': self.process.cwd(),
+                'python_version': f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+                'platform': platform.system(),
+                'platform_release': platform.release()
+            })
+        except Exception:
+            # Some info might not be accessible
+            pass
+        process_start_time_seconds.set(self.process.create_time())
+        self._info_set = True
+
+    def refresh(self):
+        """Re-read process and system values unless the cache is still fresh"""
+        import psutil
+
+        with self._lock:
+            now = time.monotonic()
+            if self._last_refresh is not None and now - self._last_refresh < self.min_interval:
+                return
+            self._last_refresh = now
+
+            try:
+                if self.process is None:
+                    self.process = psutil.Process()
+                if not self._info_set:
+                    self._set_process_info()
+
+                with self.process.oneshot():
+                    cpu_times = self.process.cpu_times()
+                    memory_info = self.process.memory_info()
+                    num_threads = self.process.num_threads()
+                    try:
+                        if hasattr(self.process, 'num_fds'):
+                            open_fds = self.process.num_fds()
+                        else:
+                            open_fds = self.process.num_handles()
+                    except (AttributeError, psutil.AccessDenied, OSError):
+                        open_fds = None
+                    try:
+                        # Not available on macOS
+                        process_io = self.process.io_counters() if hasattr(self.process, 'io_counters') else None
+                    except (psutil.AccessDenied, OSError):
+                        process_io = None
+
+                process_cpu_seconds_total.set(cpu_times.user + cpu_times.system)
+                process_resident_memory_bytes.set(memory_info.rss)
+                process_virtual_memory_bytes.set(memory_info.vms)
+                process_threads.set(num_threads)
+                if open_fds is not None:
+                    process_open_fds.set(open_fds)
+                if process_io is not None:
+                    self._set_process_io(process_io, now)
+
+                cpu_percent = self._cpu_percent()
+                memory = psutil.virtual_memory()
+                disk = self._collect_disk_usage(now)
+                self._collect_disk_io(now)
+                self._collect_network(now)
+                system_cpu_usage_percent.set(cpu_percent)
+                system_memory_usage_percent.set(memory.percent)
+
+                self.snapshot = {
+                    "sampled_at": time.time(),
+                    "cpu_count": psutil.cpu_count(),
+                    "cpu_percent": cpu_percent,
+                    "memory": {
+                        "total": memory.total,
+                        "available": memory.available,
+                        "used": memory.used,
+                        "percent": memory.percent
+                    },
+                    "disk": disk
+                }
+
+            except psutil.NoSuchProcess:
+                pass
+            except Exception as e:
+                print(f"Error collecting system metrics: {e}")
+
+    def _set_labeled(self, gauge, values: Dict[tuple, float]):
+        """Set `gauge`'s child for every label tuple in `values`; drop the others"""
+        children = self._children.setdefault(id(gauge), {})
+        for labels, value in values.items():
+            child = children.get(labels)
+            if child is None:
+                child = children[labels] = gauge.labels(*labels)
+            child.set(value)
+        for labels in [labels for labels in children if labels not in values]:
+            del children[labels]
+            gauge.remove(*labels)
+
+    def _get_mountpoints(self, now: float) -> List[str]:
+        """Mountpoints of local filesystems, re-read every SYSTEM_MOUNTS_REFRESH_SECONDS"""
+        import psutil
+        if (self._mountpoints is not None
+                and now - self._mountpoints_read < settings.SYSTEM_MOUNTS_REFRESH_SECONDS):
+            return self._mountpoints
+
+        mountpoints = []
+        try:
+            for partition in psutil.disk_partitions(all=False):
+                if (partition.fstype not in settings.SYSTEM_DISK_EXCLUDE_FSTYPES
+                        and partition.mountpoint not in mountpoints):
+                    mountpoints.append(partition.mountpoint)
+        except OSError:
+            pass
+        # The root filesystem is not a local device in containers (overlay)
+        if os.name != 'nt' and '/' not in mountpoints:
+            mountpoints.insert(0, '/')
+        elif not mountpoints:
+            mountpoints.append('C:\\')
+        self._mountpoints = mountpoints
+        self._mountpoints_read = now
+        return mountpoints
+
+    def _collect_disk_usage(self, now: float):
+        """Set usage of every mounted filesystem; returns the root's as a dict (None if unreadable)"""
+        import psutil
+        percent_values, free_values, total_values = {}, {}, {}
+        root = None
+        for path in self._get_mountpoints(now):
+            try:
+                disk_usage = psutil.disk_usage(path)
+            except (OSError, psutil.AccessDenied):
+                continue
+            if disk_usage.total <= 0:
+                continue
+            # "C:\\" is reported as "C:"
+            labels = (path.rstrip('\\') or path,)
+            percent = (disk_usage.used / disk_usage.total) * 100
+            percent_values[labels] = percent
+            free_values[labels] = disk_usage.free
+            total_values[labels] = disk_usage.total
+            if root is None:
+                root = {
+                    "total": disk_usage.total,
+                    "used": disk_usage.used,
+                    "free": disk_usage.free,
+                    "percent": percent
+                }
+        self._set_labeled(system_disk_usage_percent, percent_values)
+        self._set_labeled(system_disk_free_bytes, free_values)
+        self._set_labeled(system_disk_total_bytes, total_values)
+        return root
+
+    def _collect_disk_io(self, now: float):
+        """Per-device I/O counters and their rates, from one read for all devices"""
+        import psutil
+        try:
+            # CounterRates handles counters that go down; skip psutil's wrap tracking
+            devices = psutil.disk_io_counters(perdisk=True, nowrap=False) or {}
+        except (OSError, RuntimeError):
+            devices = {}
+
+        totals = {}
+        for device, io in devices.items():
+            if _excluded(device, settings.SYSTEM_DISK_EXCLUDE_DEVICES):
+                continue
+            totals["bytes", device, "read"] = io.read_bytes
+            totals["bytes", device, "write"] = io.write_bytes
+            totals["operations", device, "read"] = io.read_count
+            totals["operations", device, "write"] = io.write_count
+            # Milliseconds the device was busy; Linux and FreeBSD only
+            if hasattr(io, "busy_time"):
+                totals["busy", device] = io.busy_time / 1000
+        rates = self._disk_rates.update(totals, now)
+
+        self._set_labeled(system_disk_io_bytes_total, _select(totals, "bytes"))
+        self._set_labeled(system_disk_io_operations_total, _select(totals, "operations"))
+        self._set_labeled(system_disk_io_busy_seconds_total, _select(totals, "busy"))
+        self._set_labeled(system_disk_io_bytes_per_second, _select(rates, "bytes"))
+        self._set_labeled(system_disk_io_operations_per_second, _select(rates, "operations"))
+        self._set_labeled(system_disk_io_busy_percent, {
+            labels: min(100.0, rate * 100) for labels, rate in _select(rates, "busy").items()
+        })
+
+    def _collect_network(self, now: float):
+        """Per-interface network counters and their rates, from one read for all interfaces"""
+        import psutil
+        try:
+            interfaces = psutil.net_io_counters(pernic=True, nowrap=False) or {}
+        except (OSError, RuntimeError):
+            interfaces = {}
+
+        totals = {}
+        for interface, io in interfaces.items():
+            if _excluded(interface, settings.SYSTEM_NETWORK_EXCLUDE_INTERFACES):
+                continue
+            totals["bytes", interface, "receive"] = io.bytes_recv
+            totals["bytes", interface, "transmit"] = io.bytes_sent
+            totals["packets", interface, "receive"] = io.packets_recv
+            totals["packets", interface, "transmit"] = io.packets_sent
+            totals["errors", interface, "receive"] = io.errin
+            totals["errors", interface, "transmit"] = io.errout
+            totals["dropped", interface, "receive"] = io.dropin
+            totals["dropped", interface, "transmit"] = io.dropout
+        rates = self._network_rates.update(totals, now)
+
+        self._set_labeled(system_network_bytes_total, _select(totals, "bytes"))
+        self._set_labeled(system_network_packets_total, _select(totals, "packets"))
+        self._set_labeled(system_network_errors_total, _select(totals, "errors"))
+        self._set_labeled(system_network_dropped_total, _select(totals, "dropped"))
+        self._set_labeled(system_network_bytes_per_second, _select(rates, "bytes"))
+        self._set_labeled(system_network_packets_per_second, _select(rates, "packets"))
+        self._set_labeled(system_network_errors_per_second, _select(rates, "errors"))
+
+    def _set_process_io(self, io, now: float):
+        """This process's storage I/O bytes and read/write calls, and byte rates"""
+        totals = {
+            ("bytes", "read"): io.read_bytes,
+            ("bytes", "write"): io.write_bytes,
+            ("operations", "read"): io.read_count,
+            ("operations", "write"): io.write_count
+        }
+        rates = self._process_io_rates.update(totals, now)
+        self._set_labeled(process_io_bytes_total, _select(totals, "bytes"))
+        self._set_labeled(process_io_operations_total, _select(totals, "operations"))
+        self._set_labeled(process_io_bytes_per_second, _select(rates, "bytes"))
+
+    def describe(self):
+        for gauge in self.gauges:
+            yield from gauge.describe()
+
+    def collect(self):
+        self.refresh()
+        for gauge in self.gauges:
+            yield from gauge.collect()
 
 def initialize_metrics():
     """Initialize metrics only once"""
@@ -30,197 +384,342 @@ def initialize_metrics():
     global process_cpu_seconds_total, process_resident_memory_bytes, process_virtual_memory_bytes
     global process_start_time_seconds, process_open_fds, process_threads
     global system_cpu_usage_percent, system_memory_usage_percent, system_disk_usage_percent
-    global process_info
-    
+    global system_disk_free_bytes, system_disk_total_bytes
+    global system_disk_io_bytes_total, system_disk_io_operations_total, system_disk_io_busy_seconds_total
+    global system_disk_io_bytes_per_second, system_disk_io_operations_per_second, system_disk_io_busy_percent
+    global system_network_bytes_total, system_network_packets_total, system_network_errors_total
+    global system_network_dropped_total, system_network_bytes_per_second
+    global system_network_packets_per_second, system_network_errors_per_second
+    global process_io_bytes_total, process_io_operations_total, process_io_bytes_per_second
+    global process_info, system_collector
+
     with _metrics_lock:
         if _metrics_initialized:
             return
-        
+
         try:
+            # The gauges below are exposed through SystemMetricsCollector,
+            # which refreshes them at scrape time, so they are not
+            # registered directly
+
             # CPU Metrics
             process_cpu_seconds_total = Gauge(
-                "process_cpu_seconds_total", 
+                "process_cpu_seconds_total",
                 "Total CPU time consumed by the process",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             # Memory Metrics
             process_resident_memory_bytes = Gauge(
-                "process_resident_memory_bytes", 
+                "process_resident_memory_bytes",
                 "Physical memory currently used",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             process_virtual_memory_bytes = Gauge(
-                "process_virtual_memory_bytes", 
+                "process_virtual_memory_bytes",
                 "Virtual memory allocated",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             # Additional System Metrics
             process_start_time_seconds = Gauge(
-                "process_start_time_seconds", 
+                "process_start_time_seconds",
                 "Start time of the process since unix epoch",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             process_open_fds = Gauge(
-                "process_open_fds", 
+                "process_open_fds",
                 "Number of open file descriptors",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             process_threads = Gauge(
-                "process_threads", 
+                "process_threads",
                 "Number of OS threads in the process",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             # System-wide metrics
             system_cpu_usage_percent = Gauge(
-                "system_cpu_usage_percent", 
+                "system_cpu_usage_percent",
                 "System CPU usage percentage",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="livemax"
             )
 
             system_memory_usage_percent = Gauge(
-                "system_memory_usage_percent", 
+                "system_memory_usage_percent",
                 "System memory usage percentage",
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="livemax"
             )
 
             system_disk_usage_percent = Gauge(
-                "system_disk_usage_percent", 
-                "System disk usage percentage", 
+                "system_disk_usage_percent",
+                "System disk usage percentage",
                 ["mountpoint"],
-                registry=METRICS_REGISTRY
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_free_bytes = Gauge(
+                "system_disk_free_bytes",
+                "Free space on the filesystem",
+                ["mountpoint"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_total_bytes = Gauge(
+                "system_disk_total_bytes",
+                "Size of the filesystem",
+                ["mountpoint"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            # Disk I/O per block device (cumulative, and rates since the previous read)
+            system_disk_io_bytes_total = Gauge(
+                "system_disk_io_bytes_total",
+                "Bytes read from / written to the device",
+                ["device", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_io_operations_total = Gauge(
+                "system_disk_io_operations_total",
+                "Completed reads / writes on the device",
+                ["device", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_io_busy_seconds_total = Gauge(
+                "system_disk_io_busy_seconds_total",
+                "Time the device spent doing I/O",
+                ["device"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_io_bytes_per_second = Gauge(
+                "system_disk_io_bytes_per_second",
+                "Device read / write throughput since the previous read",
+                ["device", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_io_operations_per_second = Gauge(
+                "system_disk_io_operations_per_second",
+                "Device reads / writes per second since the previous read",
+                ["device", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_disk_io_busy_percent = Gauge(
+                "system_disk_io_busy_percent",
+                "Share of time the device was busy since the previous read",
+                ["device"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            # Network per interface (cumulative, and rates since the previous read)
+            system_network_bytes_total = Gauge(
+                "system_network_bytes_total",
+                "Bytes received / transmitted on the interface",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_packets_total = Gauge(
+                "system_network_packets_total",
+                "Packets received / transmitted on the interface",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_errors_total = Gauge(
+                "system_network_errors_total",
+                "Receive / transmit errors on the interface",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_dropped_total = Gauge(
+                "system_network_dropped_total",
+                "Incoming / outgoing packets dropped on the interface",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_bytes_per_second = Gauge(
+                "system_network_bytes_per_second",
+                "Interface receive / transmit throughput since the previous read",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_packets_per_second = Gauge(
+                "system_network_packets_per_second",
+                "Interface packets per second since the previous read",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            system_network_errors_per_second = Gauge(
+                "system_network_errors_per_second",
+                "Interface errors per second since the previous read",
+                ["interface", "direction"],
+                registry=None,
+                multiprocess_mode="livemax"
+            )
+
+            # Process I/O (storage bytes, and read/write calls of any kind)
+            process_io_bytes_total = Gauge(
+                "process_io_bytes_total",
+                "Bytes the process read from / wrote to storage",
+                ["direction"],
+                registry=None,
+                multiprocess_mode="liveall"
+            )
+
+            process_io_operations_total = Gauge(
+                "process_io_operations_total",
+                "Read / write system calls made by the process",
+                ["direction"],
+                registry=None,
+                multiprocess_mode="liveall"
+            )
+
+            process_io_bytes_per_second = Gauge(
+                "process_io_bytes_per_second",
+                "Process storage read / write throughput since the previous read",
+                ["direction"],
+                registry=None,
+                multiprocess_mode="liveall"
             )
 
             # Process info
             process_info = Info(
-                "process", 
+                "process",
                 "Process information",
                 registry=METRICS_REGISTRY
             )
-            
+
+            system_collector = SystemMetricsCollector(
+                [
+                    process_cpu_seconds_total,
+                    process_resident_memory_bytes,
+                    process_virtual_memory_bytes,
+                    process_start_time_seconds,
+                    process_open_fds,
+                    process_threads,
+                    system_cpu_usage_percent,
+                    system_memory_usage_percent,
+                    system_disk_usage_percent,
+                    system_disk_free_bytes,
+                    system_disk_total_bytes,
+                    system_disk_io_bytes_total,
+                    system_disk_io_operations_total,
+                    system_disk_io_busy_seconds_total,
+                    system_disk_io_bytes_per_second,
+                    system_disk_io_operations_per_second,
+                    system_disk_io_busy_percent,
+                    system_network_bytes_total,
+                    system_network_packets_total,
+                    system_network_errors_total,
+                    system_network_dropped_total,
+                    system_network_bytes_per_second,
+                    system_network_packets_per_second,
+                    system_network_errors_per_second,
+                    process_io_bytes_total,
+                    process_io_operations_total,
+                    process_io_bytes_per_second
+                ],
+                min_interval=settings.METRICS_COLLECTION_INTERVAL
+            )
+            METRICS_REGISTRY.register(system_collector)
+
             _metrics_initialized = True
             print("System metrics initialized successfully")
-            
+
         except Exception as e:
             print(f"Error initializing metrics: {e}")
             raise
 
-def collect_system_metrics():
-    """Collect system and process metrics periodically"""
+def start_metrics_collection():
+    """
+    Make sure system metrics are collected
+
+    There is no background thread any more: values are read when the
+    registry is scraped. Kept so existing callers keep working.
+    """
     if not _metrics_initialized:
         initialize_metrics()
-    
-    # Get current process
-    current_process = psutil.Process()
-    
-    # Set process start time (only once)
-    if process_start_time_seconds:
-        process_start_time_seconds.set(current_process.create_time())
-    
-    # Set process info (only once)
-    if process_info:
-        try:
-            process_info.info({
-                'pid': str(current_process.pid),
-                'name': current_process.name(),
-                'cmdline': ' '.join(current_process.cmdline()),
-                'cwd': current_process.cwd(),
-                'python_version': f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
-                'platform': platform.system(),
-                'platform_release': platform.release()
-            })
-        except Exception:
-            # Some info might not be accessible
-            pass
-    
-    while True:
-        try:
-            # Process CPU metrics
-            if process_cpu_seconds_total:
-                cpu_times = current_process.cpu_times()
-                process_cpu_seconds_total.set(cpu_times.user + cpu_times.system)
-            
-            # Process memory metrics
-            if process_resident_memory_bytes and process_virtual_memory_bytes:
-                memory_info = current_process.memory_info()
-                process_resident_memory_bytes.set(memory_info.rss)
-                process_virtual_memory_bytes.set(memory_info.vms)
-            
-            # Process file descriptors
-            if process_open_fds:
-                try:
-                    if platform.system() != "Windows":
-                        fds = getattr(current_process, 'num_fds', None)
-                        if fds is not None:
-                            process_open_fds.set(fds())
-                    else:
-                        handles = getattr(current_process, 'num_handles', None)
-                        if handles is not None:
-                            process_open_fds.set(handles())
-                except (AttributeError, psutil.AccessDenied, psutil.NoSuchProcess, OSError):
-                    pass
-            
-            # Process threads
-            if process_threads:
-                process_threads.set(current_process.num_threads())
-            
-            # System-wide CPU usage
-            if system_cpu_usage_percent:
-                system_cpu_usage_percent.set(psutil.cpu_percent(interval=1))
-            
-            # System memory usage
-            if system_memory_usage_percent:
-                system_memory = psutil.virtual_memory()
-                system_memory_usage_percent.set(system_memory.percent)
-            
-            # System disk usage
-            if system_disk_usage_percent:
-                try:
-                    disk_usage = psutil.disk_usage('/')
-                    system_disk_usage_percent.labels(mountpoint='/').set(
-                        (disk_usage.used / disk_usage.total) * 100
-                    )
-                except (OSError, psutil.AccessDenied):
-                    try:
-                        disk_usage = psutil.disk_usage('C:\\')
-                        system_disk_usage_percent.labels(mountpoint='C:').set(
-                            (disk_usage.used / disk_usage.total) * 100
-                        )
-                    except (OSError, psutil.AccessDenied):
-                        pass
-            
-        except psutil.NoSuchProcess:
-            break
-        except Exception as e:
-            print(f"Error collecting system metrics: {e}")
-            
-        time.sleep(5)
+    return system_collector
 
-# Thread management
-_collection_thread = None
-_thread_lock = threading.Lock()
+_snapshot_refresh = None
 
-def start_metrics_collection():
-    """Start the metrics collection thread"""
-    global _collection_thread
-    
-    with _thread_lock:
-        if _collection_thread is None or not _collection_thread.is_alive():
-            if not _metrics_initialized:
-                initialize_metrics()
-            _collection_thread = threading.Thread(target=collect_system_metrics, daemon=True)
-            _collection_thread.start()
-            print("Metrics collection thread started")
-    
-    return _collection_thread
+async def get_system_snapshot() -> dict:
+    """
+    Latest system snapshot without blocking the event loop
+
+    A stale snapshot is returned immediately while one refresh runs in the
+    thread pool; concurrent callers share that refresh. Only the very
+    first call waits for a read.
+    """
+    global _snapshot_refresh
+
+    collector = start_metrics_collection()
+    snapshot = collector.snapshot
+    if snapshot is not None and time.time() - snapshot["sampled_at"] < collector.min_interval:
+        return snapshot
+
+    if _snapshot_refresh is None or _snapshot_refresh.done():
+        loop = asyncio.get_running_loop()
+        _snapshot_refresh = loop.run_in_executor(None, collector.refresh)
+
+    if snapshot is None:
+        await _snapshot_refresh
+        snapshot = collector.snapshot
+    return snapshot
+
+_exposition_registry = None
 
 def get_metrics_registry():
-    """Get the metrics registry for use with Prometheus"""
+    """
+    Get the metrics registry for use with Prometheus
+
+    In multi-process mode (PROMETHEUS_MULTIPROC_DIR set) this is an
+    aggregating registry that merges every worker's value files.
+    """
+    global _exposition_registry
+
     if not _metrics_initialized:
         initialize_metrics()
-    return METRICS_REGISTRY
\ No newline at end of file
+
+    if _exposition_registry is None:
+        from app.metrics.multiprocess import is_multiprocess_enabled, build_multiprocess_registry
+        if is_multiprocess_enabled():
+            _exposition_registry = build_multiprocess_registry()
+        else:
+            _exposition_registry = METRICS_REGISTRY
+    return _exposition_registry
@@ -0,0 +1,336 @@
+import math
+import threading
+import time
+from array import array
+from fnmatch import fnmatchcase
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from prometheus_client import Counter, Gauge, Histogram
+from app.metrics.system_metrics import METRICS_REGISTRY, start_metrics_collection
+
+# Store self-metrics
+TIMESERIES_SERIES = Gauge(
+    "timeseries_store_series",
+    "Series held by the in-process time-series store",
+    registry=METRICS_REGISTRY,
+    multiprocess_mode="livesum"
+)
+
+TIMESERIES_DROPPED_SAMPLES = Counter(
+    "timeseries_store_dropped_samples_total",
+    "Samples not stored because the store was at TIMESERIES_MAX_SERIES",
+    registry=METRICS_REGISTRY
+)
+
+TIMESERIES_SAMPLE_DURATION = Histogram(
+    "timeseries_store_sample_duration_seconds",
+    "Time taken to snapshot the selected series",
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf')],
+    registry=METRICS_REGISTRY
+)
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_duration(value: str) -> int:
+    """"90s", "5m", "1h", "2d" or plain seconds to whole seconds"""
+    value = value.strip()
+    if value and value[-1] in _UNITS:
+        return int(float(value[:-1]) * _UNITS[value[-1]])
+    return int(float(value))
+
+def parse_resolutions(value: str) -> List[Tuple[int, int]]:
+    """"1s:1h,1m:24h" to [(1, 3600), (60, 86400)]: (step, retention), finest first"""
+    resolutions = []
+    for item in value.split(","):
+        if ":" in item:
+            step, _, retention = item.partition(":")
+            step, retention = parse_duration(step), parse_duration(retention)
+            if step < 1 or retention < step:
+                raise ValueError(f"Invalid time-series resolution {item.strip()!r}")
+            resolutions.append((step, retention))
+    if not resolutions:
+        raise ValueError("At least one time-series resolution is required")
+    return sorted(resolutions)
+
+class Ring:
+    """
+    One series at one resolution, in a fixed array('d') of `slots` buckets
+
+    Slot `bucket % slots` holds the `step`-second bucket starting at
+    bucket * step: the latest sample for cumulative series (counters,
+    histogram and summary counts and sums), the mean of the bucket's
+    samples for gauges. The bucket being filled is rewritten on every
+    sample, so reads see it before it is complete. Buckets nothing was
+    sampled in read as NaN and are left out of results.
+    """
+
+    __slots__ = ("step", "slots", "values", "last_bucket", "total", "count")
+
+    def __init__(self, step: int, slots: int):
+        self.step = step
+        self.slots = slots
+        self.values = array("d", [math.nan]) * slots
+        self.last_bucket = None
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, now: float, value: float, cumulative: bool):
+        bucket = int(now // self.step)
+        last = self.last_bucket
+        if bucket != last:
+            if last is not None:
+                if bucket < last:
+                    # Wall clock stepped back; keep what we have
+                    return
+                for missing in range(max(last + 1, bucket - self.slots + 1), bucket):
+                    self.values[missing % self.slots] = math.nan
+            self.last_bucket = bucket
+            self.total = 0.0
+            self.count = 0
+        self.total += value
+        self.count += 1
+        self.values[bucket % self.slots] = value if cumulative else self.total / self.count
+
+    def points(self, start: float, end: float) -> List[Tuple[float, float]]:
+        """(bucket start time, value) for the buckets overlapping [start, end]"""
+        if self.last_bucket is None:
+            return []
+        first = max(int(start // self.step), self.last_bucket - self.slots + 1)
+        last = min(int(end // self.step), self.last_bucket)
+        values = self.values
+        slots = self.slots
+        step = self.step
+        points = []
+        for bucket in range(first, last + 1):
+            value = values[bucket % slots]
+            if value == value:
+                points.append((bucket * step, value))
+        return points
+
+class Series:
+    """One labeled sample stream with a Ring per resolution"""
+
+    __slots__ = ("name", "labels", "cumulative", "rings", "last_seen")
+
+    def __init__(self, name: str, labels: Dict[str, str], cumulative: bool,
+                 resolutions: Sequence[Tuple[int, int]]):
+        self.name = name
+        self.labels = labels
+        self.cumulative = cumulative
+        self.rings = [Ring(step, retention // step) for step, retention in resolutions]
+        self.last_seen = 0.0
+
+    def add(self, now: float, value: float):
+        for ring in self.rings:
+            ring.add(now, value, self.cumulative)
+        self.last_seen = now
+
+def _is_cumulative(family_type: str, sample_name: str) -> bool:
+    if family_type == "counter":
+        return True
+    return family_type in ("histogram", "summary") and sample_name.endswith(("_count", "_sum", "_bucket"))
+
+def rate(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Per-second increase between consecutive points; a drop is a counter reset"""
+    rates = []
+    for (t0, v0), (t1, v1) in zip(points, points[1:]):
+        increase = v1 - v0 if v1 >= v0 else v1
+        rates.append((t1, increase / (t1 - t0)))
+    return rates
+
+_AGGREGATES = {
+    "sum": sum,
+    "avg": lambda values: sum(values) / len(values),
+    "min": min,
+    "max": max,
+    "count": len
+}
+
+def aggregate(series: List[dict], op: str, by: Sequence[str] = ()) -> List[dict]:
+    """Combine series point by point with `op`, one result per distinct value of the `by` labels"""
+    groups: Dict[tuple, Dict[float, list]] = {}
+    for item in series:
+        group = groups.setdefault(tuple(item["labels"].get(label, "") for label in by), {})
+        for timestamp, value in item["points"]:
+            group.setdefault(timestamp, []).append(value)
+    func = _AGGREGATES[op]
+    return [
+        {
+            "labels": dict(zip(by, key)),
+            "points": [(timestamp, func(values)) for timestamp, values in sorted(group.items())]
+        }
+        for key, group in sorted(groups.items())
+    ]
+
+class TimeSeriesStore:
+    """
+    Short-term history of selected METRICS_REGISTRY series, in memory
+
+    Every finest-resolution step a sampler thread collects the samples
+    whose names match `patterns` (shell-style, e.g. "http_requests_total"
+    or "admission_*"; _created samples never) and appends them to each
+    series' rings, e.g. 1h at 1s plus 24h at 1m. Only the collectors
+    providing those names are collected, but each of them in full: one
+    process_* or system_* name means a full SystemMetricsCollector
+    refresh (every mount, /proc/diskstats, /proc/net/dev, the process
+    counters) every step, or every METRICS_COLLECTION_INTERVAL if that
+    is longer, idle or not. Memory
+    is fixed per series (8 bytes per bucket of every resolution) and
+    bounded by `max_series`; samples of series beyond it are counted and
+    dropped. Series not seen for the longest retention are forgotten.
+
+    Answers from here keep working while Prometheus or Grafana are slow
+    or down. In multi-process mode every worker keeps its own values.
+    """
+
+    def __init__(self, patterns: Iterable[str], resolutions: Sequence[Tuple[int, int]],
+                 max_series: int, registry=METRICS_REGISTRY):
+        self.patterns = [pattern for pattern in patterns if pattern]
+        self.resolutions = list(resolutions)
+        self.step = self.resolutions[0][0]
+        self.max_series = max_series
+        self.registry = registry
+        self.series: Dict[tuple, Series] = {}
+        self._restricted = None
+        self._names_checked = 0.0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _selected(self):
+        """Registry view limited to the matching sample names"""
+        now = time.monotonic()
+        # Re-resolved now and then: collectors get registered after start
+        if self._restricted is None or now - self._names_checked >= 60:
+            with self.registry._lock:
+                names = list(self.registry._names_to_collectors)
+            selected = [
+                name for name in names
+                if not name.endswith("_created") and any(fnmatchcase(name, p) for p in self.patterns)
+            ]
+            self._restricted = self.registry.restricted_registry(selected)
+            self._names_checked = now
+        return self._restricted
+
+    def sample(self, now: Optional[float] = None):
+        """Append the current value of every selected series"""
+        now = time.time() if now is None else now
+        families = list(self._selected().collect())
+        dropped = 0
+        with self._lock:
+            for family in families:
+                for sample in family.samples:
+                    key = (sample.name,) + tuple(sorted(sample.labels.items()))
+                    series = self.series.get(key)
+                    if series is None:
+                        if len(self.series) >= self.max_series:
+                            dropped += 1
+                            continue
+                        series = self.series[key] = Series(
+                            sample.name, dict(sample.labels),
+                            _is_cumulative(family.type, sample.name), self.resolutions
+                        )
+                    series.add(now, sample.value)
+
+            expired = now - self.resolutions[-1][1]
+            for key in [key for key, series in self.series.items() if series.last_seen < expired]:
+                del self.series[key]
+            count = len(self.series)
+        TIMESERIES_SERIES.set(count)
+        if dropped:
+            TIMESERIES_DROPPED_SAMPLES.inc(dropped)
+
+    def names(self) -> Dict[str, int]:
+        """Stored sample names and how many series each has"""
+        counts = {}
+        with self._lock:
+            for series in self.series.values():
+                counts[series.name] = counts.get(series.name, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def resolution_for(self, start: float) -> int:
+        """Index of the finest resolution that still covers `start`"""
+        age = time.time() - start
+        for i, (_, retention) in enumerate(self.resolutions):
+            if age <= retention:
+                return i
+        return len(self.resolutions) - 1
+
+    def query(self, name: str, matchers: Dict[str, str], start: float, end: float,
+              fn: str = "raw", op: Optional[str] = None, by: Sequence[str] = ()) -> dict:
+        """
+        Points of series `name` with labels matching `matchers` in [start, end]
+
+        Read from the finest resolution that reaches back to `start`.
+        fn="rate" turns each series into its per-second rate; `op`
+        (sum, avg, min, max, count) then combines the series per
+        timestamp, keeping the `by` labels.
+        """
+        index = self.resolution_for(start)
+        with self._lock:
+            selected = [
+                (series.labels, series.rings[index].points(start, end))
+                for series in self.series.values()
+                if series.name == name and all(series.labels.get(k) == v for k, v in matchers.items())
+            ]
+
+        results = []
+        for labels, points in selected:
+            if fn == "rate":
+                points = rate(points)
+            results.append({"labels": labels, "points": points})
+        if op is not None:
+            results = aggregate(results, op, by)
+        else:
+            results.sort(key=lambda item: sorted(item["labels"].items()))
+        return {
+            "name": name,
+            "fn": fn,
+            "op": op,
+            "step": self.resolutions[index][0],
+            "start": start,
+            "end": end,
+            "series": results
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="timeseries-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        start_metrics_collection()
+        while True:
+            # On step boundaries, so each sample lands in its own bucket
+            if self._stopping.wait(self.step - time.time() % self.step):
+                return
+            started = perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling time series: {e}")
+            TIMESERIES_SAMPLE_DURATION.observe(perf_counter() - started)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+_store: Optional[TimeSeriesStore] = None
+
+def get_timeseries_store() -> Optional[TimeSeriesStore]:
+    """The running store, or None if it was not started"""
+    return _store
+
+def start_timeseries_store(patterns: Iterable[str], resolutions: str, max_series: int) -> TimeSeriesStore:
+    """Start the process-wide store (once)"""
+    global _store
+    if _store is None:
+        _store = TimeSeriesStore(patterns, parse_resolutions(resolutions), max_series)
+        _store.start()
+    return _store
+
+def stop_timeseries_store():
+    global _store
+    if _store is not None:
+        _store.stop(timeout=1.0)
+        _store = None
@@ -3,5 +3,6 @@ Middleware modules
 """
 
 from .metrics_middleware import MetricsMiddleware
+from .admission import AdmissionMiddleware
 
-__all__ = ['MetricsMiddleware']
\ No newline at end of file
+__all__ = ['MetricsMiddleware', 'AdmissionMiddleware']
\ No newline at end of file
@@ -0,0 +1,262 @@
+import asyncio
+import math
+from collections import deque
+from time import perf_counter
+from typing import Dict, Optional
+from app.config import settings
+from app.middleware.metrics_middleware import compile_path_matcher
+from app.metrics.admission_metrics import (
+    ADMISSION_LIMIT,
+    ADMISSION_INFLIGHT,
+    ADMISSION_QUEUED,
+    ADMISSION_SHED,
+    ADMISSION_QUEUE_WAIT
+)
+
+class GradientLimit:
+    """
+    Concurrency limit that follows the latency gradient (as in Netflix's Gradient limit)
+
+    Latencies are averaged over windows of `sample_window` seconds. Each
+    window's average is compared with a baseline, the latency the route
+    has when it is not queueing: a faster window lowers the baseline at
+    once, slower ones only pull it up over about `baseline_window` seconds
+    so it still follows routes that really got slower. While latency
+    stays within `tolerance` times the baseline the limit grows by about
+    sqrt(limit) per window; past that it shrinks in proportion, at most
+    halving. Averaging over time rather than over the last few
+    completions matters for routes with noisy latencies: right after a
+    burst the fast requests finish first and would make a baseline no
+    window can meet. The limit only grows while it is being used.
+
+    A baseline learnt while already overloaded makes any latency look
+    normal; `target` (seconds, 0 = off) is an absolute bound on top, and a
+    window slower than it halves the limit (multiplicative decrease).
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float = 2.0,
+                 smoothing: float = 0.5, sample_window: float = 0.5, min_samples: int = 10,
+                 baseline_window: float = 30.0, target: float = 0.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.sample_window = sample_window
+        self.min_samples = min_samples
+        self.baseline_window = baseline_window
+        self.target = target
+        self.window_rtt = None
+        self.baseline_rtt = None
+        self._window_end = None
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._window_inflight = 0
+
+    def update(self, rtt: float, inflight: int, now: float) -> float:
+        """Feed one request's latency (and the in-flight count when it started)"""
+        if self._window_end is None:
+            self._window_end = now + self.sample_window
+        self._window_sum += rtt
+        self._window_count += 1
+        self._window_inflight = max(self._window_inflight, inflight)
+        if now < self._window_end or self._window_count < self.min_samples:
+            return self.limit
+
+        self.window_rtt = self._window_sum / self._window_count
+        peak_inflight = self._window_inflight
+        self._window_end = now + self.sample_window
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._window_inflight = 0
+
+        if self.baseline_rtt is None or self.window_rtt < self.baseline_rtt:
+            self.baseline_rtt = self.window_rtt
+        else:
+            drift = min(1.0, self.sample_window / self.baseline_window)
+            self.baseline_rtt += (self.window_rtt - self.baseline_rtt) * drift
+
+        if self.target and self.window_rtt > self.target:
+            self.limit = max(self.min_limit, self.limit / 2)
+            return self.limit
+
+        # Not using half the limit: latency says nothing about the limit
+        if peak_inflight < self.limit / 2:
+            return self.limit
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline_rtt / self.window_rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        return self.limit
+
+class RouteClassGate:
+    """
+    Admission for one route class: adaptive limit plus a short wait queue
+
+    A request runs immediately while fewer than `limit` are in flight;
+    otherwise it waits in a FIFO of at most `queue_size` for up to
+    `queue_timeout` seconds. Finishing requests hand their slot straight
+    to the oldest waiter. Everything runs on the event loop, so no lock.
+    """
+
+    def __init__(self, name: str, limit: GradientLimit, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.waiters = deque()
+        self._limit_gauge = ADMISSION_LIMIT.labels(name)
+        self._inflight_gauge = ADMISSION_INFLIGHT.labels(name)
+        self._queued_gauge = ADMISSION_QUEUED.labels(name)
+        self._queue_wait = ADMISSION_QUEUE_WAIT.labels(name)
+        self._shed = {
+            reason: ADMISSION_SHED.labels(name, reason)
+            for reason in ("queue_full", "queue_timeout")
+        }
+        self._limit_gauge.set(limit.limit)
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; returns None when admitted, else the reason it was shed"""
+        if self.inflight < self.limit.limit and not self.waiters:
+            self._admit()
+            return None
+        if len(self.waiters) >= self.queue_size:
+            self._shed["queue_full"].inc()
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self._queued_gauge.set(len(self.waiters))
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self._shed["queue_timeout"].inc()
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            self._forget(waiter)
+            raise
+        self._queue_wait.observe(perf_counter() - start)
+        return None
+
+    def _forget(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as we gave up; pass it on
+            self.release(None, 0)
+        else:
+            waiter.cancel()
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+        self._queued_gauge.set(len(self.waiters))
+
+    def _admit(self):
+        self.inflight += 1
+        self._inflight_gauge.set(self.inflight)
+
+    def release(self, rtt: Optional[float], inflight: int):
+        """Free a slot, feeding the request's latency to the limit unless None"""
+        self.inflight -= 1
+        if rtt is not None:
+            self._limit_gauge.set(self.limit.update(rtt, inflight, perf_counter()))
+        while self.waiters and self.inflight < self.limit.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self._admit()
+                waiter.set_result(None)
+        self._inflight_gauge.set(self.inflight)
+        self._queued_gauge.set(len(self.waiters))
+
+def _parse_class_paths(value: str) -> Dict[str, list]:
+    """"bulk=/data/bulk,bulk=/import/*" to {"bulk": ["/data/bulk", "/import/*"]}"""
+    classes = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, _, pattern = item.partition("=")
+            classes.setdefault(name.strip(), []).append(pattern.strip())
+    return classes
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI admission control with an adaptive limit per route class
+
+    Requests are grouped into route classes: the ones configured in
+    ADMISSION_CLASS_PATHS, otherwise "read" (GET/HEAD/OPTIONS) or "write".
+    Each class has its own GradientLimit fed by the latency of the
+    requests it admitted, so slow writes do not eat the reads' budget.
+    Requests that cannot get a slot in time are answered with a fast 503
+    and Retry-After instead of piling up. ADMISSION_PRIORITY_PATHS
+    (health checks, scrapes) bypass admission entirely and are never shed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.is_priority = compile_path_matcher(settings.ADMISSION_PRIORITY_PATHS)
+        self.class_matchers = [
+            (name, compile_path_matcher(patterns))
+            for name, patterns in _parse_class_paths(settings.ADMISSION_CLASS_PATHS).items()
+        ]
+        self.gates: Dict[str, RouteClassGate] = {}
+        self.retry_after = str(max(1, math.ceil(settings.ADMISSION_RETRY_AFTER_SECONDS)))
+
+    def route_class(self, method: str, path: str) -> str:
+        for name, matches in self.class_matchers:
+            if matches(path):
+                return name
+        return "read" if method in _READ_METHODS else "write"
+
+    def gate(self, name: str) -> RouteClassGate:
+        gate = self.gates.get(name)
+        if gate is None:
+            limit = GradientLimit(
+                settings.ADMISSION_INITIAL_LIMIT,
+                settings.ADMISSION_MIN_LIMIT,
+                settings.ADMISSION_MAX_LIMIT,
+                tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+                target=settings.ADMISSION_LATENCY_TARGET
+            )
+            gate = self.gates[name] = RouteClassGate(
+                name, limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT
+            )
+        return gate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.is_priority(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gate(self.route_class(scope["method"], scope["path"]))
+        shed = await gate.acquire()
+        if shed is not None:
+            await self.reject(send)
+            return
+
+        inflight = gate.inflight
+        start = perf_counter()
+        rtt = None
+        try:
+            await self.app(scope, receive, send)
+            rtt = perf_counter() - start
+        finally:
+            # Failed or cancelled requests free their slot without a sample
+            gate.release(rtt, inflight)
+
+    async def reject(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", self.retry_after.encode())
+            ]
+        })
+        await send({
+            "type": "http.response.body",
+            "body": b'{"detail":"Server overloaded, retry later"}'
+        })
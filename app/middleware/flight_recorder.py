@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from time import perf_counter
+from typing import List, Optional
+
+# Phases in the order a request goes through them; "other" is the rest
+# of the request's time (routing, middleware, admission queueing)
+PHASES = ("receive", "validation", "handler", "serialization", "send")
+
+# Timing of the request running in the current context, set by MetricsMiddleware
+current_timing: ContextVar = ContextVar("current_timing", default=None)
+
+class RequestTiming:
+    """Per-phase seconds of one request, filled in as it runs"""
+
+    __slots__ = ("receive", "validation", "handler", "serialization", "send", "handler_end")
+
+    def __init__(self):
+        self.receive = 0.0
+        self.validation = 0.0
+        self.handler = 0.0
+        self.serialization = 0.0
+        self.send = 0.0
+        self.handler_end = None
+
+    def response_started(self, now: float):
+        """Everything between the endpoint returning and the first send is serialization"""
+        if self.handler_end is not None and now > self.handler_end:
+            self.serialization = now - self.handler_end
+
+    def phases(self, total: float) -> dict:
+        phases = {phase: getattr(self, phase) for phase in PHASES}
+        phases["other"] = max(0.0, total - sum(phases.values()))
+        return phases
+
+    def server_timing(self) -> bytes:
+        """Server-Timing header value for the phases known when the response starts"""
+        return ", ".join(
+            f"{phase};dur={getattr(self, phase) * 1000:.2f}" for phase in PHASES[:4]
+        ).encode()
+
+def _timed(func, phase: str):
+    async def wrapper(*args, **kwargs):
+        timing = current_timing.get()
+        if timing is None:
+            return await func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            end = perf_counter()
+            setattr(timing, phase, getattr(timing, phase) + end - start)
+            if phase == "handler":
+                timing.handler_end = end
+    wrapper.__wrapped__ = func
+    return wrapper
+
+_hooks_installed = False
+
+def install_phase_hooks() -> bool:
+    """
+    Time FastAPI's validation and endpoint call for the current request
+
+    fastapi.routing looks both functions up as module globals on every
+    request, so wrapping them there is enough. Returns False (and the two
+    phases stay 0) on a FastAPI version without them.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return True
+    import fastapi.routing as routing
+    if not hasattr(routing, "solve_dependencies") or not hasattr(routing, "run_endpoint_function"):
+        return False
+    routing.solve_dependencies = _timed(routing.solve_dependencies, "validation")
+    routing.run_endpoint_function = _timed(routing.run_endpoint_function, "handler")
+    _hooks_installed = True
+    return True
+
+class FlightRecorder:
+    """
+    Recent and slowest requests over `threshold` seconds, in fixed memory
+
+    Keeps the last `history` slow requests in a ring and the `top_n`
+    slowest since start in a min-heap (a new entry only displaces the
+    fastest of them). Requests under the threshold cost one comparison.
+    Used from the event loop thread only.
+    """
+
+    def __init__(self, threshold: float, history: int, top_n: int):
+        self.threshold = threshold
+        self.top_n = top_n
+        self.recent = deque(maxlen=history)
+        self.slowest = []
+        self.recorded = 0
+        self._sequence = itertools.count()
+        self._id_prefix = f"{os.getpid():x}-"
+
+    def new_request_id(self) -> str:
+        return f"{self._id_prefix}{next(self._sequence):x}"
+
+    def record(self, request_id: str, method: str, endpoint: str, status_code: int,
+               duration: float, timing: RequestTiming) -> dict:
+        entry = {
+            "request_id": request_id,
+            "method": method,
+            "endpoint": endpoint,
+            "status_code": status_code,
+            "duration": duration,
+            "phases": timing.phases(duration),
+            "timestamp": time.time()
+        }
+        self.recorded += 1
+        self.recent.append(entry)
+        item = (duration, self.recorded, entry)
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, item)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+        return entry
+
+    def recent_entries(self, limit: int) -> List[dict]:
+        """Newest first"""
+        return list(itertools.islice(reversed(self.recent), limit))
+
+    def slowest_entries(self, limit: int) -> List[dict]:
+        """Slowest first"""
+        return [entry for _, _, entry in heapq.nlargest(limit, self.slowest)]
+
+_recorder: Optional[FlightRecorder] = None
+
+def get_flight_recorder() -> Optional[FlightRecorder]:
+    """The process-wide recorder, or None if it was never started"""
+    return _recorder
+
+def start_flight_recorder(threshold: float, history: int, top_n: int) -> FlightRecorder:
+    """Create the recorder (once) and hook the FastAPI phases"""
+    global _recorder
+    if _recorder is None:
+        install_phase_hooks()
+        _recorder = FlightRecorder(threshold, history, top_n)
+    return _recorder
@@ -1,94 +1,206 @@
-import time
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+import fnmatch
+import random
+import re
+from time import perf_counter, perf_counter_ns
+from starlette.routing import Match
+from app.config import settings
+from app.middleware.resource_meter import ResourceMeter
+from app.middleware.flight_recorder import RequestTiming, current_timing, start_flight_recorder
 from app.metrics.http_metrics import (
     record_request_metrics,
+    record_request_resources,
     increment_active_requests,
     decrement_active_requests
 )
 
-class MetricsMiddleware(BaseHTTPMiddleware):
+# Endpoint label for requests that match no route (404 scanners etc.)
+UNMATCHED_ENDPOINT = "__unmatched__"
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+def compile_path_matcher(patterns):
+    """
+    Compile exclusion patterns into a single regex match function
+    
+    Plain entries are prefixes on a path-segment boundary ("/docs" matches
+    "/docs" and "/docs/oauth2-redirect" but not "/docsearch"); entries
+    containing *, ? or [ are shell-style globs over the whole path.
+    """
+    alternatives = []
+    for pattern in patterns:
+        if _GLOB_CHARS.search(pattern):
+            alternatives.append(fnmatch.translate(pattern))
+        else:
+            prefix = re.escape(pattern.rstrip("/"))
+            alternatives.append(f"{prefix}(?:/.*)?\\Z")
+    
+    if not alternatives:
+        return lambda path: False
+    
+    regex = re.compile("|".join(f"(?:{alt})" for alt in alternatives), re.DOTALL)
+    return lambda path: regex.match(path) is not None
+
+def resolve_route_template(scope) -> str:
     """
-    Middleware to collect HTTP request metrics
+    Resolve the request to its route template (e.g. /items/{item_id})
+    
+    Uses the router of the Starlette/FastAPI app stored in the scope so
+    raw path parameters never reach metric labels. A route that matches
+    the path but not the method still yields its template.
     """
+    router = getattr(scope.get("app"), "router", None)
+    if router is None:
+        return UNMATCHED_ENDPOINT
     
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match is Match.FULL:
+            return route.path
+        if match is Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ENDPOINT
+
+def request_id_from_scope(scope):
+    """The client's X-Request-ID header, if it sent one"""
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-id":
+            # Exemplar label values are limited to 128 characters in total
+            return value.decode("latin-1")[:64]
+    return None
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware to collect HTTP request metrics
+
+    Wraps `receive`/`send` directly instead of going through
+    BaseHTTPMiddleware, so responses are streamed through untouched and
+    request/response sizes are the bytes that actually crossed the wire.
+    The endpoint label is the matched route template, never the raw path.
+
+    With HTTP_RESOURCE_METRICS (or HTTP_ALLOC_SAMPLE_RATE > 0) each
+    request is also run through a ResourceMeter to attribute CPU time
+    and, for the sampled fraction, peak traced memory growth to its route.
+
+    With SLOW_REQUEST_RECORDER_ENABLED each request's phases are timed;
+    requests over SLOW_REQUEST_THRESHOLD_MS go to the flight recorder
+    (/debug/slow) and their latency observation carries the request id as
+    an exemplar. SLOW_REQUEST_SERVER_TIMING adds a Server-Timing header.
+    """
+
     def __init__(self, app, exclude_paths=None):
-        super().__init__(app)
+        self.app = app
         # Default paths to exclude from metrics
-        self.exclude_paths = exclude_paths or {'/metrics', '/favicon.ico'}
-    
-    async def dispatch(self, request: Request, call_next):
-        # Skip metrics collection for excluded paths
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
-        
+        self.exclude_paths = list(exclude_paths or settings.EXCLUDE_PATHS_FROM_METRICS)
+        self.is_excluded = compile_path_matcher(self.exclude_paths)
+        self.alloc_sample_rate = settings.HTTP_ALLOC_SAMPLE_RATE
+        self.meter_resources = settings.HTTP_RESOURCE_METRICS or self.alloc_sample_rate > 0
+        self.flight_recorder = None
+        if settings.SLOW_REQUEST_RECORDER_ENABLED:
+            self.flight_recorder = start_flight_recorder(
+                settings.SLOW_REQUEST_THRESHOLD_MS / 1000,
+                settings.SLOW_REQUEST_HISTORY,
+                settings.SLOW_REQUEST_TOP_N
+            )
+        self.server_timing = settings.SLOW_REQUEST_SERVER_TIMING and self.flight_recorder is not None
+
+    async def __call__(self, scope, receive, send):
+        # Only HTTP requests are measured; lifespan/websocket pass through
+        if scope["type"] != "http" or self.is_excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
         # Extract request information
-        method = request.method
-        endpoint = request.url.path
-        
-        # Get request size
+        method = scope["method"]
+        endpoint = resolve_route_template(scope)
+
         request_size = 0
-        if hasattr(request, 'headers'):
-            content_length = request.headers.get('content-length')
-            if content_length:
-                try:
-                    request_size = int(content_length)
-                except ValueError:
-                    pass
-        
-        # Increment active requests
-        increment_active_requests(method, endpoint)
-        
-        # Record start time
-        start_time = time.time()
-        
+        response_size = 0
+        status_code = 500
+        recorder = self.flight_recorder
+        timing = None
+        if recorder is not None:
+            timing = RequestTiming()
+            timing_token = current_timing.set(timing)
+
+        async def receive_wrapper():
+            nonlocal request_size
+            if timing is None:
+                message = await receive()
+            else:
+                started = perf_counter()
+                message = await receive()
+                # Waiting for a disconnect is not receiving
+                if message["type"] == "http.request":
+                    timing.receive += perf_counter() - started
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_size, status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timing is not None:
+                    timing.response_started(perf_counter())
+                    if self.server_timing:
+                        message = dict(message)
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"server-timing", timing.server_timing())
+                        ]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            if timing is None:
+                await send(message)
+            else:
+                started = perf_counter()
+                await send(message)
+                timing.send += perf_counter() - started
+
+        # Increment active requests (labels may come back as overflow)
+        active_labels = increment_active_requests(method, endpoint)
+
+        # Monotonic start time
+        start_ns = perf_counter_ns()
+
+        meter = None
         try:
-            # Process the request
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Get response size
-            response_size = 0
-            if hasattr(response, 'headers'):
-                content_length = response.headers.get('content-length')
-                if content_length:
-                    try:
-                        response_size = int(content_length)
-                    except ValueError:
-                        pass
-            
-            # Record metrics
-            record_request_metrics(
-                method=method,
-                endpoint=endpoint,
-                status_code=response.status_code,
-                duration=duration,
-                request_size=request_size,
-                response_size=response_size
-            )
-            
-            return response
-            
-        except Exception as e:
-            # Calculate duration for failed requests
-            duration = time.time() - start_time
-            
-            # Record metrics for failed requests (500 status)
+            if self.meter_resources:
+                trace = self.alloc_sample_rate > 0 and random.random() < self.alloc_sample_rate
+                meter = ResourceMeter(self.app(scope, receive_wrapper, send_wrapper), trace)
+                await meter
+            else:
+                await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            # Failed requests keep the default 500 unless a response was
+            # already started, matching what the client actually saw
+            duration = (perf_counter_ns() - start_ns) / 1e9
+
+            exemplar = None
+            if timing is not None:
+                current_timing.reset(timing_token)
+                if duration >= recorder.threshold:
+                    request_id = request_id_from_scope(scope) or recorder.new_request_id()
+                    recorder.record(request_id, method, endpoint, status_code, duration, timing)
+                    exemplar = {"request_id": request_id}
+
             record_request_metrics(
                 method=method,
                 endpoint=endpoint,
-                status_code=500,
+                status_code=status_code,
                 duration=duration,
                 request_size=request_size,
-                response_size=0
+                response_size=response_size,
+                exemplar=exemplar
             )
-            
-            # Re-raise the exception
-            raise e
-            
-        finally:
+            if meter is not None:
+                record_request_resources(
+                    method,
+                    endpoint,
+                    status_code,
+                    meter.cpu_ns / 1e9,
+                    meter.memory_growth_bytes if meter.trace_allocations else None
+                )
+
             # Always decrement active requests
-            decrement_active_requests(method, endpoint)
\ No newline at end of file
+            decrement_active_requests(*active_labels)
@@ -0,0 +1,107 @@
+import threading
+from time import thread_time_ns
+
+# tracemalloc is imported when the first request traces allocations
+tracemalloc = None
+
+# Requests currently tracing allocations; tracemalloc runs only while > 0
+_tracing_requests = 0
+_tracing_started_here = False
+_tracing_lock = threading.Lock()
+
+def _start_tracing():
+    global _tracing_requests, _tracing_started_here, tracemalloc
+    if tracemalloc is None:
+        import tracemalloc
+    with _tracing_lock:
+        if _tracing_requests == 0 and not tracemalloc.is_tracing():
+            # One frame per trace is the cheapest setting
+            tracemalloc.start(1)
+            _tracing_started_here = True
+        _tracing_requests += 1
+
+def _stop_tracing():
+    global _tracing_requests, _tracing_started_here
+    with _tracing_lock:
+        _tracing_requests -= 1
+        if _tracing_requests == 0 and _tracing_started_here:
+            tracemalloc.stop()
+            _tracing_started_here = False
+
+class ResourceMeter:
+    """
+    Measures the CPU time (and optionally peak memory growth) of one request
+
+    Requests interleave on the event loop thread, so a thread CPU delta
+    taken at the start and end of a request would include every other
+    request that ran in between. Instead the request's coroutine is
+    driven through `__await__` here and thread CPU time is read around
+    each step, i.e. only while this request's own code is running.
+
+    With `trace_allocations`, each step adds its peak traced memory above
+    the level it started at. That is how much memory the step needed at
+    once, not how much it allocated in total: memory freed and allocated
+    again within a step counts once. tracemalloc is process-wide, so
+    while a traced request is in flight every other request pays the
+    tracing overhead too, and allocations made by other threads during
+    a step (the threadpool, storage writers) are included in its peak.
+    """
+
+    __slots__ = ("coro", "trace_allocations", "cpu_ns", "memory_growth_bytes")
+
+    def __init__(self, coro, trace_allocations: bool = False):
+        self.coro = coro
+        self.trace_allocations = trace_allocations
+        self.cpu_ns = 0
+        self.memory_growth_bytes = 0
+
+    def __await__(self):
+        if self.trace_allocations:
+            _start_tracing()
+        try:
+            return (yield from self._drive())
+        finally:
+            if self.trace_allocations:
+                _stop_tracing()
+
+    def _drive(self):
+        coro = self.coro
+        trace = self.trace_allocations
+        send_value = None
+        error = None
+
+        while True:
+            if trace:
+                memory_before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            start = thread_time_ns()
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(send_value)
+            except StopIteration as stop:
+                self._end_step(start, trace, memory_before if trace else 0)
+                return stop.value
+            except BaseException:
+                self._end_step(start, trace, memory_before if trace else 0)
+                raise
+            self._end_step(start, trace, memory_before if trace else 0)
+
+            error = None
+            send_value = None
+            try:
+                send_value = yield yielded
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                # Cancellation and other errors thrown into the request
+                error = e
+
+    def _end_step(self, start: int, trace: bool, memory_before: int):
+        self.cpu_ns += thread_time_ns() - start
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            if peak > memory_before:
+                self.memory_growth_bytes += peak - memory_before
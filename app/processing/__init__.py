@@ -0,0 +1,10 @@
+"""
+Offloaded processing of data items
+
+Worker processes import app.processing.tasks, so this package imports
+nothing else: metrics and the event loop side live in app.processing.jobs.
+"""
+
+from .tasks import process_item
+
+__all__ = ['process_item']
@@ -0,0 +1,228 @@
+import asyncio
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Optional
+from app.config import settings
+from app.metrics.processing_metrics import (
+    PROCESSING_QUEUE_DEPTH,
+    PROCESSING_QUEUE_WAIT,
+    PROCESSING_JOB_DURATION,
+    PROCESSING_JOBS,
+    PROCESSING_WORKERS,
+    PROCESSING_WORKERS_BUSY,
+    PROCESSING_BUSY_SECONDS
+)
+from app.processing import tasks
+from app.storage.ids import new_ulid
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is full"""
+    pass
+
+class Job:
+    """One queued computation and, once finished, its result or error"""
+
+    __slots__ = ("id", "status", "submitted_at", "started_at", "finished_at", "result", "error", "done")
+
+    def __init__(self, job_id: str, done: asyncio.Future):
+        self.id = job_id
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.done = done
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+class JobQueue:
+    """
+    Bounded queue of CPU-bound jobs run in a process pool
+
+    Jobs wait in an asyncio.Queue of `queue_size`; `submit` raises QueueFull
+    instead of letting the backlog grow. One consumer task per pool worker
+    hands jobs to the executor, so the pool never holds more than it can
+    run and queue depth and wait are measured here. The computation runs
+    in the pool; its `finalize` coroutine (e.g. storing the result) runs on
+    the event loop afterwards. The last `history` jobs stay available for
+    status polling.
+
+    `executor` is "process" (default) or "thread"; threads share the GIL
+    with the event loop and only make sense for work that releases it.
+    """
+
+    def __init__(self, workers: int, queue_size: int, history: int,
+                 executor: str = "process", start_method: str = "spawn"):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.history = history
+        self.executor_kind = executor
+        self.start_method = start_method
+        self.executor = None
+        self.queue = None
+        self.jobs = OrderedDict()
+        self.busy = 0
+        self._consumers = []
+
+    def _create_executor(self):
+        if self.executor_kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="processing")
+        # Not fork: the parent runs threads (storage writer, loop watchdog)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method)
+        )
+
+    def start(self):
+        """Create the executor and the consumer tasks; call from the event loop"""
+        if self._consumers:
+            return
+        self.executor = self._create_executor()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        PROCESSING_WORKERS.set(self.workers)
+
+    def warm_up(self):
+        """Start every pool worker now rather than on the first job; blocking"""
+        futures = [self.executor.submit(tasks.warm_up) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    async def stop(self):
+        """Cancel the consumers, fail queued jobs and shut the pool down"""
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        while self.queue is not None and not self.queue.empty():
+            job = self.queue.get_nowait()[0]
+            self._finish(job, error="Shutting down")
+        if self.executor is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.executor.shutdown(wait=True, cancel_futures=True)
+            )
+        PROCESSING_QUEUE_DEPTH.set(0)
+        PROCESSING_WORKERS.set(0)
+
+    def submit(self, func: Callable, args: tuple,
+               finalize: Optional[Callable[[Any], Awaitable[Any]]] = None) -> Job:
+        """Queue `func(*args)` for the pool; raises QueueFull if the queue is full"""
+        # Started by the app's startup hook; also on first use without one
+        self.start()
+        if self.queue.full():
+            PROCESSING_JOBS.labels("rejected").inc()
+            raise QueueFull()
+        job = Job(f"job_{new_ulid()}", asyncio.get_running_loop().create_future())
+        self.jobs[job.id] = job
+        self._trim_history()
+        self.queue.put_nowait((job, func, args, finalize, perf_counter()))
+        PROCESSING_QUEUE_DEPTH.set(self.queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: Job, min_seconds: float = 0.0) -> Job:
+        """
+        Wait for `job` to finish, and for at least `min_seconds`
+
+        Cancelling the waiter does not cancel the job.
+        """
+        if min_seconds > 0:
+            await asyncio.gather(asyncio.shield(job.done), asyncio.sleep(min_seconds))
+        else:
+            await asyncio.shield(job.done)
+        return job
+
+    def _trim_history(self):
+        while len(self.jobs) > self.history:
+            for job_id, job in self.jobs.items():
+                if job.finished:
+                    del self.jobs[job_id]
+                    break
+            else:
+                return
+
+    def _finish(self, job: Job, result: Any = None, error: Optional[str] = None):
+        job.status = "failed" if error is not None else "completed"
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        PROCESSING_JOBS.labels(job.status).inc()
+        if not job.done.done():
+            job.done.set_result(None)
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, func, args, finalize, queued_at = await self.queue.get()
+            PROCESSING_QUEUE_DEPTH.set(self.queue.qsize())
+            started = perf_counter()
+            PROCESSING_QUEUE_WAIT.observe(started - queued_at)
+            job.status = "running"
+            job.started_at = time.time()
+
+            self.busy += 1
+            PROCESSING_WORKERS_BUSY.set(self.busy)
+            executor = self.executor
+            try:
+                result = await loop.run_in_executor(executor, func, *args)
+            except asyncio.CancelledError:
+                self._finish(job, error="Shutting down")
+                raise
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); later jobs get a new pool
+                if self.executor is executor:
+                    self.executor = self._create_executor()
+                self._finish(job, error="Worker process died")
+                continue
+            except Exception as e:
+                self._finish(job, error=f"{type(e).__name__}: {e}")
+                continue
+            finally:
+                elapsed = perf_counter() - started
+                self.busy -= 1
+                PROCESSING_WORKERS_BUSY.set(self.busy)
+                PROCESSING_JOB_DURATION.observe(elapsed)
+                PROCESSING_BUSY_SECONDS.inc(elapsed)
+
+            try:
+                if finalize is not None:
+                    result = await finalize(result)
+            except Exception as e:
+                self._finish(job, error=f"{type(e).__name__}: {e}")
+            else:
+                self._finish(job, result)
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """The process-wide job queue (created, not started, on first use)"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            settings.PROCESSING_WORKERS,
+            settings.PROCESSING_QUEUE_SIZE,
+            settings.PROCESSING_JOB_HISTORY,
+            settings.PROCESSING_EXECUTOR,
+            settings.PROCESSING_START_METHOD
+        )
+    return _job_queue
@@ -0,0 +1,30 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+# Runs in pool worker processes: keep imports to the standard library
+
+def warm_up() -> int:
+    """No-op job used to start the pool's workers ahead of the first request"""
+    return 0
+
+def process_item(name: str, value: int, metadata: Optional[Dict[str, Any]], work_seconds: float) -> dict:
+    """
+    Stand-in for the CPU-heavy transform of one item
+
+    Hashes the item repeatedly for `work_seconds` of CPU time and returns
+    the digest with the wall time it took.
+    """
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    digest = hashlib.sha256(
+        json.dumps([name, value, metadata], sort_keys=True, default=str).encode()
+    ).digest()
+    while time.process_time() - cpu_start < work_seconds:
+        for _ in range(1000):
+            digest = hashlib.sha256(digest).digest()
+    return {
+        "digest": digest.hex(),
+        "processing_time": time.perf_counter() - start
+    }
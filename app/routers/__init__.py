@@ -2,6 +2,7 @@
 API routers
 """
 
-from . import api, health
+# debug is imported by app.main only when DEBUG_ENDPOINTS_ENABLED is set
+from . import api, bulk, health, metrics
 
-__all__ = ['api', 'health']
\ No newline at end of file
+__all__ = ['api', 'bulk', 'health', 'metrics']
\ No newline at end of file
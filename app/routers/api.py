@@ -1,12 +1,25 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
+import json
 import time
 import random
-import asyncio
+from app.cache import ResponseCache
+from app.config import settings
+from app.processing import process_item
+from app.processing.jobs import QueueFull, get_job_queue
+from app.storage import get_storage, new_ulid
 
 router = APIRouter()
 
+# Serialized GET /data pages, valid until the next write
+DATA_CACHE = ResponseCache(
+    "data",
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+)
+
 # Data models
 class DataRequest(BaseModel):
     name: str
@@ -19,43 +32,119 @@ class DataResponse(BaseModel):
     timestamp: float
     data: Optional[Dict[str, Any]] = None
 
-# In-memory storage for demo
-data_store = {}
+# Items live in the configured storage backend (STORAGE_BACKEND), ordered by id
+ITEM_FIELDS = ("name", "value", "metadata", "created_at", "processing_time")
 
-@router.get("/data")
-async def get_data():
+def parse_fields(fields: Optional[str]) -> tuple:
+    """Validate a comma-separated field projection (all fields if omitted)"""
+    if not fields:
+        return ITEM_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return selected
+
+def project(item: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    """Copy only the selected fields of a stored item"""
+    if fields is ITEM_FIELDS:
+        return item
+    return {field: item[field] for field in fields}
+
+async def stream_ndjson(cursor: Optional[str], limit: Optional[int], fields: tuple):
     """
-    Sample data retrieval endpoint
-    Returns all stored data
+    Yield items as NDJSON, DATA_STREAM_CHUNK_SIZE lines per chunk
+    
+    Each chunk is one storage page after the previous chunk's last id, so
+    memory stays bounded by one chunk however large the store is.
     """
-    return {
-        "message": "Data retrieved successfully",
-        "count": len(data_store),
-        "data": data_store,
-        "timestamp": time.time()
-    }
+    storage = get_storage()
+    remaining = limit
+    chunk_size = settings.DATA_STREAM_CHUNK_SIZE
+    while remaining is None or remaining > 0:
+        take = chunk_size if remaining is None else min(chunk_size, remaining)
+        items = await storage.page(cursor, take)
+        if not items:
+            break
+        cursor = items[-1][0]
+        if remaining is not None:
+            remaining -= len(items)
+        yield "".join(
+            json.dumps({"id": item_id, **project(item, fields)}) + "\n"
+            for item_id, item in items
+        )
 
-@router.post("/data")
-async def post_data(request: DataRequest):
+@router.get("/data")
+async def get_data(
+    limit: Optional[int] = Query(None, ge=1, le=settings.DATA_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Sample data processing endpoint
-    Simulates data processing with variable delay
+    Sample data retrieval endpoint
+    Returns stored data one page at a time, ordered by id
+    
+    - limit: page size (DATA_PAGE_SIZE_DEFAULT if omitted in json format)
+    - cursor: `next_cursor` from the previous page
+    - fields: comma-separated projection, e.g. "name,value" skips metadata
+    - format: "ndjson" streams one item per line (no limit = whole store)
+    
+    JSON pages carry an ETag that changes with every write; send it back
+    as If-None-Match to get a 304 while nothing has changed.
     """
-    # Simulate processing time
-    processing_time = random.uniform(0.1, 0.5)
-    await asyncio.sleep(processing_time)
+    selected = parse_fields(fields)
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(cursor, limit, selected),
+            media_type="application/x-ndjson"
+        )
+    
+    storage = get_storage()
+    page_size = limit or settings.DATA_PAGE_SIZE_DEFAULT
     
-    # Generate unique ID
-    item_id = f"item_{int(time.time() * 1000)}"
+    async def render() -> bytes:
+        # One extra item tells us whether another page follows
+        items = await storage.page(cursor, page_size + 1)
+        next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_cursor = items[-1][0]
+        
+        # Stored items are plain JSON types; skip jsonable_encoder
+        return JSONResponse({
+            "message": "Data retrieved successfully",
+            "count": await storage.count(),
+            "data": {item_id: project(item, selected) for item_id, item in items},
+            "next_cursor": next_cursor,
+            "timestamp": time.time()
+        }).body
+    
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return Response(await render(), media_type="application/json")
+    return await DATA_CACHE.respond(
+        (cursor, page_size, selected), await storage.data_version(), render, if_none_match
+    )
+
+async def store_processed(request: DataRequest, result: dict, simulated_latency: float = 0.0) -> dict:
+    """Store an item once its processing job is done; the job's result"""
+    # Generate unique, time-ordered ID
+    item_id = f"item_{new_ulid()}"
+    processing_time = result["processing_time"] + simulated_latency
     
     # Store data
-    data_store[item_id] = {
+    await get_storage().put(item_id, {
         "name": request.name,
         "value": request.value,
         "metadata": request.metadata,
         "created_at": time.time(),
         "processing_time": processing_time
-    }
+    })
     
     return DataResponse(
         id=item_id,
@@ -66,4 +155,63 @@ async def post_data(request: DataRequest):
             "value": request.value,
             "processing_time": processing_time
         }
-    )
\ No newline at end of file
+    ).model_dump()
+
+@router.post("/data")
+async def post_data(
+    request: DataRequest,
+    mode: str = Query("sync", pattern="^(sync|async)$")
+):
+    """
+    Sample data processing endpoint
+    Processing (a CPU-bound transform) runs in the process pool, off the
+    event loop. Unless PROCESSING_CPU_WORK is set, the transform is a
+    single hash and the simulated processing time is waited out instead
+    
+    - mode: "sync" waits for the result; "async" answers 202 at once with
+      a job id to poll at /jobs/{job_id}
+    
+    A full processing queue is answered with 503 and Retry-After.
+    """
+    duration = random.uniform(
+        settings.PROCESSING_WORK_SECONDS_MIN, settings.PROCESSING_WORK_SECONDS_MAX
+    )
+    if settings.PROCESSING_CPU_WORK:
+        work_seconds, simulated_latency = duration, 0.0
+    else:
+        work_seconds, simulated_latency = 0.0, duration
+    try:
+        job = get_job_queue().submit(
+            process_item,
+            (request.name, request.value, request.metadata, work_seconds),
+            finalize=lambda result: store_processed(request, result, simulated_latency)
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full",
+            headers={"Retry-After": "1"}
+        )
+    
+    if mode == "async":
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+            status_code=202,
+            headers={"Location": f"/jobs/{job.id}"}
+        )
+    
+    await get_job_queue().wait(job, min_seconds=simulated_latency)
+    if job.error is not None:
+        raise HTTPException(status_code=500, detail=f"Processing failed: {job.error}")
+    return job.result
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of a processing job: queued, running, completed or failed
+    Completed jobs include the stored item's response as `result`.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
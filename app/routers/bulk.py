@@ -0,0 +1,300 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import codecs
+import json
+import time
+from app.config import settings
+from app.metrics.http_metrics import BULK_REQUEST_SIZE, BULK_BATCH_SIZE
+from app.routers.api import DataRequest
+from app.storage import get_storage, new_ulid
+
+router = APIRouter()
+
+# Validates a whole batch of records in one pydantic-core call
+DATA_BATCH_ADAPTER = TypeAdapter(List[DataRequest])
+
+class BodyTooLarge(Exception):
+    pass
+
+class BodyReader:
+    """Async iterator over body chunks that counts bytes and enforces BULK_MAX_BYTES"""
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.received = 0
+
+    async def __aiter__(self):
+        async for chunk in self.request.stream():
+            self.received += len(chunk)
+            if self.received > settings.BULK_MAX_BYTES:
+                raise BodyTooLarge()
+            if chunk:
+                yield chunk
+
+class RecordTooLarge(Exception):
+    pass
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, str]]:
+    """
+    Yield (record, error) per non-empty NDJSON line; error is "" if it parsed
+
+    Only each new chunk is searched for newlines; the chunks of a line
+    that spans several are joined once, when its newline arrives. Lines
+    over BULK_MAX_RECORD_BYTES raise RecordTooLarge.
+    """
+    limit = settings.BULK_MAX_RECORD_BYTES
+    parts: List[bytes] = []
+    pending = 0
+    async for chunk in chunks:
+        lines = chunk.split(b"\n")
+        if len(lines) == 1:
+            pending += len(chunk)
+            if pending > limit:
+                raise RecordTooLarge()
+            parts.append(chunk)
+            continue
+        parts.append(lines[0])
+        lines[0] = b"".join(parts)
+        for line in lines[:-1]:
+            if len(line) > limit:
+                raise RecordTooLarge()
+            if line.strip():
+                yield _parse_line(line)
+        parts = [lines[-1]]
+        pending = len(lines[-1])
+        if pending > limit:
+            raise RecordTooLarge()
+    line = b"".join(parts)
+    if line.strip():
+        yield _parse_line(line)
+
+def _parse_line(line: bytes) -> Tuple[Any, str]:
+    try:
+        return json.loads(line), ""
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+
+# Characters that can end an element starting with the given one; until
+# one arrives, an incomplete element is not decoded again
+_CLOSERS = {"{": "}", "[": "]", '"': '"'}
+_DELIMITERS = ",] \t\r\n"
+_NUMBER_CHARACTERS = "0123456789.eE+-"
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, str]]:
+    """
+    Yield (record, "") for each element of a JSON array body as it streams in
+
+    Elements are decoded with raw_decode as soon as they are complete, so
+    the whole array is never held as one string. An element split across
+    chunks is buffered as a list of parts and only decoded again once a
+    chunk brings a character that could end it, and elements over
+    BULK_MAX_RECORD_BYTES raise RecordTooLarge, so a huge element cannot
+    make parsing quadratic. Empty elements ("[1,,2]", "[1,]") and anything
+    but whitespace after the closing "]" raise ValueError.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    limit = settings.BULK_MAX_RECORD_BYTES
+    # "open" (before "["), "first" (element or "]"), "element",
+    # "separator" ("," or "]") or "done"
+    state = "open"
+    parts: List[str] = []
+    pending = 0
+    closers = None
+
+    async for chunk in chunks:
+        text = text_decoder.decode(chunk)
+        if closers is not None:
+            # Waiting for the rest of an incomplete element
+            parts.append(text)
+            pending += len(chunk)
+            if pending > limit:
+                raise RecordTooLarge()
+            if not any(closer in text for closer in closers):
+                continue
+            text = "".join(parts)
+            parts = []
+            closers = None
+
+        position = 0
+        while True:
+            position = _skip_whitespace(text, position)
+            if position >= len(text):
+                break
+            char = text[position]
+            if state == "done":
+                raise ValueError("unexpected data after the JSON array")
+            if state == "open":
+                if char != "[":
+                    raise ValueError("body is not a JSON array")
+                state = "first"
+                position += 1
+                continue
+            if state == "separator":
+                if char not in ",]":
+                    raise ValueError(f"unexpected {char!r} after array element")
+                state = "element" if char == "," else "done"
+                position += 1
+                continue
+            if char == "]" and state == "first":
+                state = "done"
+                position += 1
+                continue
+            if char in ",]":
+                raise ValueError(f"missing array element before {char!r}")
+
+            try:
+                record, end = decoder.raw_decode(text, position)
+            except ValueError:
+                end = None
+            # A number at the end of the text could still continue
+            if end is None or (char not in _CLOSERS and (
+                    end == len(text) or text[end] in _NUMBER_CHARACTERS)):
+                parts = [text[position:]]
+                pending = len(parts[0].encode("utf-8"))
+                if pending > limit:
+                    raise RecordTooLarge()
+                closers = _CLOSERS.get(char, _DELIMITERS)
+                break
+            if _encoded_length_over(text, position, end, limit):
+                raise RecordTooLarge()
+            state = "separator"
+            position = end
+            yield record, ""
+
+    if closers is not None:
+        # Report why the last element did not decode, if it does not
+        try:
+            decoder.raw_decode("".join(parts))
+        except ValueError as e:
+            raise ValueError(f"invalid array element: {e}")
+    if state != "done":
+        raise ValueError("unterminated JSON array")
+
+def _skip_whitespace(text: str, position: int) -> int:
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position
+
+def _encoded_length_over(text: str, start: int, end: int, limit: int) -> bool:
+    """Whether text[start:end] is over `limit` bytes in UTF-8 (1-4 bytes per character)"""
+    length = end - start
+    if length * 4 <= limit:
+        return False
+    return length > limit or len(text[start:end].encode("utf-8")) > limit
+
+def validate_batch(records: List[Any]) -> Tuple[List[DataRequest], Dict[int, str]]:
+    """
+    Validate records in one call; returns (valid models, {index: error})
+
+    When the batch fails, the offending indices are read from the error
+    locations and the remaining records are validated again as a batch.
+    """
+    try:
+        return DATA_BATCH_ADAPTER.validate_python(records), {}
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors(include_url=False):
+            index = error["loc"][0]
+            if index not in errors:
+                field = ".".join(str(part) for part in error["loc"][1:]) or "item"
+                errors[index] = f"{field}: {error['msg']}"
+
+    good_indices = [i for i in range(len(records)) if i not in errors]
+    valid = DATA_BATCH_ADAPTER.validate_python([records[i] for i in good_indices])
+    # Keep positions aligned with `records`: None where validation failed
+    aligned = [None] * len(records)
+    for i, model in zip(good_indices, valid):
+        aligned[i] = model
+    return aligned, errors
+
+@router.post("/data/bulk")
+async def post_data_bulk(request: Request):
+    """
+    Bulk data ingestion endpoint
+    Accepts an NDJSON body (application/x-ndjson) or a JSON array of
+    DataRequest records, validates them in batches and stores all valid
+    items in one write. Returns a result per record, in input order.
+    """
+    start = time.perf_counter()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    body_format = "ndjson" if content_type in ("application/x-ndjson", "application/jsonl") else "json"
+    parse = iter_ndjson if body_format == "ndjson" else iter_json_array
+
+    body = BodyReader(request)
+    results: List[Dict[str, Any]] = []
+    items: List[Tuple[str, Dict[str, Any]]] = []
+    batch: List[Any] = []
+    batch_indices: List[int] = []
+
+    def flush_batch():
+        models, errors = validate_batch(batch)
+        for position, index in enumerate(batch_indices):
+            if position in errors:
+                results[index] = {"index": index, "error": errors[position]}
+                continue
+            model = models[position]
+            item_id = f"item_{new_ulid()}"
+            items.append((item_id, {
+                "name": model.name,
+                "value": model.value,
+                "metadata": model.metadata,
+            }))
+            results[index] = {"index": index, "id": item_id}
+        batch.clear()
+        batch_indices.clear()
+
+    try:
+        async for record, error in parse(body):
+            index = len(results)
+            if index >= settings.BULK_MAX_ITEMS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"More than {settings.BULK_MAX_ITEMS} records"
+                )
+            if error:
+                results.append({"index": index, "error": error})
+                continue
+            results.append(None)
+            batch.append(record)
+            batch_indices.append(index)
+            if len(batch) >= settings.BULK_VALIDATE_BATCH_SIZE:
+                flush_batch()
+        if batch:
+            flush_batch()
+    except BodyTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Body larger than {settings.BULK_MAX_BYTES} bytes"
+        )
+    except RecordTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Record larger than {settings.BULK_MAX_RECORD_BYTES} bytes"
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+
+    # Amortized per-record parse/validation time for the stored items
+    created_at = time.time()
+    processing_time = (time.perf_counter() - start) / max(len(results), 1)
+    for _, item in items:
+        item["created_at"] = created_at
+        item["processing_time"] = processing_time
+
+    if items:
+        await get_storage().put_many(items)
+
+    BULK_REQUEST_SIZE.labels(format=body_format).observe(body.received)
+    BULK_BATCH_SIZE.labels(format=body_format).observe(len(results))
+
+    return JSONResponse({
+        "message": "Bulk data processed",
+        "received": len(results),
+        "accepted": len(items),
+        "rejected": len(results) - len(items),
+        "results": results,
+        "timestamp": time.time()
+    })
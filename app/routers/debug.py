@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+import time
+from app.config import settings
+from app.diagnostics import ProfilerBusy, run_profile, get_loop_monitor
+from app.middleware.flight_recorder import get_flight_recorder
+
+router = APIRouter()
+
+def require_debug_access(x_debug_token: Optional[str] = Header(None)):
+    """
+    Guard for /debug/* endpoints
+    Disabled endpoints answer 404 so they are not discoverable; with
+    DEBUG_TOKEN set, the X-Debug-Token header must match it.
+    """
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.DEBUG_TOKEN and not hmac.compare_digest(
+        (x_debug_token or "").encode(), settings.DEBUG_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+@router.get("/debug/profile", dependencies=[Depends(require_debug_access)])
+async def profile(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Keep samples of waiting threads"),
+    mode: str = Query("auto", pattern="^(auto|signal|thread)$"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """
+    Sample the live process's stacks for `seconds`
+    mode=signal samples the event loop thread on CPU time (default where
+    available), mode=thread samples every thread on wall time.
+    Returns collapsed stacks (one "frame;frame;... count" line each, for
+    flamegraph.pl or speedscope) rooted at the request route that was
+    running, or a JSON summary with per-route sample counts.
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {settings.PROFILE_MAX_SECONDS}"
+        )
+    interval = (interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS) / 1000
+
+    try:
+        result = await run_profile(seconds, interval, include_idle, mode)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "json":
+        return result.to_dict()
+    return PlainTextResponse(result.collapsed())
+
+@router.get("/debug/loop", dependencies=[Depends(require_debug_access)])
+async def event_loop_blocks(limit: int = Query(20, ge=1, le=1000)):
+    """
+    Recent event loop blocking events, newest first
+    Each has the loop thread's stack when the block was detected, the
+    route that was running and how long the loop was blocked in total.
+    """
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Event loop monitor is not running")
+    return {
+        "interval": monitor.interval,
+        "threshold": monitor.threshold,
+        "events": monitor.recent_events()[:limit],
+        "timestamp": time.time()
+    }
+
+@router.get("/debug/slow", dependencies=[Depends(require_debug_access)])
+async def slow_requests(limit: int = Query(20, ge=1, le=1000)):
+    """
+    Requests slower than SLOW_REQUEST_THRESHOLD_MS
+    `recent` is newest first, `slowest` the slowest since start. Each
+    entry has the request id (also the exemplar on its latency bucket)
+    and seconds spent receiving the body, validating, in the endpoint,
+    serializing, sending and elsewhere (routing, middleware, queueing).
+    """
+    recorder = get_flight_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=503, detail="Slow request recorder is not running")
+    return {
+        "threshold": recorder.threshold,
+        "recorded": recorder.recorded,
+        "recent": recorder.recent_entries(limit),
+        "slowest": recorder.slowest_entries(limit),
+        "timestamp": time.time()
+    }
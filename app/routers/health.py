@@ -1,11 +1,19 @@
 from fastapi import APIRouter, HTTPException
 import time
-import psutil
 import platform
+from app.config import settings
 from app.metrics.http_metrics import get_application_uptime
+from app.metrics.system_metrics import get_system_snapshot
 
 router = APIRouter()
 
+# Static platform details, read once
+PLATFORM_INFO = {
+    "platform": platform.system(),
+    "platform_version": platform.release(),
+    "python_version": platform.python_version()
+}
+
 @router.get("/health")
 async def health_check():
     """
@@ -21,12 +29,18 @@ async def health_check():
 async def detailed_health_check():
     """
     Detailed health check with system information
+    
+    Served from the snapshot shared with the system metrics collector;
+    the event loop never waits on a psutil read except on the first call.
     """
     try:
         # Get system information
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        snapshot = await get_system_snapshot()
+        if snapshot is None:
+            raise RuntimeError("system metrics unavailable")
+        cpu_percent = snapshot["cpu_percent"]
+        memory = snapshot["memory"]
+        disk = snapshot["disk"]
         
         # Get application uptime
         uptime = get_application_uptime()
@@ -36,22 +50,23 @@ async def detailed_health_check():
         issues = []
         
         # Check CPU usage
-        if cpu_percent > 80:
+        if cpu_percent > settings.CPU_THRESHOLD_WARNING:
             status = "warning"
             issues.append(f"High CPU usage: {cpu_percent:.1f}%")
         
         # Check memory usage
-        if memory.percent > 80:
+        if memory["percent"] > settings.MEMORY_THRESHOLD_WARNING:
             status = "warning"
-            issues.append(f"High memory usage: {memory.percent:.1f}%")
+            issues.append(f"High memory usage: {memory['percent']:.1f}%")
         
         # Check disk usage
-        if (disk.used / disk.total) * 100 > 80:
+        if disk and disk["percent"] > settings.DISK_THRESHOLD_WARNING:
             status = "warning"
-            issues.append(f"High disk usage: {(disk.used / disk.total) * 100:.1f}%")
+            issues.append(f"High disk usage: {disk['percent']:.1f}%")
         
         # If there are critical issues, mark as unhealthy
-        if cpu_percent > 95 or memory.percent > 95:
+        if (cpu_percent > settings.CPU_THRESHOLD_CRITICAL
+                or memory["percent"] > settings.MEMORY_THRESHOLD_CRITICAL):
             status = "unhealthy"
         
         return {
@@ -59,23 +74,12 @@ async def detailed_health_check():
             "timestamp": time.time(),
             "uptime": uptime,
             "system": {
-                "platform": platform.system(),
-                "platform_version": platform.release(),
-                "python_version": platform.python_version(),
-                "cpu_count": psutil.cpu_count(),
+                **PLATFORM_INFO,
+                "cpu_count": snapshot["cpu_count"],
                 "cpu_percent": cpu_percent,
-                "memory": {
-                    "total": memory.total,
-                    "available": memory.available,
-                    "used": memory.used,
-                    "percent": memory.percent
-                },
-                "disk": {
-                    "total": disk.total,
-                    "used": disk.used,
-                    "free": disk.free,
-                    "percent": (disk.used / disk.total) * 100
-                }
+                "memory": memory,
+                "disk": disk,
+                "sampled_at": snapshot["sampled_at"]
             },
             "issues": issues
         }
@@ -0,0 +1,106 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+import asyncio
+import time
+from app.config import settings
+from app.metrics.http_metrics import LATENCY_SKETCHES
+from app.metrics.multiprocess import is_multiprocess_enabled
+from app.metrics.timeseries import get_timeseries_store
+
+router = APIRouter()
+
+def parse_quantiles(quantiles: Optional[str]) -> list:
+    """Validate a comma-separated quantile list (configured ones if omitted)"""
+    if not quantiles:
+        return settings.LATENCY_QUANTILES
+    try:
+        parsed = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Quantiles must be numbers")
+    if not parsed or any(not 0 <= q <= 1 for q in parsed):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    return parsed
+
+def parse_matchers(match: Optional[str]) -> dict:
+    """"endpoint=/data,method=GET" to {"endpoint": "/data", "method": "GET"}"""
+    matchers = {}
+    for item in (match or "").split(","):
+        if not item.strip():
+            continue
+        if "=" not in item:
+            raise HTTPException(status_code=400, detail=f"Invalid label matcher {item!r}")
+        key, _, value = item.partition("=")
+        matchers[key.strip()] = value.strip()
+    return matchers
+
+@router.get("/metrics/quantiles")
+async def get_latency_quantiles(q: Optional[str] = Query(None, description="Comma-separated quantiles, e.g. 0.5,0.99")):
+    """
+    Request latency quantiles per route
+    Read from the latency sketches over the last SKETCH_WINDOW_SECONDS to
+    twice that; values are within SKETCH_RELATIVE_ACCURACY of the truth.
+    In multi-process mode all workers are merged.
+    """
+    quantiles = parse_quantiles(q)
+    if is_multiprocess_enabled():
+        views = LATENCY_SKETCHES.load_published(settings.PROMETHEUS_MULTIPROC_DIR)
+    else:
+        views = LATENCY_SKETCHES.views()
+
+    routes = []
+    for (method, endpoint), (sketch, count, total) in sorted(views.items()):
+        routes.append({
+            "method": method,
+            "endpoint": endpoint,
+            "count": count,
+            "sum": total,
+            "window_count": sketch.count,
+            "min": sketch.min if sketch.count else None,
+            "max": sketch.max if sketch.count else None,
+            "quantiles": {str(quantile): sketch.quantile(quantile) for quantile in quantiles}
+        })
+
+    return {
+        "relative_accuracy": settings.SKETCH_RELATIVE_ACCURACY,
+        "window_seconds": settings.SKETCH_WINDOW_SECONDS,
+        "routes": routes,
+        "timestamp": time.time()
+    }
+
+@router.get("/metrics/query")
+async def query_timeseries(
+    name: Optional[str] = Query(None, description="Sample name, e.g. http_requests_total; omit to list stored series"),
+    match: Optional[str] = Query(None, description="Label filters, e.g. endpoint=/data,method=GET"),
+    window: float = Query(300, gt=0, description="Seconds of history up to `end`"),
+    end: Optional[float] = Query(None, description="Unix time the window ends at (default now)"),
+    fn: str = Query("raw", pattern="^(raw|rate)$"),
+    op: Optional[str] = Query(None, pattern="^(sum|avg|min|max|count)$"),
+    by: Optional[str] = Query(None, description="Labels kept by `op`, comma-separated")
+):
+    """
+    Recent history of a metric from the in-process time-series store
+    Served from this worker's memory, so it answers while the external
+    monitoring stack is slow. fn=rate gives per-second rates of counters;
+    op combines the matching series, e.g.
+    ?name=http_requests_total&fn=rate&op=sum&by=endpoint&window=60.
+    Ranges within the finest retention come at the finest step.
+    """
+    store = get_timeseries_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Time-series store is not running")
+    if name is None:
+        return {
+            "resolutions": [{"step": step, "retention": retention} for step, retention in store.resolutions],
+            "series": store.names(),
+            "timestamp": time.time()
+        }
+
+    matchers = parse_matchers(match)
+    group_by = [label.strip() for label in (by or "").split(",") if label.strip()]
+    end = end if end is not None else time.time()
+    # Long ranges over many series are real work; keep it off the event loop
+    result = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: store.query(name, matchers, end - window, end, fn, op, group_by)
+    )
+    result["timestamp"] = time.time()
+    return result
@@ -0,0 +1,41 @@
+"""
+Storage backends for data items
+"""
+
+import threading
+from app.config import settings
+from .base import StorageBackend
+from .memory import MemoryBackend
+from .ids import new_ulid
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend (created on first use)"""
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if settings.STORAGE_BACKEND == "sqlite":
+                    from .sqlite import SQLiteBackend
+                    _storage = SQLiteBackend(
+                        settings.SQLITE_PATH,
+                        batch_max=settings.STORAGE_BATCH_MAX,
+                        batch_wait=settings.STORAGE_BATCH_WAIT_MS / 1000
+                    )
+                elif settings.STORAGE_BACKEND == "memory":
+                    _storage = MemoryBackend()
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return _storage
+
+def __getattr__(name):
+    # sqlite3 is only imported when the SQLite backend is used
+    if name == "SQLiteBackend":
+        from .sqlite import SQLiteBackend
+        return SQLiteBackend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['StorageBackend', 'MemoryBackend', 'SQLiteBackend', 'new_ulid', 'get_storage']
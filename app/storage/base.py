@@ -0,0 +1,88 @@
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+from app.metrics.storage_metrics import STORAGE_OPERATION_LATENCY, STORAGE_BATCH_SIZE
+
+Item = Dict[str, Any]
+
+class StorageBackend:
+    """
+    Interface for data item storage
+
+    Items are JSON-compatible dicts keyed by string ids, and ids define
+    the iteration order used for pagination. Backends implement the
+    underscore methods; the public ones add latency metrics labeled with
+    the backend `name`.
+
+    Cached reads are keyed on `data_version()`. The default counts this
+    process's writes, which is only right for storage no other process
+    can write to; shared backends must override it with a version kept
+    in the shared store.
+    """
+
+    name = "base"
+    # Bumped after every write this process makes
+    version = 0
+
+    async def put(self, item_id: str, item: Item) -> None:
+        """Store (or replace) an item"""
+        start = perf_counter()
+        await self._put(item_id, item)
+        self.version += 1
+        self._observe("put", start)
+
+    async def put_many(self, items: List[Tuple[str, Item]]) -> None:
+        """Store several items in one pass"""
+        start = perf_counter()
+        await self._put_many(items)
+        self.version += 1
+        self._observe("put_many", start)
+
+    async def get(self, item_id: str) -> Optional[Item]:
+        """Fetch one item, or None if it does not exist"""
+        start = perf_counter()
+        item = await self._get(item_id)
+        self._observe("get", start)
+        return item
+
+    async def page(self, cursor: Optional[str], limit: int) -> List[Tuple[str, Item]]:
+        """Up to `limit` (id, item) pairs with ids strictly after `cursor`, in id order"""
+        start = perf_counter()
+        items = await self._page(cursor, limit)
+        self._observe("page", start)
+        return items
+
+    async def count(self) -> int:
+        """Number of stored items"""
+        start = perf_counter()
+        total = await self._count()
+        self._observe("count", start)
+        return total
+
+    async def data_version(self) -> int:
+        """A number that changes after every write to the stored data"""
+        return self.version
+
+    async def close(self) -> None:
+        """Flush pending writes and release resources"""
+
+    def _observe(self, operation: str, start: float):
+        STORAGE_OPERATION_LATENCY.labels(self.name, operation).observe(perf_counter() - start)
+
+    def _observe_batch(self, size: int):
+        STORAGE_BATCH_SIZE.labels(self.name).observe(size)
+
+    async def _put(self, item_id: str, item: Item) -> None:
+        raise NotImplementedError
+
+    async def _put_many(self, items: List[Tuple[str, Item]]) -> None:
+        for item_id, item in items:
+            await self._put(item_id, item)
+
+    async def _get(self, item_id: str) -> Optional[Item]:
+        raise NotImplementedError
+
+    async def _page(self, cursor: Optional[str], limit: int) -> List[Tuple[str, Item]]:
+        raise NotImplementedError
+
+    async def _count(self) -> int:
+        raise NotImplementedError
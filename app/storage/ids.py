@@ -0,0 +1,41 @@
+import os
+import threading
+import time
+
+# Crockford base32, as used by the ULID spec
+_ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ENCODING[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def new_ulid() -> str:
+    """
+    Return a monotonic ULID (26 chars, lexicographically sortable)
+
+    48 bits of millisecond timestamp followed by 80 random bits. Within
+    the same millisecond the random part is incremented instead of
+    redrawn, so ids generated in this process never collide and always
+    sort in creation order.
+    """
+    global _last_ms, _last_random
+
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_ms:
+            # Same millisecond (or clock went backwards): keep ordering
+            now_ms = _last_ms
+            _last_random = (_last_random + 1) & ((1 << 80) - 1)
+            if _last_random == 0:
+                now_ms += 1
+        else:
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        _last_ms = now_ms
+        return _encode(now_ms, 10) + _encode(_last_random, 16)
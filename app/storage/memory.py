@@ -0,0 +1,39 @@
+from bisect import bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+from app.storage.base import StorageBackend, Item
+
+class MemoryBackend(StorageBackend):
+    """
+    Process-local dict storage (the original demo behaviour)
+
+    Lost on restart and not shared between workers. A sorted id list
+    backs pagination; ULIDs are generated in order, so inserts append.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.items: Dict[str, Item] = {}
+        self.index: List[str] = []
+
+    async def _put(self, item_id: str, item: Item) -> None:
+        if item_id not in self.items:
+            insort(self.index, item_id)
+        self.items[item_id] = item
+
+    async def _put_many(self, items: List[Tuple[str, Item]]) -> None:
+        for item_id, item in items:
+            if item_id not in self.items:
+                insort(self.index, item_id)
+            self.items[item_id] = item
+        self._observe_batch(len(items))
+
+    async def _get(self, item_id: str) -> Optional[Item]:
+        return self.items.get(item_id)
+
+    async def _page(self, cursor: Optional[str], limit: int) -> List[Tuple[str, Item]]:
+        start = bisect_right(self.index, cursor) if cursor else 0
+        return [(item_id, self.items[item_id]) for item_id in self.index[start:start + limit]]
+
+    async def _count(self) -> int:
+        return len(self.items)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from app.storage.base import StorageBackend, Item
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS items (id TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID"
+# Write counter shared by every process using the file, bumped in each write transaction
+_META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID"
+
+# Sentinel that tells the writer thread to stop
+_STOP = object()
+
+def _resolve(future: asyncio.Future, error: Optional[BaseException]):
+    if future.cancelled():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+class SQLiteBackend(StorageBackend):
+    """
+    Local SQLite storage in WAL mode with group commit
+
+    All writes go through one writer thread. It takes everything queued
+    (up to `batch_max` rows, waiting up to `batch_wait` seconds for more
+    after the first) and commits it as one transaction, then wakes every
+    waiting caller. Under load many POSTs therefore share one fsync.
+    Reads use per-thread connections in the default executor, which WAL
+    lets run alongside the writer and other worker processes.
+
+    Every write transaction also bumps a counter in the `meta` table, so
+    `data_version()` sees writes made by any process using the file.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, batch_max: int = 256, batch_wait: float = 0.0):
+        self.path = path
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self._local = threading.local()
+        self._queue = queue.Queue()
+
+        connection = self._connect()
+        connection.execute(_SCHEMA)
+        connection.execute(_META_SCHEMA)
+        connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+        connection.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # Writes
+
+    def _enqueue(self, rows: List[Tuple[str, str]]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((rows, loop, future))
+        return future
+
+    async def _put(self, item_id: str, item: Item) -> None:
+        await self._enqueue([(item_id, json.dumps(item))])
+
+    async def _put_many(self, items: List[Tuple[str, Item]]) -> None:
+        await self._enqueue([(item_id, json.dumps(item)) for item_id, item in items])
+
+    def _next_batch(self, first):
+        """Collect queued writes behind `first`; returns (batch, stop)"""
+        batch = [first]
+        rows = len(first[0])
+        while rows < self.batch_max:
+            try:
+                entry = self._queue.get(timeout=self.batch_wait) if self.batch_wait else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+            rows += len(entry[0])
+        return batch, False
+
+    def _write_loop(self):
+        connection = self._connect()
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._next_batch(first)
+
+            rows = [row for entry in batch for row in entry[0]]
+            error = None
+            try:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO items (id, data) VALUES (?, ?)", rows)
+                    connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+            except Exception as e:
+                error = e
+            self._observe_batch(len(rows))
+
+            for _, loop, future in batch:
+                try:
+                    loop.call_soon_threadsafe(_resolve, future, error)
+                except RuntimeError:
+                    # The caller's event loop is already closed
+                    pass
+        connection.close()
+
+    # Reads
+
+    def _get_sync(self, item_id: str) -> Optional[Item]:
+        row = self._reader().execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _page_sync(self, cursor: Optional[str], limit: int) -> List[Tuple[str, Item]]:
+        rows = self._reader().execute(
+            "SELECT id, data FROM items WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor or "", limit)
+        ).fetchall()
+        return [(item_id, json.loads(data)) for item_id, data in rows]
+
+    def _count_sync(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _data_version_sync(self) -> int:
+        return self._reader().execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+    async def _get(self, item_id: str) -> Optional[Item]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._get_sync, item_id)
+
+    async def _page(self, cursor: Optional[str], limit: int) -> List[Tuple[str, Item]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._page_sync, cursor, limit)
+
+    async def _count(self) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, self._count_sync)
+
+    async def data_version(self) -> int:
+        """Shared write counter: changes when any process writes to the file"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._data_version_sync)
+
+    async def close(self) -> None:
+        """Let the writer commit what is queued, then stop it"""
+        self._queue.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self._writer.join)
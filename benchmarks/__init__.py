@@ -0,0 +1,10 @@
+"""
+Benchmarks for the metrics stack
+
+    python -m benchmarks.loadtest         mixed workload, metrics on/off, baselines
+    python -m benchmarks.import_time      cold-start import and time to first response
+    python -m benchmarks.push_receiver    stand-in OTLP receiver for the push exporter
+    python -m benchmarks.middleware_rps   MetricsMiddleware overhead on a one-route app
+    python -m benchmarks.record_metrics   record_request_metrics cost per call
+    python -m benchmarks.compact_histogram  CompactHistogram vs prometheus_client.Histogram
+"""
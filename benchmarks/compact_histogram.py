@@ -0,0 +1,102 @@
+"""
+CompactHistogram against prometheus_client.Histogram
+
+For a family with --children label sets (latency buckets, two labels)
+reports, per implementation:
+
+  memory    - bytes allocated per child (tracemalloc), children created
+              and observed once each
+  observe   - ns per observe() on a resolved child
+  labels    - ns per labels(...).observe() for an existing child
+  collect   - ms per full collect() of the family, i.e. one scrape
+
+Usage:
+    python -m benchmarks.compact_histogram [--children 10000] [--iterations 200000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from prometheus_client import CollectorRegistry, Histogram
+
+from app.config import settings
+from app.metrics.compact_histogram import CompactHistogram
+
+BUCKETS = settings.get_custom_buckets("latency")
+LABELNAMES = ["method", "endpoint"]
+
+
+def label_sets(children: int):
+    return [("GET", f"/items/{i}") for i in range(children)]
+
+
+def build(kind, labels):
+    """A populated family of `kind`, every child observed once"""
+    registry = CollectorRegistry()
+    family = kind("bench_duration_seconds", "Benchmark histogram", LABELNAMES,
+                  buckets=BUCKETS, registry=registry)
+    for i, values in enumerate(labels):
+        family.labels(*values).observe((i % 1000) / 1000)
+    return family
+
+
+def memory_per_child(kind, labels) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    family = build(kind, labels)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del family
+    return (after - before) / len(labels)
+
+
+def observe_ns(family, labels, iterations: int) -> float:
+    children = [family.labels(*values) for values in labels[:100]]
+    count = len(children)
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        children[i % count].observe(0.0123)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def labels_ns(family, labels, iterations: int) -> float:
+    count = len(labels)
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        family.labels(*labels[i % count]).observe(0.0123)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def collect_ms(family, rounds: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for metric in family.collect():
+            len(metric.samples)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--children", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    labels = label_sets(args.children)
+
+    print(f"{args.children} children, {len(BUCKETS)} buckets")
+    print(f"{'':20} {'memory':>12} {'observe':>12} {'labels':>12} {'collect':>12}")
+    for name, kind in (("prometheus_client", Histogram), ("compact", CompactHistogram)):
+        memory = memory_per_child(kind, labels)
+        family = build(kind, labels)
+        print(
+            f"{name:20} {memory:8.0f} B/ch"
+            f" {observe_ns(family, labels, args.iterations):9.0f} ns"
+            f" {labels_ns(family, labels, args.iterations):9.0f} ns"
+            f" {collect_ms(family):9.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
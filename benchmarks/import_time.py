@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark: import time of app.main and time to first response
+
+Every measurement uses a fresh interpreter, so nothing is cached in
+sys.modules between runs (the OS file cache stays warm, which keeps
+runs comparable):
+
+  import   - wall time of `python -c "import app.main"`
+  ready    - from launching uvicorn to the first 200 from /health
+  modules  - the slowest imports by cumulative time, from -X importtime
+
+Usage:
+    python -m benchmarks.import_time [--runs 7] [--top 15] [--no-server]
+                                     [--save baseline.json]
+                                     [--compare baseline.json --threshold 0.10]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.loadtest import free_port, wait_until_ready
+
+
+def clean_env() -> dict:
+    env = dict(os.environ)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return env
+
+
+def time_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], env=clean_env(), check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_to_ready() -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=clean_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(wait_until_ready(port))
+        return time.perf_counter() - start
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def slowest_imports(top: int):
+    """(module, cumulative seconds) of the `top` slowest imports"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=clean_env(), capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda entry: entry[1], reverse=True)[:top]
+
+
+def summarize(values) -> dict:
+    return {
+        "median_s": statistics.median(values),
+        "min_s": min(values),
+        "max_s": max(values),
+        "runs": len(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--no-server", action="store_true", help="Skip the uvicorn time-to-ready runs")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    # One untimed run so the file cache is warm for every timed one
+    time_import()
+    results = {"import": summarize([time_import() for _ in range(args.runs)])}
+    if not args.no_server:
+        results["ready"] = summarize([time_to_ready() for _ in range(args.runs)])
+
+    for name, summary in results.items():
+        print(f"{name:8} median {summary['median_s'] * 1000:8.1f} ms   "
+              f"min {summary['min_s'] * 1000:8.1f} ms   max {summary['max_s'] * 1000:8.1f} ms")
+    print("\nslowest imports (cumulative):")
+    for module, seconds in slowest_imports(args.top):
+        print(f"  {seconds * 1000:8.1f} ms  {module}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"created_at": time.time(), "python": sys.version, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, summary in results.items():
+            old = baseline.get(name, {}).get("median_s")
+            if old and (summary["median_s"] - old) / old > args.threshold:
+                regressions.append(f"{name}: {old * 1000:.1f} ms -> {summary['median_s'] * 1000:.1f} ms")
+        print()
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
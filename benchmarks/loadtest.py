@@ -0,0 +1,448 @@
+"""
+Mixed-workload load test for app.main:app, with metrics on and off
+
+Runs the same weighted mix of requests (/, GET and POST /data, /health,
+/health/detailed, /metrics) against the full application in two ways:
+
+  asgi     - in-process, calling the ASGI app directly (no sockets), in a
+             child process so CPU and RSS belong to the run alone
+  uvicorn  - through a local uvicorn server over keep-alive HTTP/1.1;
+             CPU and RSS are read from the server process
+
+Each transport is run with HTTP_METRICS_ENABLED=true and false, so the
+difference is what MetricsMiddleware, record_request_metrics and the
+rest of the request recording cost. Reported per run: requests/s,
+latency percentiles (overall and per request type), CPU time per request
+and RSS growth over the run.
+
+Note that each POST /data takes PROCESSING_WORK_SECONDS_MIN..MAX
+(0.1-0.5s) by design: a wait by default, so it holds one of the
+--concurrency callers but no CPU. With PROCESSING_CPU_WORK=true it burns
+that CPU in the processing pool instead, which caps its throughput by
+the number of cores and puts the pool's CPU into the server's; leave it
+off when measuring the middleware.
+
+Usage:
+    python -m benchmarks.loadtest [--requests 5000] [--concurrency 32]
+                                  [--transports asgi,uvicorn]
+                                  [--save baseline.json]
+                                  [--compare baseline.json --threshold 0.10]
+
+With --compare the exit status is 1 if any run regressed by more than
+the threshold (lower RPS, higher CPU per request, or a higher p99 for
+any request type).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import psutil
+
+# (weight, method, path, body)
+WORKLOAD = [
+    (20, "GET", "/", None),
+    (25, "GET", "/data?limit=20", None),
+    (5, "POST", "/data", b'{"name": "bench", "value": 1, "metadata": {"source": "loadtest"}}'),
+    (25, "GET", "/health", None),
+    (15, "GET", "/health/detailed", None),
+    # The trailing slash skips the mount's redirect, as a scraper ends up doing
+    (10, "GET", "/metrics/", None),
+]
+
+MODES = {"metrics_on": "true", "metrics_off": "false"}
+
+# Metrics compared by --compare, and whether higher is better. p99 is
+# compared per request type: POST /data is 5% of the mix and takes
+# 0.1-0.5s of simulated processing, so the overall p99 falls inside its
+# (random) processing times, while the other requests take milliseconds.
+# A regression in those would barely move the overall p99.
+COMPARED = {"rps": True, "cpu_us_per_request": False}
+
+
+def request_name(method: str, path: str) -> str:
+    return f"{method} {path.split('?')[0]}"
+
+
+def build_schedule(requests: int, seed: int):
+    """Deterministic weighted sequence of workload entries"""
+    rng = random.Random(seed)
+    weights = [entry[0] for entry in WORKLOAD]
+    return rng.choices(WORKLOAD, weights=weights, k=requests)
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p90_ms": percentile(values, 0.90) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+class ASGITransport:
+    """Call an ASGI app directly, one request at a time per caller"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body: bytes) -> int:
+        path, _, query = path.partition("?")
+        headers = [(b"host", b"bench")]
+        if body:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": headers,
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        status = 0
+        sent_body = False
+        response_complete = asyncio.Event()
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body or b"", "more_body": False}
+            # Like uvicorn: report the disconnect once the response is done
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete.set()
+
+        await self.app(scope, receive, send)
+        return status
+
+    async def close(self):
+        pass
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client over one asyncio connection"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = body or b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if body:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+
+        status_line = await self.reader.readline()
+        status = int(status_line.split()[1])
+        length = None
+        chunked = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value.lower():
+                chunked = True
+
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def drive(make_transport, schedule, concurrency: int) -> dict:
+    """Run the schedule with `concurrency` callers; return timings per request"""
+    queue = list(reversed(schedule))
+    latencies = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        transport = make_transport()
+        try:
+            while queue:
+                _, method, path, body = queue.pop()
+                start = time.perf_counter()
+                try:
+                    status = await transport.request(method, path, body)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    status = 0
+                    await transport.close()
+                    transport = make_transport()
+                elapsed = time.perf_counter() - start
+                if not 200 <= status < 400:
+                    errors += 1
+                latencies.setdefault(request_name(method, path), []).append(elapsed)
+        finally:
+            await transport.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"elapsed": time.perf_counter() - start, "latencies": latencies, "errors": errors}
+
+
+def build_result(run: dict, cpu_seconds: float, rss_start: int, rss_end: int) -> dict:
+    latencies = run["latencies"]
+    total = sum(len(values) for values in latencies.values())
+    overall = summarize_latencies([value for values in latencies.values() for value in values])
+    return {
+        "requests": total,
+        "errors": run["errors"],
+        "elapsed_s": run["elapsed"],
+        "rps": total / run["elapsed"] if run["elapsed"] else 0.0,
+        **{key: value for key, value in overall.items() if key != "count"},
+        "cpu_us_per_request": cpu_seconds / total * 1e6 if total else 0.0,
+        "rss_start_mb": rss_start / 2 ** 20,
+        "rss_growth_mb": (rss_end - rss_start) / 2 ** 20,
+        "by_request": {name: summarize_latencies(values) for name, values in sorted(latencies.items())},
+    }
+
+
+# In-process transport (runs in a child process)
+
+async def run_asgi(requests: int, warmup: int, concurrency: int, seed: int) -> dict:
+    from app.main import app
+
+    # Startup/shutdown hooks are not driven by the fake transport
+    await app.router.startup()
+    transport = ASGITransport(app)
+    await drive(lambda: transport, build_schedule(warmup, seed + 1), concurrency)
+
+    process = psutil.Process()
+    rss_start = process.memory_info().rss
+    cpu_start = time.process_time()
+    run = await drive(lambda: transport, build_schedule(requests, seed), concurrency)
+    cpu_seconds = time.process_time() - cpu_start
+    rss_end = process.memory_info().rss
+
+    await app.router.shutdown()
+    return build_result(run, cpu_seconds, rss_start, rss_end)
+
+
+def run_asgi_child(mode: str, args) -> dict:
+    """Run the in-process benchmark in a fresh interpreter"""
+    env = dict(os.environ, HTTP_METRICS_ENABLED=MODES[mode], STORAGE_BACKEND="memory")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.loadtest", "--child-asgi",
+         "--requests", str(args.requests), "--warmup", str(args.warmup),
+         "--concurrency", str(args.concurrency), "--seed", str(args.seed)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # The app prints its own startup lines; the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# uvicorn transport
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = HTTPConnection("127.0.0.1", port)
+        try:
+            if await connection.request("GET", "/health", b"") == 200:
+                return
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            pass
+        finally:
+            await connection.close()
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"uvicorn did not become ready on port {port}")
+
+
+def run_uvicorn(mode: str, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, HTTP_METRICS_ENABLED=MODES[mode], STORAGE_BACKEND="memory")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        async def run():
+            await wait_until_ready(port)
+            make_transport = lambda: HTTPConnection("127.0.0.1", port)
+            await drive(make_transport, build_schedule(args.warmup, args.seed + 1), args.concurrency)
+
+            process = psutil.Process(server.pid)
+            rss_start = process.memory_info().rss
+            cpu_start = sum(process.cpu_times()[:2])
+            result = await drive(make_transport, build_schedule(args.requests, args.seed), args.concurrency)
+            cpu_seconds = sum(process.cpu_times()[:2]) - cpu_start
+            return build_result(result, cpu_seconds, rss_start, process.memory_info().rss)
+
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+# Reporting and baselines
+
+def print_results(results: dict):
+    print(f"{'run':24} {'rps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'cpu us/req':>11} {'rss +MB':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:24} {result['rps']:9.0f} {result['p50_ms']:8.2f} {result['p90_ms']:8.2f} "
+              f"{result['p99_ms']:8.2f} {result['cpu_us_per_request']:11.0f} "
+              f"{result['rss_growth_mb']:8.1f} {result['errors']:7d}")
+
+    for transport in sorted({name.split("/")[0] for name in results}):
+        on = results.get(f"{transport}/metrics_on")
+        off = results.get(f"{transport}/metrics_off")
+        if on and off:
+            print(f"{transport}: metrics cost {on['cpu_us_per_request'] - off['cpu_us_per_request']:.0f} us CPU "
+                  f"per request, {100 * (1 - on['rps'] / off['rps']):.1f}% RPS")
+
+    print()
+    for name, result in results.items():
+        print(name)
+        for request, summary in result["by_request"].items():
+            print(f"  {request:22} n={summary['count']:<6} p50={summary['p50_ms']:.2f}ms "
+                  f"p99={summary['p99_ms']:.2f}ms max={summary['max_ms']:.2f}ms")
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list:
+    """Return a description of every metric that regressed beyond `threshold`"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous[metric], result[metric]
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{name} {metric}: {old:.2f} -> {new:.2f} ({change:+.1%})")
+        for request, summary in result["by_request"].items():
+            old = previous.get("by_request", {}).get(request, {}).get("p99_ms", 0)
+            if old > 0 and (summary["p99_ms"] - old) / old > threshold:
+                regressions.append(
+                    f"{name} {request} p99_ms: {old:.2f} -> {summary['p99_ms']:.2f} "
+                    f"({(summary['p99_ms'] - old) / old:+.1%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--transports", default="asgi,uvicorn")
+    parser.add_argument("--modes", default="metrics_on,metrics_off")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default 0.10)")
+    parser.add_argument("--child-asgi", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_asgi:
+        result = asyncio.run(run_asgi(args.requests, args.warmup, args.concurrency, args.seed))
+        print(json.dumps(result))
+        return
+
+    runners = {"asgi": run_asgi_child, "uvicorn": run_uvicorn}
+    results = {}
+    for transport in args.transports.split(","):
+        for mode in args.modes.split(","):
+            results[f"{transport}/{mode}"] = runners[transport](mode, args)
+
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created_at": time.time(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "settings": {
+                    "requests": args.requests,
+                    "warmup": args.warmup,
+                    "concurrency": args.concurrency,
+                    "seed": args.seed,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        print()
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
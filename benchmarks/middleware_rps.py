@@ -0,0 +1,91 @@
+"""
+Requests-per-second comparison for MetricsMiddleware
+
+Drives a minimal FastAPI app in-process (no sockets) with and without
+MetricsMiddleware so the wrapper's own cost can be read off directly.
+
+Usage:
+    python -m benchmarks.middleware_rps [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    """Build a one-route app, optionally wrapped by MetricsMiddleware"""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Send `requests` GET /ping calls through the ASGI interface, return RPS"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def one_request():
+        sent_body = False
+        response_complete = asyncio.Event()
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Like uvicorn: report the disconnect once the response is done
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete.set()
+
+        await app(dict(scope), receive, send)
+
+    # Warm up routing and metric children
+    for _ in range(200):
+        await one_request()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await one_request()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(drive(build_app(False), args.requests))
+    wrapped = asyncio.run(drive(build_app(True), args.requests))
+    print(f"without middleware: {bare:10.0f} req/s")
+    print(f"with middleware:    {wrapped:10.0f} req/s")
+    print(f"overhead per request: {(1 / wrapped - 1 / bare) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Stand-in OTLP/HTTP receiver for testing the push exporter offline
+
+Accepts the JSON (optionally gzip) batches the exporter posts to
+/v1/metrics, keeps running totals of every delta counter and histogram
+count per instance, and prints one line per batch. Failures can be
+injected to exercise retries and drop accounting:
+
+    python -m benchmarks.push_receiver [--port 4318] [--fail-rate 0.3]
+                                       [--status 503] [--delay 0.5]
+
+Point the app at it with:
+
+    PUSH_EXPORTER_ENABLED=true PUSH_EXPORTER_ENDPOINT=http://127.0.0.1:4318/v1/metrics
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Totals:
+    """Running totals of delta points, keyed by (instance, metric, attributes)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.points = 0
+        self.values = defaultdict(float)
+
+    def add(self, body: dict) -> int:
+        points = 0
+        with self.lock:
+            for resource_metrics in body.get("resourceMetrics", []):
+                attributes = resource_metrics.get("resource", {}).get("attributes", [])
+                instance = next((a["value"]["stringValue"] for a in attributes
+                                 if a["key"] == "service.instance.id"), "?")
+                for scope in resource_metrics.get("scopeMetrics", []):
+                    for metric in scope.get("metrics", []):
+                        points += self._add_metric(instance, metric)
+            self.batches += 1
+            self.points += points
+        return points
+
+    def _add_metric(self, instance: str, metric: dict) -> int:
+        for kind in ("sum", "histogram", "gauge", "summary"):
+            if kind in metric:
+                break
+        else:
+            return 0
+        data_points = metric[kind].get("dataPoints", [])
+        for point in data_points:
+            labels = ",".join(f"{a['key']}={a['value']['stringValue']}" for a in point.get("attributes", []))
+            key = (instance, metric["name"], labels)
+            if kind == "sum":
+                self.values[key] += point.get("asDouble", 0)
+            elif kind == "histogram":
+                self.values[key] += int(point.get("count", 0))
+        return len(data_points)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "points": self.points,
+                "totals": {" ".join(key): value for key, value in sorted(self.values.items())}
+            }
+
+
+def make_handler(totals: Totals, fail_rate: float, status: int, delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if delay:
+                time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_response(status)
+                self.end_headers()
+                print(f"injected {status} ({len(payload)} bytes)")
+                return
+            try:
+                if self.headers.get("Content-Encoding") == "gzip":
+                    payload = gzip.decompress(payload)
+                points = totals.add(json.loads(payload))
+            except (OSError, ValueError) as e:
+                self.send_response(400)
+                self.end_headers()
+                print(f"bad batch: {e}")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+            print(f"batch {totals.batches}: {points} points, {int(self.headers.get('Content-Length', 0))} bytes")
+
+        def do_GET(self):
+            # Totals so far, for checking exported counters against /metrics
+            body = json.dumps(totals.to_dict(), indent=2).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int, fail_rate: float = 0.0, status: int = 503, delay: float = 0.0):
+    """Start the receiver in a background thread; returns (server, totals)"""
+    totals = Totals()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(totals, fail_rate, status, delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of batches answered with --status")
+    parser.add_argument("--status", type=int, default=503)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    args = parser.parse_args()
+
+    server, _ = serve(args.port, args.fail_rate, args.status, args.delay)
+    print(f"Receiving on http://127.0.0.1:{args.port}/v1/metrics (GET / for totals)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
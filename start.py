@@ -2,10 +2,10 @@
 Metrics Monitoring System Startup Script
 """
 
-import uvicorn
 import logging
 import sys
 import os
+import glob
 
 # Set up basic logging first
 logging.basicConfig(
@@ -16,6 +16,18 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def prepare_multiproc_dir(path):
+    """
+    Create the multi-process metrics directory and clear stale value files
+    
+    Must run before any worker creates metrics, otherwise totals from a
+    previous run would be merged into this one.
+    """
+    os.makedirs(path, exist_ok=True)
+    for pattern in ("*.db", "sketch_*.json"):
+        for stale in glob.glob(os.path.join(path, pattern)):
+            os.remove(stale)
+
 def main():
     """Main startup function"""
     try:
@@ -26,18 +38,23 @@ def main():
         logger.info(f"Host: {settings.HOST}, Port: {settings.PORT}")
         logger.info(f"Debug mode: {settings.DEBUG}")
         logger.info(f"Metrics endpoint: {settings.METRICS_ENDPOINT}")
+        logger.info(f"Workers: {settings.WORKERS}")
+        
+        if settings.PROMETHEUS_MULTIPROC_DIR:
+            logger.info(f"Multi-process metrics in {settings.PROMETHEUS_MULTIPROC_DIR}")
+            prepare_multiproc_dir(settings.PROMETHEUS_MULTIPROC_DIR)
         
-        # Ensure metrics are initialized
-        logger.info("Initializing metrics...")
-        from app.metrics import start_metrics_collection
-        start_metrics_collection()
-        logger.info("Metrics collection started")
+        # Metrics are set up by each worker after it starts listening; the
+        # launcher itself imports nothing from the app beyond its settings
+        logger.info("System metrics will be collected on scrape")
         
         # Start the application
+        import uvicorn
         uvicorn.run(
             "app.main:app",
             host=settings.HOST,
             port=settings.PORT,
+            workers=settings.WORKERS,
             reload=False,  # Disable reload in Docker to avoid multiprocessing issues
             log_level=settings.LOG_LEVEL.lower(),
             access_log=True,
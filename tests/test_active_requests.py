@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+
+from app.metrics import http_metrics
+from app.metrics.cardinality import OVERFLOW_LABEL
+from app.metrics.http_metrics import (
+    ACTIVE_REQUESTS_LIMITER,
+    decrement_active_requests,
+    increment_active_requests
+)
+
+
+class ActiveRequestsEvictionTests(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(ACTIVE_REQUESTS_LIMITER, "max_series", 2),
+            mock.patch.object(ACTIVE_REQUESTS_LIMITER, "idle_seconds", 0),
+            mock.patch.object(ACTIVE_REQUESTS_LIMITER, "_series", type(ACTIVE_REQUESTS_LIMITER._series)()),
+            mock.patch.object(http_metrics, "_active_cache", {}),
+            mock.patch.object(http_metrics, "_active_counts", {}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_series_in_flight_is_not_evicted(self):
+        busy = increment_active_requests("GET", "/busy")
+        done = increment_active_requests("GET", "/done")
+        decrement_active_requests(*done)
+
+        # Budget full: the finished series makes room, the busy one stays
+        self.assertEqual(increment_active_requests("GET", "/new"), ("GET", "/new"))
+        self.assertIn(busy, ACTIVE_REQUESTS_LIMITER._series)
+        self.assertNotIn(done, ACTIVE_REQUESTS_LIMITER._series)
+
+        # Both remaining series are in flight: nothing can be evicted
+        self.assertEqual(increment_active_requests("GET", "/other"), (OVERFLOW_LABEL, OVERFLOW_LABEL))
+        self.assertEqual(http_metrics._active_counts, {busy: 1, ("GET", "/new"): 1, (OVERFLOW_LABEL, OVERFLOW_LABEL): 1})
+
+    def test_counts_are_dropped_at_zero(self):
+        labels = increment_active_requests("GET", "/a")
+        increment_active_requests("GET", "/a")
+        decrement_active_requests(*labels)
+        self.assertEqual(http_metrics._active_counts, {labels: 1})
+        decrement_active_requests(*labels)
+        self.assertEqual(http_metrics._active_counts, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
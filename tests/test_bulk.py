@@ -0,0 +1,89 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from app.config import settings
+from app.routers.bulk import RecordTooLarge, iter_json_array, iter_ndjson
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def parse(parser, data: bytes, size: int = 65536):
+    async def run():
+        return [item async for item in parser(chunked(data, size))]
+    return asyncio.run(run())
+
+
+class JSONArrayTests(unittest.TestCase):
+
+    def test_elements_split_at_every_chunk_size(self):
+        records = [{"name": "a", "value": 1}, 12345, "x,]\"y", [1, [2]], None, -0.5e3, True]
+        data = b" [ " + b" , ".join(json.dumps(r).encode() for r in records) + b" ] \n"
+        for size in range(1, len(data) + 1):
+            self.assertEqual([r for r, _ in parse(iter_json_array, data, size)], records, size)
+
+    def test_empty_array(self):
+        self.assertEqual(parse(iter_json_array, b"[ ]"), [])
+
+    def test_rejects_empty_elements(self):
+        for body in (b"[1,,2]", b"[,1]", b"[1,]", b"[,]"):
+            for size in (1, 64):
+                with self.assertRaises(ValueError, msg=body):
+                    parse(iter_json_array, body, size)
+
+    def test_rejects_data_after_the_array(self):
+        for body in (b"[1] x", b"[1]]", b"[1][2]", b"[1],"):
+            for size in (1, 64):
+                with self.assertRaises(ValueError, msg=body):
+                    parse(iter_json_array, body, size)
+
+    def test_rejects_unterminated_or_invalid(self):
+        for body in (b"", b"{}", b"[1, 2", b'[{"a": 1}', b"[1 2]", b"[tru]"):
+            with self.assertRaises(ValueError, msg=body):
+                parse(iter_json_array, body, 3)
+
+    def test_record_size_limit(self):
+        small = json.dumps({"name": "a" * 50}).encode()
+        big = json.dumps({"name": "a" * 500}).encode()
+        with mock.patch.object(settings, "BULK_MAX_RECORD_BYTES", 100):
+            self.assertEqual(len(parse(iter_json_array, b"[" + small + b"," + small + b"]", 7)), 2)
+            for size in (7, 4096):
+                with self.assertRaises(RecordTooLarge):
+                    parse(iter_json_array, b"[" + small + b"," + big + b"]", size)
+            # Counted in UTF-8 bytes, not characters
+            with self.assertRaises(RecordTooLarge):
+                parse(iter_json_array, '["{}"]'.format("é" * 60).encode())
+
+
+class NDJSONTests(unittest.TestCase):
+
+    def test_lines_split_at_every_chunk_size(self):
+        records = [{"name": "a", "value": i} for i in range(5)]
+        data = b"\n".join(json.dumps(r).encode() for r in records) + b"\n\n"
+        for size in range(1, len(data) + 1):
+            self.assertEqual([r for r, _ in parse(iter_ndjson, data, size)], records, size)
+
+    def test_last_line_without_newline(self):
+        self.assertEqual(parse(iter_ndjson, b'1\n{"a": 2}'), [(1, ""), ({"a": 2}, "")])
+
+    def test_invalid_line_is_reported_per_record(self):
+        (record, error), = parse(iter_ndjson, b"{nope\n")
+        self.assertIsNone(record)
+        self.assertTrue(error.startswith("invalid JSON"))
+
+    def test_record_size_limit(self):
+        with mock.patch.object(settings, "BULK_MAX_RECORD_BYTES", 100):
+            self.assertEqual(len(parse(iter_ndjson, (b"1" * 100 + b"\n") * 3, 7)), 3)
+            for size in (7, 4096):
+                with self.assertRaises(RecordTooLarge):
+                    parse(iter_ndjson, b"1\n" + b"2" * 101 + b"\n3\n", size)
+            with self.assertRaises(RecordTooLarge):
+                parse(iter_ndjson, b"1\n" + b"2" * 101, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import selectors
+import threading
+import unittest
+from types import SimpleNamespace
+
+from app.diagnostics.profiler import ProfileResult, StackSampler, is_idle_frame
+
+
+def code_without_qualname(filename: str, name: str):
+    """Stand-in for a Python 3.10 code object, which has no co_qualname"""
+    return SimpleNamespace(co_filename=filename, co_name=name)
+
+
+class IdleFrameTests(unittest.TestCase):
+
+    def test_idle_code_objects(self):
+        self.assertTrue(is_idle_frame(threading.Condition.wait.__code__))
+        self.assertTrue(is_idle_frame(selectors.SelectSelector.select.__code__))
+        self.assertFalse(is_idle_frame(is_idle_frame.__code__))
+
+    def test_without_qualname(self):
+        # (file, co_name) of the idle frames as Python 3.10 reports them
+        for filename, name in (
+            ("/usr/local/lib/python3.10/threading.py", "wait"),
+            ("/usr/local/lib/python3.10/threading.py", "join"),
+            ("/usr/local/lib/python3.10/selectors.py", "select"),
+            ("/usr/local/lib/python3.10/queue.py", "get"),
+            ("/usr/local/lib/python3.10/concurrent/futures/thread.py", "_worker"),
+            ("/usr/local/lib/python3.10/asyncio/runners.py", "run"),
+        ):
+            self.assertTrue(is_idle_frame(code_without_qualname(filename, name)), (filename, name))
+        for filename, name in (
+            ("/code/app/routers/api.py", "get_data"),
+            ("/usr/local/lib/python3.10/threading.py", "run"),
+            ("/usr/local/lib/python3.10/json/decoder.py", "raw_decode"),
+        ):
+            self.assertFalse(is_idle_frame(code_without_qualname(filename, name)), (filename, name))
+
+    def test_sampler_counts_idle_frames_without_qualname(self):
+        sampler = StackSampler(interval=0.01)
+        result = ProfileResult("thread", 1.0, 0.01)
+        frame = SimpleNamespace(
+            f_code=code_without_qualname("/usr/local/lib/python3.10/selectors.py", "select"),
+            f_back=None
+        )
+        sampler._sample(frame, "MainThread", result)
+        self.assertEqual(result.idle_samples, 1)
+        self.assertFalse(result.stacks)
+
+
+if __name__ == "__main__":
+    unittest.main()